@@ -25,6 +25,11 @@ import sys
 import getopt
 import os
 import shutil
+
+# the subsystems are imported on first use, see pymt.lazy
+from pymt.lazy import install_lazy_module
+install_lazy_module(__name__)
+
 from pymt.logger import pymt_logger, LOG_LEVELS
 
 # internals for post-configuration
@@ -152,27 +157,19 @@ if not 'PYMT_DOC_INCLUDE' in os.environ:
     from pymt.utils import *
     from pymt.event import *
     from pymt.clock import *
-    from pymt.texture import *
+    from pymt.profiler import *
     from pymt.plugin import *
 
     # internal dependices
-    from pymt.graphx import *
     from pymt.vector import *
     from pymt.geometry import *
 
     # dependices
-    from pymt.core import *
-    from pymt.modules import *
     from pymt.input import *
     from pymt.base import *
 
-    # after dependices
-    from pymt.gesture import *
-    from pymt.obj import OBJ
-    from pymt.loader import *
-
-    # widgets
-    from pymt.ui import *
+    # texture, graphx, core, modules, gesture, obj, loader and ui are
+    # imported on demand (see pymt.lazy)
 
     # Can be overrided in command line
     try:
@@ -212,6 +209,7 @@ if not 'PYMT_DOC_INCLUDE' in os.environ:
                 pymt_config.set('graphics', 'display', str(arg))
             elif opt in ('-m', '--module'):
                 if str(arg) == 'list':
+                    from pymt.modules import pymt_modules
                     pymt_modules.usage_list()
                     sys.exit(0)
                 args = arg.split(':', 1)
@@ -236,6 +234,7 @@ if not 'PYMT_DOC_INCLUDE' in os.environ:
         # last initialization
         if pymt_options['shadow_window']:
             pymt_logger.debug('Core: Creating PyMT Window')
+            from pymt.ui.window import MTWindow
             shadow_window = MTWindow()
             pymt_configure()
 
@@ -6,7 +6,7 @@ __all__ = (
     'pymt_usage',
     'runTouchApp', 'stopTouchApp',
     'getFrameDt', 'getCurrentTouches',
-    'getEventLoop',
+    'getEventLoop', 'requestRedraw',
     'pymt_event_listeners', 'touch_event_listeners',
     'pymt_providers',
     'getWindow', 'setWindow'
@@ -15,9 +15,11 @@ __all__ = (
 import pymt
 import sys
 import os
+import time
 from pymt.logger import pymt_logger
 from pymt.exceptions import pymt_exception_manager, ExceptionManager
 from pymt.clock import getClock
+from pymt.profiler import getProfiler
 from pymt.input import TouchFactory, pymt_postproc_modules
 
 # private vars
@@ -58,8 +60,59 @@ def getEventLoop():
     '''Return the default TouchEventLoop object'''
     return pymt_evloop
 
+def requestRedraw():
+    '''Ask the window to be drawn on the next frame.
+    Only needed in render on demand mode, when something visible change
+    without input, clock callback or widget move/resize.'''
+    if pymt_window:
+        pymt_window.needs_redraw = True
+
+class _InputEvent(tuple):
+    '''(internal) Queued (event, touch), with the position of the touch when
+    the event was received. The providers update the same touch in place,
+    so the position must be restored before dispatching each event.'''
+
+    #: Touch attributes saved with the event
+    attrs = ('sx', 'sy', 'sz', 'dsxpos', 'dsypos', 'dszpos')
+
+    def __new__(cls, event, touch):
+        ev = tuple.__new__(cls, (event, touch))
+        ev.state = [getattr(touch, x) for x in cls.attrs]
+        return ev
+
+    def restore(self):
+        '''Put back the saved position in the touch'''
+        event, touch = self
+        for attr, value in zip(self.attrs, self.state):
+            setattr(touch, attr, value)
+        if event == 'move':
+            # the previous position is the last dispatched one
+            touch.dxpos = touch.x
+            touch.dypos = touch.y
+            touch.dzpos = touch.z
+
+
 class TouchEventLoop(object):
     '''Main event loop. This loop handle update of input + dispatch event
+
+    Input events received during a frame are queued, and coalesced according
+    to the `input_coalescing` policy (configurable in the [pymt] section) :
+
+        * 'last': keep only the last event of the same type for a touch
+          (default). Only the last move of a touch is dispatched.
+        * 'all': keep every event, for high-fidelity drawing applications.
+          Each event is dispatched with the position of the touch when it
+          was received.
+
+    If `input_max_events` is not 0, no more than this number of events are
+    dispatched per frame. The remaining events are delayed to the next frame.
+
+    If `render_on_demand` is set, the window is drawn only when it's marked
+    as dirty: input events, clock callbacks, widgets moved, resized, shown,
+    added or removed, or a call to :func:`requestRedraw`. The loop run at
+    most at `max_fps` frames per second, and sleep between the frames.
+    The number of frames drawn and skipped are in `frames_drawn` and
+    `frames_skipped`.
     '''
     def __init__(self):
         super(TouchEventLoop, self).__init__()
@@ -67,6 +120,40 @@ class TouchEventLoop(object):
         self.input_events = []
         self.postproc_modules = []
         self.status = 'idle'
+        self.input_coalescing = 'last'
+        self.input_max_events = 0
+        self.render_on_demand = False
+        self.max_fps = 60
+        if pymt.pymt_config:
+            self.input_coalescing = pymt.pymt_config.get(
+                'pymt', 'input_coalescing')
+            self.input_max_events = pymt.pymt_config.getint(
+                'pymt', 'input_max_events')
+            self.render_on_demand = pymt.pymt_config.getboolean(
+                'pymt', 'render_on_demand')
+            self.max_fps = pymt.pymt_config.getint('pymt', 'max_fps')
+        if self.render_on_demand and self.max_fps <= 0:
+            pymt_logger.warning('Base: Invalid max_fps <%d> for render on '
+                                'demand, using <60>' % self.max_fps)
+            self.max_fps = 60
+        if self.input_coalescing not in ('last', 'all'):
+            pymt_logger.warning('Base: Unknown input coalescing <%s>, '
+                                'using <last>' % self.input_coalescing)
+            self.input_coalescing = 'last'
+        # index of each (event, touch) in input_events
+        self._input_index = {}
+        self._input_received = 0
+        self._input_coalesced = 0
+        #: Input statistics of the last frame
+        self.input_stats = {
+            'received': 0, 'coalesced': 0, 'dispatched': 0, 'delayed': 0}
+        #: Input statistics since the start of the event loop
+        self.input_stats_total = {
+            'received': 0, 'coalesced': 0, 'dispatched': 0}
+        #: Number of frames drawn
+        self.frames_drawn = 0
+        #: Number of frames not drawn in render on demand mode
+        self.frames_skipped = 0
 
     def start(self):
         '''Must be call only one time before run().
@@ -172,53 +259,163 @@ class TouchEventLoop(object):
         touch.grab_state = False
 
     def _dispatch_input(self, event, touch):
+        self._input_received += 1
+        if self.input_coalescing == 'all':
+            self.input_events.append(_InputEvent(event, touch))
+            return
+        # remove the same event for the touch if exist. the slot is
+        # emptied instead of removed, to keep the index valid.
         ev = (event, touch)
-        # remove the save event for the touch if exist
-        if ev in self.input_events[:]:
-            self.input_events.remove(ev)
+        index = self._input_index.get(ev)
+        if index is not None:
+            self.input_events[index] = None
+            self._input_coalesced += 1
+        self._input_index[ev] = len(self.input_events)
         self.input_events.append(ev)
 
     def dispatch_input(self):
         '''Called by idle() to read events from input providers,
         pass event to postproc, and dispatch final events'''
+        profiler = getProfiler()
+        if not profiler.running:
+            profiler = None
+
         # first, aquire input events
         for provider in pymt_providers:
-            provider.update(dispatch_fn=self._dispatch_input)
+            if profiler is None:
+                provider.update(dispatch_fn=self._dispatch_input)
+            else:
+                start = time.time()
+                provider.update(dispatch_fn=self._dispatch_input)
+                profiler.add_span('input', provider.__class__.__name__, start)
+
+        events = self.input_events
+        if self._input_coalesced:
+            events = [ev for ev in events if ev is not None]
+
+        # delay the events over the limit to the next frame
+        delayed = []
+        max_events = self.input_max_events
+        if max_events and len(events) > max_events:
+            delayed = events[max_events:]
+            events = events[:max_events]
 
         # execute post-processing modules
         for mod in self.postproc_modules:
-            self.input_events = mod.process(events=self.input_events)
+            if profiler is None:
+                events = mod.process(events=events)
+            else:
+                start = time.time()
+                events = mod.process(events=events)
+                profiler.add_span('postproc', mod.__class__.__name__, start)
 
         # real dispatch input
-        for event, touch in self.input_events:
-            self.post_dispatch_input(event=event, touch=touch)
-
-        self.input_events = []
+        if profiler is not None:
+            start = time.time()
+        for ev in events:
+            # the events created by the postproc modules have no position
+            if type(ev) is _InputEvent:
+                ev.restore()
+            self.post_dispatch_input(event=ev[0], touch=ev[1])
+        # the touches of the delayed events are left at their last position
+        for ev in delayed:
+            if type(ev) is _InputEvent:
+                ev.restore()
+        if profiler is not None:
+            profiler.add_span('dispatch', 'touch events', start)
+
+        # update statistics
+        stats = self.input_stats
+        stats['received'] = self._input_received
+        stats['coalesced'] = self._input_coalesced
+        stats['dispatched'] = len(events)
+        stats['delayed'] = len(delayed)
+        total = self.input_stats_total
+        total['received'] += self._input_received
+        total['coalesced'] += self._input_coalesced
+        total['dispatched'] += len(events)
+
+        self._input_received = self._input_coalesced = 0
+        self.input_events = delayed
+        self._input_index = {}
+        if self.input_coalescing == 'last':
+            for index, ev in enumerate(delayed):
+                self._input_index[ev] = index
+
+    def need_redraw(self):
+        '''Return True if the window must be drawn in render on demand mode:
+        the window is marked as dirty, input events have been dispatched or
+        clock callbacks have been called during this frame.'''
+        if pymt_window and pymt_window.needs_redraw:
+            return True
+        stats = self.input_stats
+        if stats['dispatched'] or stats['delayed']:
+            return True
+        return getClock().get_last_calls() > 0
 
     def idle(self):
         '''This function is called every frames. By default :
         * it "tick" the clock to the next frame
         * read all input and dispatch event
         * dispatch on_update + on_draw + on_flip on window
+        * in render on demand mode, the window is drawn only if needed, and
+          the loop wait for the next frame
+        The time spent in each part is recorded if the profiler is started
+        (see :mod:`pymt.profiler`).
         '''
+        profiler = getProfiler()
+        if profiler.running:
+            profiler.begin_frame()
+        else:
+            profiler = None
+
         # update dt
         global frame_dt
-        frame_dt = getClock().tick()
+        clock = getClock()
+        frame_dt = clock.tick()
 
         # read and dispatch input from providers
         self.dispatch_input()
 
         if pymt_window:
-            pymt_window.dispatch_events()
-            pymt_window.dispatch_event('on_update')
-            pymt_window.dispatch_event('on_draw')
-            pymt_window.dispatch_event('on_flip')
+            if profiler is None:
+                pymt_window.dispatch_events()
+            else:
+                start = time.time()
+                pymt_window.dispatch_events()
+                profiler.add_span('events', 'window events', start)
+            if self.render_on_demand and not self.need_redraw():
+                self.frames_skipped += 1
+            else:
+                # changes made while drawing will be drawn on the next frame
+                pymt_window.needs_redraw = False
+                if profiler is None:
+                    pymt_window.dispatch_event('on_update')
+                    pymt_window.dispatch_event('on_draw')
+                    pymt_window.dispatch_event('on_flip')
+                else:
+                    for category, event in (('update', 'on_update'),
+                                            ('draw', 'on_draw'),
+                                            ('flip', 'on_flip')):
+                        start = time.time()
+                        pymt_window.dispatch_event(event)
+                        profiler.add_span(category, event, start)
+                self.frames_drawn += 1
+
+        if profiler is not None:
+            profiler.end_frame()
 
         # don't loop if we don't have listeners !
         if len(pymt_event_listeners) == 0:
             self.exit()
             return False
 
+        # sleep until the next frame
+        if self.render_on_demand:
+            delay = clock.get_time() + 1. / self.max_fps - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
         return self.quit
 
     def run(self):
@@ -14,22 +14,130 @@ How to use the cache ::
     instance = Cache.get('mycache', label)
 
 If the instance is NULL, the cache may have trash it, because you've
-not used the label since 5 seconds, and you've reach the limit.
+not used the label since 5 seconds, or you've reach the limit.
+
+When the limit of a category is reached, the least recently used object is
+removed. A category can also be limited in memory, with the `max_size`
+parameter. The size of an object is read from his `cache_size` attribute
+(textures, images and labels report the size of their pixels in bytes), or
+can be given to append() ::
+
+    Cache.register('mytextures', max_size=64 * 1024 * 1024)
+    Cache.append('mytextures', filename, texture)
+
+Each category count the hits, misses, evictions and expirations. Use
+Cache.get_stats() or Cache.print_usage() to read them.
 '''
 
 __all__ = ('Cache', )
 
+from heapq import heappush, heappop, heapify
+from itertools import count
 from pymt.logger import pymt_logger
 from pymt.clock import getClock
 
+
+class _CacheEntry(object):
+    '''(internal) Object stored in a category, and node of the LRU list'''
+
+    __slots__ = ('key', 'object', 'timeout', 'timestamp', 'lastaccess',
+                 'size', 'deadline', 'prev', 'next')
+
+    def __init__(self, key, obj, timeout, size, curtime):
+        self.key = key
+        self.object = obj
+        self.timeout = timeout
+        self.size = size
+        self.timestamp = curtime
+        self.lastaccess = curtime
+        # deadline of the record of the entry in the expire heap
+        self.deadline = None
+        self.prev = self.next = None
+
+
+class _CacheCategory(object):
+    '''(internal) Storage of one category.
+    The entries are kept in a doubly linked list, from the least recently
+    used (root.next) to the most recently used (root.prev).
+    '''
+
+    __slots__ = ('name', 'limit', 'timeout', 'max_size', 'entries', 'root',
+                 'size', 'hits', 'misses', 'evictions', 'expired')
+
+    def __init__(self, name, limit, timeout, max_size):
+        self.name = name
+        self.limit = limit
+        self.timeout = timeout
+        self.max_size = max_size
+        self.entries = {}
+        self.root = root = _CacheEntry(None, None, None, 0, 0)
+        root.prev = root.next = root
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def link(self, entry):
+        root = self.root
+        last = root.prev
+        last.next = root.prev = entry
+        entry.prev = last
+        entry.next = root
+
+    def unlink(self, entry):
+        entry.prev.next = entry.next
+        entry.next.prev = entry.prev
+        entry.prev = entry.next = None
+
+    def add(self, entry):
+        old = self.entries.get(entry.key)
+        if old is not None:
+            self.discard(old)
+        self.entries[entry.key] = entry
+        self.size += entry.size
+        self.link(entry)
+
+    def discard(self, entry):
+        del self.entries[entry.key]
+        self.size -= entry.size
+        self.unlink(entry)
+
+    def clear(self):
+        self.entries = {}
+        self.root.prev = self.root.next = self.root
+        self.size = 0
+
+    def evict(self):
+        '''Remove the least recently used entries until the limits are
+        respected. The most recently used entry is never removed.'''
+        limit = self.limit
+        max_size = self.max_size
+        root = self.root
+        while root.next is not root.prev:
+            if limit is not None and len(self.entries) > limit:
+                pass
+            elif max_size is not None and self.size > max_size:
+                pass
+            else:
+                break
+            self.discard(root.next)
+            self.evictions += 1
+
+
 class Cache(object):
     '''Cache, a manager to cache object'''
 
     _categories = {}
-    _objects = {}
+    _expire_heap = []
+    _expire_seq = count()
+    _last_purge = None
 
     @staticmethod
-    def register(category, limit=None, timeout=None):
+    def register(category, limit=None, timeout=None, max_size=None):
         '''Register a new category in cache, with limit
 
         :Parameters:
@@ -41,17 +149,18 @@ class Cache(object):
             `timeout` : double (optionnal)
                 Time to delete the object when it's not used.
                 if None, no timeout is applied.
+            `max_size` : int (optionnal)
+                Maximum size of the objects in the cache, in bytes.
+                If None, no size limit is applied.
         '''
-        Cache._categories[category] = {
-            'limit': limit,
-            'timeout': timeout
-        }
-        Cache._objects[category] = {}
-        pymt_logger.debug('Cache: register <%s> with limit=%s, timeout=%ss' %
-            (category, str(limit), str(timeout)))
+        Cache._categories[category] = _CacheCategory(
+            category, limit, timeout, max_size)
+        pymt_logger.debug('Cache: register <%s> with limit=%s, timeout=%ss, '
+            'max_size=%s' % (category, str(limit), str(timeout),
+                             str(max_size)))
 
     @staticmethod
-    def append(category, key, obj, timeout=None):
+    def append(category, key, obj, timeout=None, size=None):
         '''Add a new object in the cache.
 
         :Parameters:
@@ -63,23 +172,23 @@ class Cache(object):
                 Object to store in cache
             `timeout` : double (optionnal)
                 Custom time to delete the object if it's not used.
+            `size` : int (optionnal)
+                Size of the object in bytes. If None, the `cache_size`
+                attribute of the object is used, if available.
         '''
         try:
             cat = Cache._categories[category]
         except KeyError:
             pymt_logger.warning('Cache: category <%s> not exist' % category)
             return
-        timeout = timeout or cat['timeout']
-        # FIXME: activate purge when limit is hit
-        #limit = cat['limit']
-        #if limit is not None and len(Cache._objects[category]) >= limit:
-        #    Cache._purge_oldest(category)
-        Cache._objects[category][key] = {
-            'object': obj,
-            'timeout': timeout,
-            'lastaccess': getClock().get_time(),
-            'timestamp': getClock().get_time()
-        }
+        timeout = timeout or cat.timeout
+        if size is None:
+            size = Cache.get_object_size(obj)
+        entry = _CacheEntry(key, obj, timeout, size, getClock().get_time())
+        cat.add(entry)
+        cat.evict()
+        if timeout is not None:
+            Cache._schedule_expire(category, entry)
 
     @staticmethod
     def get(category, key, default=None):
@@ -94,10 +203,19 @@ class Cache(object):
                 Default value to be returned if key is not found
         '''
         try:
-            Cache._objects[category][key]['lastaccess'] = getClock().get_time()
-            return Cache._objects[category][key]['object']
-        except Exception:
+            cat = Cache._categories[category]
+        except KeyError:
+            return default
+        entry = cat.entries.get(key)
+        if entry is None:
+            cat.misses += 1
             return default
+        cat.hits += 1
+        entry.lastaccess = getClock().get_time()
+        # move the entry at the most recently used place
+        cat.unlink(entry)
+        cat.link(entry)
+        return entry.object
 
     @staticmethod
     def get_timestamp(category, key, default=None):
@@ -112,8 +230,8 @@ class Cache(object):
                 Default value to be returned if key is not found
         '''
         try:
-            return Cache._objects[category][key]['timestamp']
-        except Exception:
+            return Cache._categories[category].entries[key].timestamp
+        except KeyError:
             return default
 
     @staticmethod
@@ -129,10 +247,37 @@ class Cache(object):
                 Default value to be returned if key is not found
         '''
         try:
-            return Cache._objects[category][key]['lastaccess']
-        except Exception:
+            return Cache._categories[category].entries[key].lastaccess
+        except KeyError:
             return default
 
+    @staticmethod
+    def get_object_size(obj):
+        '''Return the size of an object in bytes, as used for the `max_size`
+        limit. Objects can report their size with a `cache_size` attribute,
+        otherwise 0 is returned.'''
+        try:
+            return int(obj.cache_size)
+        except Exception:
+            return 0
+
+    @staticmethod
+    def get_stats(category):
+        '''Return a dict with the usage of a category: count, size, limit,
+        max_size, timeout, hits, misses, evictions and expired.'''
+        cat = Cache._categories[category]
+        return {
+            'count': len(cat.entries),
+            'size': cat.size,
+            'limit': cat.limit,
+            'max_size': cat.max_size,
+            'timeout': cat.timeout,
+            'hits': cat.hits,
+            'misses': cat.misses,
+            'evictions': cat.evictions,
+            'expired': cat.expired,
+        }
+
     @staticmethod
     def remove(category, key=None):
         '''Purge the cache
@@ -144,79 +289,78 @@ class Cache(object):
                 Uniq identifier of the object to store
         '''
         try:
-            if key is not None:
-                del Cache._objects[category][key]
-            else:
-                Cache._objects[category] = {}
-        except Exception:
-            pass
+            cat = Cache._categories[category]
+        except KeyError:
+            return
+        if key is None:
+            cat.clear()
+            return
+        entry = cat.entries.get(key)
+        if entry is not None:
+            cat.discard(entry)
 
     @staticmethod
-    def _purge_oldest(category, maxpurge=1):
-        print 'PURGE', category
-        import heapq
-        heap_list = []
-        for key in Cache._objects[category]:
-            obj = Cache._objects[category][key]
-            if obj['lastaccess'] == obj['timestamp']:
-                continue
-            heapq.heappush(heap_list, (obj['lastaccess'], key))
-            print '<<<', obj['lastaccess']
-        n = 0
-        while n < maxpurge:
-            try:
-                lastaccess, key = heapq.heappop(heap_list)
-                print '=>', key, lastaccess, getClock().get_time()
-            except Exception:
-                return
-            del Cache._objects[category][key]
-
+    def _schedule_expire(category, entry, deadline=None):
+        # the records are (deadline, seq, category, entry): the sequence
+        # avoid to compare the entries. An entry have only one valid record,
+        # the one matching his deadline.
+        if deadline is None:
+            deadline = entry.lastaccess + entry.timeout
+        entry.deadline = deadline
+        heappush(Cache._expire_heap,
+                 (deadline, Cache._expire_seq.next(), category, entry))
 
     @staticmethod
     def _purge_by_timeout(dt):
-
+        # Only the expired deadlines are popped from the heap. When an entry
+        # have been accessed since the deadline was pushed, it's pushed again
+        # with his new deadline. The records of the entries removed or
+        # replaced in the cache are dropped.
         curtime = getClock().get_time()
 
-        for category in Cache._objects:
-
-            timeout = Cache._categories[category]['timeout']
-            if timeout is not None and dt > timeout:
-                # XXX got a lag ! that may be because the frame take lot of
-                # time to draw. and the timeout is not adapted to the current
-                # framerate. So, increase the timeout by two.
-                # ie: if the timeout is 1 sec, and framerate go to 0.7, newly
-                # object added will be automaticly trashed.
-                timeout *= 2
-                Cache._categories[category]['timeout'] = timeout
-                continue
-
-            for key in Cache._objects[category].keys()[:]:
-
-                lastaccess  = Cache._objects[category][key]['lastaccess']
-                objtimeout  = Cache._objects[category][key]['timeout']
-
-                # take the object timeout if available
-                if objtimeout is not None:
-                    timeout = objtimeout
-
-                # no timeout, cancel
-                if timeout is None:
-                    continue
+        # an object used during the last frame is never purged, even if the
+        # frame took more than the timeout to draw.
+        lastpurge = Cache._last_purge
+        Cache._last_purge = curtime
+        if lastpurge is None:
+            return
 
-                if curtime - lastaccess > timeout:
-                    del Cache._objects[category][key]
+        heap = Cache._expire_heap
+        categories = Cache._categories
+        while heap and heap[0][0] < curtime:
+            deadline, seq, category, entry = heappop(heap)
+            cat = categories.get(category)
+            if cat is None or cat.entries.get(entry.key) is not entry or \
+               entry.deadline != deadline:
+                continue
+            expire = entry.lastaccess + entry.timeout
+            if expire >= curtime or entry.lastaccess >= lastpurge:
+                Cache._schedule_expire(category, entry, max(expire, curtime))
+                continue
+            cat.discard(entry)
+            cat.expired += 1
+
+        # the records of the replaced entries are waiting for their deadline,
+        # compact the heap if they are the majority
+        live = sum([len(cat.entries) for cat in categories.itervalues()])
+        if len(heap) > live * 2 + 64:
+            heap[:] = [x for x in heap if x[3].deadline == x[0] and
+                       x[2] in categories and
+                       categories[x[2]].entries.get(x[3].key) is x[3]]
+            heapify(heap)
 
     @staticmethod
     def print_usage():
         '''Print the cache usage on the console'''
         print 'Cache usage :'
         for category in Cache._categories:
-            print ' * %s : %d / %s, timeout=%s' % (
-                category.capitalize(),
-                len(Cache._objects[category]),
-                str(Cache._categories[category]['limit']),
-                str(Cache._categories[category]['timeout'])
-            )
+            stats = Cache.get_stats(category)
+            print ' * %s : %d / %s, size=%d / %s, timeout=%s, ' \
+                  'hits=%d, misses=%d, evictions=%d, expired=%d' % (
+                category.capitalize(), stats['count'], str(stats['limit']),
+                stats['size'], str(stats['max_size']), str(stats['timeout']),
+                stats['hits'], stats['misses'], stats['evictions'],
+                stats['expired'])
 
 # install the schedule clock for purging
-getClock().schedule_interval(Cache._purge_by_timeout, 1)
+getClock().schedule_interval(Cache._purge_by_timeout, 0, background=True)
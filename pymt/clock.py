@@ -13,58 +13,96 @@ You can add new event like this ::
     getClock().schedule_once(my_callback, 5)
 
 If the callback return False, the schedule will be removed.
+
+The schedule functions return an handle, that can be used to cancel the event
+without searching for the callback ::
+
+    event = getClock().schedule_interval(my_callback, 0.5)
+    event.cancel()
+
+The events are stored in a heap, ordered by their next deadline. Only the
+events that must be called are looked at each frame.
+
+Housekeeping callbacks, that don't change anything visible, can be scheduled
+with `background=True`. They are not counted by get_last_calls(), used by the
+render on demand mode to know if the window must be drawn.
+
+You can profile the time spent in each callback, and print the result from a
+console ::
+
+    getClock().start_profile()
+    # ... later
+    getClock().print_profile()
 '''
 
 __all__ =  ('Clock', 'getClock')
 
 import time
+from heapq import heappush, heappop, heapify
 from pymt.weakmethod import WeakMethod
 
+
+def _callback_key(callback):
+    # key used to find events of a callback, without keeping a reference to
+    # the instance of a bound method
+    try:
+        return (callback.im_func, id(callback.im_self))
+    except AttributeError:
+        return callback
+
+
 class _Event(object):
 
-    def __init__(self, loop, callback, timeout, starttime):
+    __slots__ = ('clock', 'loop', 'callback', 'timeout', '_last_dt', '_dt',
+                 'cancelled', 'key', '_name', 'background')
+
+    def __init__(self, clock, loop, callback, timeout, starttime,
+                 background=False):
+        self.clock = clock
+        self.background = background
         self.loop = loop
         self.callback = WeakMethod(callback)
         self.timeout = timeout
         self._last_dt = starttime
         self._dt = 0.
+        self.cancelled = False
+        self.key = _callback_key(callback)
+        self._name = None
+
+    def cancel(self):
+        '''Cancel the event. It will be removed from the clock'''
+        self.clock._cancel_event(self)
+
+    @property
+    def deadline(self):
+        '''Time of the next call'''
+        return self._last_dt + self.timeout
+
+    @property
+    def name(self):
+        '''Name of the callback, used for profiling'''
+        if self._name is None:
+            func = self.callback._func
+            cls = self.callback._class
+            name = getattr(func, '__name__', repr(func))
+            if cls is not None:
+                name = '%s.%s' % (cls.__name__, name)
+            else:
+                name = '%s.%s' % (getattr(func, '__module__', '?'), name)
+            self._name = name
+        return self._name
 
     def do(self, dt):
         if self.callback.is_dead():
             return False
         self.callback()(dt)
 
-    def tick(self, curtime):
-        # timeout happen ?
-        if curtime - self._last_dt < self.timeout:
-            return True
-
-        # calculate current timediff for this event
-        self._dt = curtime - self._last_dt
-        self._last_dt = curtime
-
-        # call the callback
-        if self.callback.is_dead():
-            return False
-        ret = self.callback()(self._dt)
-
-        # if it's a once event, don't care about the result
-        # just remove the event
-        if not self.loop:
-            return False
-
-        # if user return an explicit false,
-        # remove the event
-        if ret == False:
-            return False
-
-        return True
-
 
 class Clock(object):
     '''A clock object, that support events'''
     __slots__ = ('_dt', '_last_fps_tick', '_last_tick', '_fps',
-            '_fps_counter', '_events')
+            '_fps_counter', '_events', '_callbacks', '_seq', '_cancelled',
+            '_profile', '_profile_callback', '_calls')
 
     def __init__(self):
         self._dt = 0
@@ -72,7 +110,15 @@ class Clock(object):
         self._fps = 0
         self._fps_counter = 0
         self._last_fps_tick = None
+        # heap of (deadline, seq, event)
         self._events = []
+        # events per callback key, for unschedule()
+        self._callbacks = {}
+        self._seq = 0
+        self._cancelled = 0
+        self._profile = None
+        self._profile_callback = None
+        self._calls = 0
 
     def tick(self):
         '''Advance clock to the next step. Must be called every frame.
@@ -104,28 +150,168 @@ class Clock(object):
         '''Get the last tick made by the clock'''
         return self._last_tick
 
-    def schedule_once(self, callback, timeout=0):
-        '''Schedule an event in <timeout> seconds'''
-        event = _Event(False, callback, timeout, self._last_tick)
-        self._events.append(event)
+    def get_last_calls(self):
+        '''Get the number of callbacks called during the last tick, without
+        the background callbacks'''
+        return self._calls
+
+    def schedule_once(self, callback, timeout=0, background=False):
+        '''Schedule an event in <timeout> seconds.
+        Return an event, that can be cancelled with event.cancel()
+
+        A `background` callback doesn't change anything visible: the window
+        is not drawn again for it in render on demand mode.'''
+        event = _Event(self, False, callback, timeout, self._last_tick,
+                       background)
+        self._add_event(event)
         return event
 
-    def schedule_interval(self, callback, timeout):
-        '''Schedule a event to be call every <timeout> seconds'''
-        event = _Event(True, callback, timeout, self._last_tick)
-        self._events.append(event)
+    def schedule_interval(self, callback, timeout, background=False):
+        '''Schedule a event to be call every <timeout> seconds.
+        Return an event, that can be cancelled with event.cancel()
+        (see schedule_once() for `background`)'''
+        event = _Event(self, True, callback, timeout, self._last_tick,
+                       background)
+        self._add_event(event)
         return event
 
     def unschedule(self, callback):
-        '''Remove a previous schedule event'''
-        self._events = [x for x in self._events if x.callback() != callback]
+        '''Remove a previous schedule event. `callback` can be the callback
+        function, or the event returned by the schedule functions.'''
+        if isinstance(callback, _Event):
+            self._cancel_event(callback)
+            return
+        events = self._callbacks.get(_callback_key(callback))
+        if not events:
+            return
+        for event in events[:]:
+            if event.callback() == callback:
+                self._cancel_event(event)
+
+    def _add_event(self, event):
+        self._seq += 1
+        heappush(self._events, (event.deadline, self._seq, event))
+        key = event.key
+        if key in self._callbacks:
+            self._callbacks[key].append(event)
+        else:
+            self._callbacks[key] = [event]
+
+    def _cancel_event(self, event):
+        # the event is removed from the heap when it's due, or when too
+        # many events are cancelled.
+        if event.cancelled:
+            return
+        event.cancelled = True
+        self._forget_event(event)
+        self._cancelled += 1
+        if self._cancelled > 64 and self._cancelled > len(self._events) / 2:
+            self._events = [x for x in self._events if not x[2].cancelled]
+            heapify(self._events)
+            self._cancelled = 0
+
+    def _forget_event(self, event):
+        events = self._callbacks.get(event.key)
+        if events is None:
+            return
+        if event in events:
+            events.remove(event)
+        if not events:
+            del self._callbacks[event.key]
 
     def _process_events(self):
-        for event in self._events[:]:
-            if event.tick(self._last_tick) == False:
-                # event may be already removed by the callback
-                if event in self._events:
-                    self._events.remove(event)
+        heap = self._events
+        curtime = self._last_tick
+
+        # take all the due events first: the events scheduled by the
+        # callbacks will be processed on the next tick.
+        due = []
+        while heap and heap[0][0] <= curtime:
+            due.append(heappop(heap)[2])
+
+        profile = self._profile
+        profile_callback = self._profile_callback
+        self._calls = 0
+        for event in due:
+            if event.cancelled:
+                if self._cancelled > 0:
+                    self._cancelled -= 1
+                continue
+            if event.callback.is_dead():
+                event.cancelled = True
+                self._forget_event(event)
+                continue
+
+            # calculate current timediff for this event
+            event._dt = curtime - event._last_dt
+            event._last_dt = curtime
+
+            # reschedule before calling, the callback can cancel it.
+            if event.loop:
+                self._seq += 1
+                heappush(self._events, (event.deadline, self._seq, event))
+            else:
+                event.cancelled = True
+                self._forget_event(event)
+
+            if not event.background:
+                self._calls += 1
+            if profile is None and profile_callback is None:
+                ret = event.callback()(event._dt)
+            else:
+                start = time.time()
+                ret = event.callback()(event._dt)
+                duration = time.time() - start
+                if profile is not None:
+                    self._profile_add(event.name, duration)
+                if profile_callback is not None:
+                    profile_callback(event.name, start, duration)
+
+            # if user return an explicit false, remove the event
+            if ret == False and event.loop and not event.cancelled:
+                self._cancel_event(event)
+
+    def _profile_add(self, name, duration):
+        stats = self._profile.get(name)
+        if stats is None:
+            self._profile[name] = [1, duration, duration]
+            return
+        stats[0] += 1
+        stats[1] += duration
+        if duration > stats[2]:
+            stats[2] = duration
+
+    def start_profile(self):
+        '''Start to record the time spent in each scheduled callback'''
+        self._profile = {}
+
+    def stop_profile(self):
+        '''Stop the profiling, and return the profile (see get_profile())'''
+        profile = self.get_profile()
+        self._profile = None
+        return profile
+
+    def set_profile_callback(self, callback):
+        '''Set a function called with (name, start, duration) after each
+        scheduled callback, or None to remove it'''
+        self._profile_callback = callback
+
+    def get_profile(self):
+        '''Return a dict of callback name -> (calls, total time, max time)'''
+        if self._profile is None:
+            return {}
+        return dict((name, tuple(stats))
+                    for name, stats in self._profile.iteritems())
+
+    def print_profile(self):
+        '''Print the callback profile on the console, ordered by total time'''
+        profile = self.get_profile().items()
+        profile.sort(key=lambda x: x[1][1], reverse=True)
+        print 'Clock profile :'
+        for name, (calls, total, maxtime) in profile:
+            print ' * %-50s calls=%-6d total=%.3fms avg=%.3fms max=%.3fms' % (
+                name, calls, total * 1000., total * 1000. / calls,
+                maxtime * 1000.)
 
 
 # create a default clock
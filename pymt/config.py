@@ -11,7 +11,7 @@ from pymt.logger import pymt_logger
 from pymt import pymt_home_dir, pymt_config_fn, logger
 
 # Version number of current configuration format
-PYMT_CONFIG_VERSION = 12
+PYMT_CONFIG_VERSION = 15
 
 #: PyMT configuration object
 pymt_config = None
@@ -155,6 +155,22 @@ if not 'PYMT_DOC_INCLUDE' in os.environ:
 
         elif pymt_config_version == 11:
             pymt_config.setdefault('graphics', 'window_icon', os.path.join(pymt_home_dir, 'icon', 'pymt32.png') )
+
+        elif pymt_config_version == 12:
+            # add input queue coalescing
+            pymt_config.setdefault('pymt', 'input_coalescing', 'last')
+            pymt_config.setdefault('pymt', 'input_max_events', '0')
+
+        elif pymt_config_version == 13:
+            # add texture atlas for small images
+            pymt_config.setdefault('graphics', 'image_atlas_size', '64')
+            pymt_config.setdefault('graphics', 'image_atlas_pages', '4')
+
+        elif pymt_config_version == 14:
+            # add render on demand
+            pymt_config.setdefault('pymt', 'render_on_demand', '0')
+            pymt_config.setdefault('pymt', 'max_fps', '60')
+
         else:
             # for future.
             break
@@ -4,6 +4,10 @@ Core: providers for image, text, video, audio, camera...
 
 import os
 import pymt
+from pymt.lazy import install_lazy_module
+
+# the providers are selected when their module is imported
+install_lazy_module(__name__)
 
 if 'PYMT_DOC' in os.environ:
     # stub for sphinx generation
@@ -64,15 +68,3 @@ else:
                 pymt.pymt_logger.warning('%s: Unable to use <%s> as loader!' %
                     (category.capitalize(), option))
                 pymt.pymt_logger.debug('', exc_info=e)
-
-
-from pymt.core.audio import *
-from pymt.core.camera import *
-from pymt.core.image import *
-from pymt.core.text import *
-from pymt.core.video import *
-from pymt.core.svg import *
-from pymt.core.spelling import *
-
-# only after core loading, load extensions
-from text.markup import *
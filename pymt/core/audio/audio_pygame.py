@@ -48,7 +48,8 @@ class SoundPygame(Sound):
             return
         self._channel = self._data.play()
         # schedule event to check if the sound is still playing or not
-        pymt.getClock().schedule_interval(self._check_play, 0.1)
+        pymt.getClock().schedule_interval(self._check_play, 0.1,
+                                          background=True)
         super(SoundPygame, self).play()
 
     def stop(self):
@@ -35,14 +35,17 @@ class ImageLoaderBase(object):
     '''Base to implement an image loader.'''
 
     __slots__ = ('_texture', '_data', 'filename', 'keep_data',
-                '_texture_rectangle', '_texture_mipmap')
+                '_texture_rectangle', '_texture_mipmap', '_atlas',
+                '_atlas_key')
 
     def __init__(self, filename, **kwargs):
         self._texture_rectangle = kwargs.get('texture_rectangle', True)
         self._texture_mipmap = kwargs.get('texture_mipmap', False)
+        self._atlas = kwargs.get('atlas', False)
         self.keep_data  = kwargs.get('keep_data', False)
         self.filename   = filename
         self._texture   = None
+        self._atlas_key = None
         self._data      = self.load(filename)
 
     def load(self, filename):
@@ -62,10 +65,29 @@ class ImageLoaderBase(object):
     size = property(_get_size,
                    doc='Image size (width, height)')
 
+    @property
+    def cache_size(self):
+        '''Size of the image pixels in bytes, used by the Cache'''
+        if self._data is None:
+            return 0
+        return self._data.width * self._data.height * 4
+
     def _get_texture(self):
+        if self._atlas_key is not None:
+            # the page of the image may have been cleared, upload it again
+            texture = image_atlas.get(self._atlas_key)
+            if texture is None:
+                texture = image_atlas.add(self._atlas_key, self._data)
+            return texture
         if self._texture is None:
             if self._data is None:
                 return None
+            # small images are stored in a shared texture if asked. They keep
+            # their data, to be uploaded again if their page is cleared.
+            if self._atlas and image_atlas is not None and \
+               not self._texture_mipmap and image_atlas.accept(self._data):
+                self._atlas_key = image_atlas.new_key()
+                return image_atlas.add(self._atlas_key, self._data)
             self._texture = Texture.create_from_data( self._data,
                                 rectangle=self._texture_rectangle,
                                 mipmap=self._texture_mipmap)
@@ -129,11 +151,17 @@ class Image(BaseObject):
             power of 2 size for texture)
         `texture_mipmap` : bool, default to False
             Create mipmap for the texture
+        `atlas` : bool, default to False
+            Store the image in the shared texture atlas if it's small enough
+            (see :mod:`pymt.core.image.atlas`). Use it only for images drawn
+            with :meth:`draw`, or when the texture is fetched again at each
+            use: the region of the image can be moved when a page is cleared.
+            The texture can't be used for point sprites or repeated.
     '''
 
     copy_attributes = ('opacity', 'scale', 'anchor_x', 'anchor_y', '_pos',
                        '_size', '_filename', 'color', '_texture', '_image',
-                       '_texture_rectangle', '_texture_mipmap')
+                       '_texture_rectangle', '_texture_mipmap', '_atlas')
 
     def __init__(self, arg, **kwargs):
         kwargs.setdefault('keep_data', False)
@@ -142,6 +170,7 @@ class Image(BaseObject):
 
         self._texture_rectangle = kwargs.get('texture_rectangle', True)
         self._texture_mipmap    = kwargs.get('texture_mipmap', False)
+        self._atlas     = kwargs.get('atlas', False)
         self._keep_data = kwargs.get('keep_data')
         self._image     = None
         self._filename  = None
@@ -220,7 +249,8 @@ class Image(BaseObject):
         self.image     = ImageLoader.load(
                 self._filename, keep_data=self._keep_data,
                 texture_rectangle=self._texture_rectangle,
-                texture_mipmap=self._texture_mipmap)
+                texture_mipmap=self._texture_mipmap,
+                atlas=self._atlas)
     filename = property(_get_filename, _set_filename,
             doc='Get/set the filename of image')
 
@@ -237,6 +267,15 @@ class Image(BaseObject):
             return self.image.texture
         return self._texture
 
+    @property
+    def cache_size(self):
+        '''Size of the image pixels in bytes, used by the Cache'''
+        if self.image:
+            return self.image.cache_size
+        if self._texture:
+            return self._texture.cache_size
+        return 0
+
     def draw(self):
         '''Draw the image on screen'''
         imgpos = (int(self.x - self.anchor_x * self.scale),
@@ -290,6 +329,9 @@ def load(filename):
     '''Load an image'''
     return Image.load(filename)
 
+# default atlas for the small images
+from pymt.core.image.atlas import image_atlas
+
 # load image loaders
 core_register_libs('image', (
     ('pygame', 'img_pygame'),
@@ -0,0 +1,249 @@
+'''
+Atlas: store small images in shared textures
+
+Each image have usually his own texture, and drawing 300 icons bind 300
+textures. The images loaded with `atlas=True` and smaller than
+`max_image_size` are packed in a few big textures (pages) instead, and their
+texture is a TextureRegion of a page. Consecutive images in the same page are
+drawn without changing the texture. The atlas is used by the icons of the
+widgets: an image must not keep his texture, or use it for point sprites or
+repeated textures ::
+
+    icon = Image('icon.png', atlas=True)
+
+When all the pages are full, the least recently used page is cleared, and the
+images of that page are uploaded again on their next use.
+
+The size limit is configurable in the [graphics] section: `image_atlas_size`
+(0 to disable the atlas) and `image_atlas_pages`.
+'''
+
+__all__ = ('AtlasPacker', 'TextureAtlas', 'image_atlas')
+
+import pymt
+from numpy import frombuffer, pad, uint8
+from pymt.core.image import ImageData
+
+
+class AtlasPacker(object):
+    '''Pack rectangles in a fixed size area, in rows (shelves). A rectangle
+    goes in the lowest shelf where it fits (best fit on the height), a new
+    shelf is opened only when no shelf can take it. Unlike
+    :class:`~pymt.core.text.atlas.ShelfPacker`, the previous shelves are not
+    closed, which is better for images of different sizes.
+
+    :Parameters:
+        `width` : int
+            Width of the area
+        `height` : int
+            Height of the area
+        `margin` : int, default to 0
+            Space left around each rectangle
+    '''
+
+    __slots__ = ('width', 'height', 'margin', 'used', '_shelves', '_y')
+
+    def __init__(self, width, height, margin=0):
+        self.width = width
+        self.height = height
+        self.margin = margin
+        #: Area used by the rectangles (without margin)
+        self.used = 0
+        # list of [y, height, x]
+        self._shelves = []
+        self._y = 0
+
+    def insert(self, width, height):
+        '''Reserve a rectangle, and return his (x, y) position. Return None
+        if the area is full.'''
+        w = width + self.margin
+        h = height + self.margin
+        if w > self.width or h > self.height:
+            return None
+        best = None
+        for shelf in self._shelves:
+            if h <= shelf[1] and shelf[2] + w <= self.width:
+                if best is None or shelf[1] < best[1]:
+                    best = shelf
+        if best is None:
+            if self._y + h > self.height:
+                return None
+            best = [self._y, h, 0]
+            self._shelves.append(best)
+            self._y += h
+        x, y = best[2], best[0]
+        best[2] += w
+        self.used += width * height
+        return x, y
+
+    def clear(self):
+        '''Remove all the rectangles'''
+        self._shelves = []
+        self._y = 0
+        self.used = 0
+
+    @property
+    def efficiency(self):
+        '''Ratio of the area used by the rectangles'''
+        return self.used / float(self.width * self.height)
+
+
+class _AtlasPage(object):
+    __slots__ = ('texture', 'packer', 'keys', 'last_use')
+
+    def __init__(self, texture, packer):
+        self.texture = texture
+        self.packer = packer
+        self.keys = []
+        self.last_use = 0
+
+
+def _extrude(data, border):
+    '''Return the image data with the border pixels repeated around, to
+    avoid the bleeding of the neighbours when the texture is filtered'''
+    channels = 3 if data.mode in ('RGB', 'BGR') else 4
+    w, h = data.width, data.height
+    pixels = frombuffer(data.data, dtype=uint8)[:w * h * channels]
+    pixels = pad(pixels.reshape(h, w, channels),
+                 ((border, border), (border, border), (0, 0)), mode='edge')
+    return ImageData(w + border * 2, h + border * 2, data.mode,
+                     pixels.tostring())
+
+
+class TextureAtlas(object):
+    '''Small images packed in shared textures.
+
+    :Parameters:
+        `page_size` : int, default to 1024
+            Size of a page texture (must be a power of 2)
+        `max_pages` : int, default to 4
+            Maximum number of pages. When they are all full, the least
+            recently used page is cleared.
+        `max_image_size` : int, default to 64
+            Images larger than this (in width or height) are not accepted
+        `border` : int, default to 1
+            Number of pixels repeated around each image
+    '''
+
+    def __init__(self, page_size=1024, max_pages=4, max_image_size=64,
+                 border=1):
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.max_image_size = max_image_size
+        self.border = border
+        self.pages = []
+        self.evictions = 0
+        # key -> (page, region)
+        self._regions = {}
+        self._access = 0
+        self._key = 0
+
+    def _touch(self, page):
+        self._access += 1
+        page.last_use = self._access
+
+    def _create_page(self):
+        '''Create a new page'''
+        texture = pymt.Texture.create(self.page_size, self.page_size)
+        return _AtlasPage(texture, AtlasPacker(self.page_size, self.page_size))
+
+    def _upload(self, page, data, x, y):
+        '''Copy an image in a page'''
+        page.texture.blit_data(data, pos=(x, y))
+
+    def _get_region(self, page, x, y, width, height):
+        return page.texture.get_region(x, y, width, height)
+
+    def new_key(self):
+        '''Return a new key for an image'''
+        self._key += 1
+        return self._key
+
+    def accept(self, data):
+        '''Return True if the image data can be stored in the atlas'''
+        return data.data is not None and \
+                data.width <= self.max_image_size and \
+                data.height <= self.max_image_size
+
+    def get(self, key):
+        '''Return the texture region of an image, or None if the image is not
+        in the atlas (never added, or removed with his page)'''
+        entry = self._regions.get(key)
+        if entry is None:
+            return None
+        self._touch(entry[0])
+        return entry[1]
+
+    def add(self, key, data):
+        '''Store an image data, and return his texture region. Return None
+        if the image is not accepted.'''
+        if not self.accept(data):
+            return None
+        border = self.border
+        width = data.width + border * 2
+        height = data.height + border * 2
+
+        # try the last used pages first
+        page = pos = None
+        for page in sorted(self.pages, key=lambda x: -x.last_use):
+            pos = page.packer.insert(width, height)
+            if pos is not None:
+                break
+        if pos is None:
+            if len(self.pages) < self.max_pages:
+                page = self._create_page()
+                self.pages.append(page)
+            else:
+                page = min(self.pages, key=lambda x: x.last_use)
+                self._clear_page(page)
+                self.evictions += 1
+            pos = page.packer.insert(width, height)
+
+        x, y = pos
+        if border:
+            data = _extrude(data, border)
+        self._upload(page, data, x, y)
+        region = self._get_region(page, x + border, y + border,
+                                  width - border * 2, height - border * 2)
+        self.remove(key)
+        page.keys.append(key)
+        self._regions[key] = (page, region)
+        self._touch(page)
+        return region
+
+    def remove(self, key):
+        '''Forget an image (his space is reused only when the page is
+        cleared)'''
+        entry = self._regions.pop(key, None)
+        if entry is not None:
+            entry[0].keys.remove(key)
+
+    def _clear_page(self, page):
+        for key in page.keys:
+            del self._regions[key]
+        page.keys = []
+        page.packer.clear()
+
+    def clear(self):
+        '''Remove all the images and pages'''
+        self.pages = []
+        self._regions = {}
+
+    def get_stats(self):
+        '''Return a dict with the number of pages, images, evictions and the
+        packing efficiency of the pages'''
+        used = sum([page.packer.used for page in self.pages])
+        area = len(self.pages) * self.page_size ** 2
+        return {'pages': len(self.pages), 'images': len(self._regions),
+                'evictions': self.evictions,
+                'efficiency': used / float(area) if area else 0.}
+
+
+#: Default atlas used by the images, None if disabled in the configuration
+image_atlas = None
+if pymt.pymt_config:
+    if pymt.pymt_config.getint('graphics', 'image_atlas_size') > 0:
+        image_atlas = TextureAtlas(
+            max_pages=pymt.pymt_config.getint('graphics', 'image_atlas_pages'),
+            max_image_size=pymt.pymt_config.getint(
+                'graphics', 'image_atlas_size'))
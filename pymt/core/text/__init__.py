@@ -5,9 +5,16 @@ Text: Handle drawing of text
 __all__ = ('LabelBase', 'Label')
 
 import pymt
-import re
 import os
+from numpy import array, empty, maximum, minimum
+from OpenGL.GL import GL_VERTEX_ARRAY, GL_TEXTURE_COORD_ARRAY, GL_FLOAT, \
+        GL_QUADS, GL_CLIENT_VERTEX_ARRAY_BIT, glPushClientAttrib, \
+        glPopClientAttrib, glEnableClientState, glVertexPointer, \
+        glTexCoordPointer, glDrawArrays, glPushMatrix, glPopMatrix, \
+        glTranslatef
 from pymt.core import core_select_lib
+from pymt.core.text.atlas import GlyphAtlas
+from pymt.core.text.layout import TextLayout
 from pymt.baseobject import BaseObject
 
 DEFAULT_FONT = 'Liberation Sans,Bitstream Vera Sans,Free Sans,Arial, Sans'
@@ -62,9 +69,17 @@ class LabelBase(BaseObject):
             100), the drawing will not go outside the viewport, but start from
             (0, 0). 
             If you want to draw another part of the texture, use `viewport_pos`.
+        `mode`: str, default to "texture"
+            Can be "texture" or "atlas". In texture mode, the label is
+            rasterized in his own texture. In atlas mode, the glyphs are
+            rasterized once per font in textures shared by all the labels
+            (see `pymt.core.text.atlas`), and the label is drawn with one
+            quad per glyph. Changing the text is cheap, but the kerning
+            between glyphs is lost.
     '''
 
-    __slots__ = ('options', 'texture', '_label', 'color', 'usersize')
+    __slots__ = ('options', 'texture', '_label', 'color', 'usersize',
+                 '_glyph_quads', '_atlas_arrays', '_content_size', '_layout')
 
     _cache_glyphs = {}
 
@@ -84,6 +99,7 @@ class LabelBase(BaseObject):
         kwargs.setdefault('color', (1, 1, 1, 1))
         kwargs.setdefault('viewport_size', None)
         kwargs.setdefault('viewport_pos', None)
+        kwargs.setdefault('mode', 'texture')
 
         padding = kwargs.get('padding', None)
         if not kwargs.get('padding_x', None):
@@ -108,6 +124,10 @@ class LabelBase(BaseObject):
         super(LabelBase, self).__init__(**kwargs)
 
         self._label     = None
+        self._glyph_quads = None
+        self._atlas_arrays = None
+        self._content_size = (0, 0)
+        self._layout = None
 
         self.color      = kwargs.get('color')
         self.usersize   = kwargs.get('size')
@@ -144,11 +164,149 @@ class LabelBase(BaseObject):
     def _render_end(self):
         pass
 
+    def _rasterize(self, text):
+        '''(internal) Rasterize a text alone in white, return the image
+        data. Used to fill the glyph atlas.'''
+        w, h = self.get_extents(text)
+        size = self._size
+        color = self.options['color']
+        self._size = max(1, int(w)), max(1, int(h))
+        self.options['color'] = (1, 1, 1, 1)
+        try:
+            self._render_begin()
+            self._render_text(text, 0, 0)
+            return self._render_end()
+        finally:
+            self._size = size
+            self.options['color'] = color
+
+    def _atlas_render_text(self, text, x, y):
+        '''(internal) Add the quads of a text in atlas mode'''
+        fontid = self.fontid
+        if not fontid in self._cache_glyphs:
+            self._cache_glyphs[fontid] = {}
+        cache = self._cache_glyphs[fontid]
+        atlas = GlyphAtlas.get(fontid)
+        quads = self._glyph_quads
+        for glyph in text:
+            if not glyph in cache:
+                cache[glyph] = self.get_extents(glyph)
+            gw, gh = cache[glyph]
+            if glyph not in (' ', '\n') and gw > 0:
+                quads.append((x, y, atlas.get_glyph(glyph, self)))
+            x += gw
+
+    def _atlas_build(self):
+        '''(internal) Build the arrays of the quads, for each atlas page'''
+        pages = {}
+        for x, y, info in self._glyph_quads:
+            page, u1, v1, u2, v2, gw, gh = info
+            if page not in pages:
+                pages[page] = ([], [])
+            pages[page][0].append((x, y, x + gw, y + gh))
+            pages[page][1].append((u1, v1, u2, v2))
+        self._glyph_quads = None
+
+        atlas = GlyphAtlas.get(self.fontid)
+        height = self.height
+        arrays = []
+        for page, (rects, uvs) in pages.iteritems():
+            rects = array(rects, dtype='float32')
+            uvs = array(uvs, dtype='float32')
+            vertices, texcoords = self._atlas_vertices(rects, uvs, 0, 0, height)
+            arrays.append((atlas.pages[page][0], rects, uvs,
+                           vertices, texcoords))
+        self._atlas_arrays = arrays
+
+    def _atlas_vertices(self, rects, uvs, ox, oy, height):
+        '''(internal) Return the vertices and tex coords of quads, the rects
+        being in label coordinates (from the top), with (ox, oy) the top-left
+        corner of the visible part.'''
+        n = len(rects)
+        x1 = rects[:, 0] - ox
+        x2 = rects[:, 2] - ox
+        y1 = height - (rects[:, 3] - oy)
+        y2 = height - (rects[:, 1] - oy)
+        u1, v1, u2, v2 = uvs[:, 0], uvs[:, 1], uvs[:, 2], uvs[:, 3]
+        vertices = empty((n, 8), dtype='float32')
+        texcoords = empty((n, 8), dtype='float32')
+        # bottom-left, bottom-right, top-right, top-left
+        vertices[:, 0] = x1; vertices[:, 1] = y1
+        vertices[:, 2] = x2; vertices[:, 3] = y1
+        vertices[:, 4] = x2; vertices[:, 5] = y2
+        vertices[:, 6] = x1; vertices[:, 7] = y2
+        texcoords[:, 0] = u1; texcoords[:, 1] = v2
+        texcoords[:, 2] = u2; texcoords[:, 3] = v2
+        texcoords[:, 4] = u2; texcoords[:, 5] = v1
+        texcoords[:, 6] = u1; texcoords[:, 7] = v1
+        return vertices.reshape(-1), texcoords.reshape(-1)
+
+    def _atlas_clip(self, rects, uvs, x1, y1, x2, y2):
+        '''(internal) Clip the quads in the (x1, y1, x2, y2) rectangle, and
+        adjust their tex coords.'''
+        cx1 = maximum(rects[:, 0], x1)
+        cy1 = maximum(rects[:, 1], y1)
+        cx2 = minimum(rects[:, 2], x2)
+        cy2 = minimum(rects[:, 3], y2)
+        keep = (cx1 < cx2) & (cy1 < cy2)
+        rects = rects[keep]
+        uvs = uvs[keep]
+        cx1, cy1, cx2, cy2 = cx1[keep], cy1[keep], cx2[keep], cy2[keep]
+        su = (uvs[:, 2] - uvs[:, 0]) / (rects[:, 2] - rects[:, 0])
+        sv = (uvs[:, 3] - uvs[:, 1]) / (rects[:, 3] - rects[:, 1])
+        out = empty(uvs.shape, dtype='float32')
+        out[:, 0] = uvs[:, 0] + (cx1 - rects[:, 0]) * su
+        out[:, 1] = uvs[:, 1] + (cy1 - rects[:, 1]) * sv
+        out[:, 2] = uvs[:, 0] + (cx2 - rects[:, 0]) * su
+        out[:, 3] = uvs[:, 1] + (cy2 - rects[:, 1]) * sv
+        clipped = empty(rects.shape, dtype='float32')
+        clipped[:, 0] = cx1
+        clipped[:, 1] = cy1
+        clipped[:, 2] = cx2
+        clipped[:, 3] = cy2
+        return clipped, out
+
+    def _draw_atlas(self, x, y):
+        '''(internal) Draw the label quads in atlas mode'''
+        color = self.options['color']
+        alpha = 1
+        if len(color) > 3:
+            alpha = color[3]
+        pymt.set_color(color[0], color[1], color[2], alpha, blend=True)
+
+        cw, ch = self._content_size
+        viewport_size = self.viewport_size
+        glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+        glPushMatrix()
+        glTranslatef(int(x), int(y), 0)
+        for texture, rects, uvs, vertices, texcoords in self._atlas_arrays:
+            if viewport_size:
+                vw, vh = viewport_size
+                ox, oy = self.viewport_pos or (0, 0)
+                dw, dh = min(vw, cw), min(vh, ch)
+                crects, cuvs = self._atlas_clip(rects, uvs,
+                                                ox, oy, ox + dw, oy + dh)
+                if not len(crects):
+                    continue
+                vertices, texcoords = self._atlas_vertices(
+                    crects, cuvs, ox, oy, dh)
+            texture.enable()
+            texture.bind()
+            glVertexPointer(2, GL_FLOAT, 0, vertices)
+            glTexCoordPointer(2, GL_FLOAT, 0, texcoords)
+            glDrawArrays(GL_QUADS, 0, len(vertices) / 2)
+            texture.disable()
+        glPopMatrix()
+        glPopClientAttrib()
+
     def render(self, real=False):
         '''Return a tuple(width, height) to create the image
         with the user constraints.
 
-        2 differents methods are used:
+        The lines come from the label layout (see `layout`), so the text is
+        only cut once for both passes. 2 differents methods are used:
           * if user don't set width, splitting line
             and calculate max width + height
           * if user set a width, blit per glyph
@@ -156,104 +314,47 @@ class LabelBase(BaseObject):
 
         uw, uh = self.usersize
         w, h = 0, 0
-        x, y = 0, 0
-        if real:
-            self._render_begin()
-
-        # no width specified, faster method
-        if uw is None:
-            for line in self.label.split('\n'):
-                lw, lh = self.get_extents(line)
-                if real:
-                    x = 0
-                    if self.options['halign'] == 'center':
-                        x = int((self.width - lw) / 2.)
-                    elif self.options['halign'] == 'right':
-                        x = int(self.width - lw)
-                    self._render_text(line, x, y)
-                    y += int(lh)
-                else:
+        layout = self.layout
+        lines = layout.lines
+        if not real:
+            # first pass, only the size is needed
+            if uw is None:
+                for start, end, lw, lh in lines:
                     w = max(w, int(lw))
                     h += int(lh)
+            else:
+                w = uw
+                h = layout.content_height
 
-        # constraint
         else:
-            # precalculate id/name
-            if not self.fontid in self._cache_glyphs:
-                self._cache_glyphs[self.fontid] = {}
-            cache = self._cache_glyphs[self.fontid]
-
-            if not real:
-                # verify that each glyph have size
-                glyphs = list(set(self.label))
-                for glyph in glyphs:
-                    if not glyph in cache:
-                        cache[glyph] = self.get_extents(glyph)
-
-            # first, split lines
-            glyphs = []
-            lines = []
-            lw = lh = 0
-            for word in re.split(r'( |\n)', self.label):
-
-                # calculate the word width
-                ww, wh = 0, 0
-                for glyph in word:
-                    gw, gh = cache[glyph]
-                    ww += gw
-                    wh = max(gh, wh)
-
-                # is the word fit on the uw ?
-                if ww > uw:
-                    lines.append(((ww, wh), word))
-                    lw = lh = x = 0
-                    continue
-
-                # get the maximum height for this line
-                lh = max(wh, lh)
-
-                # is the word fit on the line ?
-                if (word == '\n' or x + ww > uw) and lw != 0:
-
-                    # no, push actuals glyph
-                    lines.append(((lw, lh), glyphs))
-                    glyphs = []
-
-                    # reset size
-                    lw = lh = x = 0
-
-                    # new line ? don't render
-                    if word == '\n':
-                        continue
-
-                # advance the width
-                lw += ww
-                x  += ww
-                lh = max(wh, lh)
-                glyphs += list(word)
-
-            # got some char left ?
-            if lw != 0:
-                lines.append(((lw, lh), glyphs))
-
-            if not real:
-                h = sum([size[1] for size, glyphs in lines])
-                w = uw
+            atlas = self.options['mode'] == 'atlas'
+            if atlas:
+                self._glyph_quads = []
+                render_text = self._atlas_render_text
             else:
-                # really render now.
-                y = 0
-                for size, glyphs in lines:
-                    x = 0
-                    if self.options['halign'] == 'center':
-                        x = int((self.width - size[0]) / 2.)
-                    elif self.options['halign'] == 'right':
-                        x = int(self.width - size[0])
-                    for glyph in glyphs:
-                        lw, lh = cache[glyph]
-                        if glyph != '\n':
-                            self._render_text(glyph, x, y)
-                        x += lw
-                    y += size[1]
+                self._render_begin()
+                render_text = self._render_text
+
+            label = self.label
+            halign = self.options['halign']
+            extents = layout.get_word_extents
+            y = 0
+            for start, end, lw, lh in lines:
+                x = 0
+                if halign == 'center':
+                    x = int((self.width - lw) / 2.)
+                elif halign == 'right':
+                    x = int(self.width - lw)
+                if uw is None:
+                    # no width specified, faster method
+                    render_text(label[start:end], x, y)
+                    y += int(lh)
+                    continue
+                # constraint, blit per glyph
+                for glyph in label[start:end]:
+                    render_text(glyph, x, y)
+                    x += extents(glyph)[0]
+                y += lh
 
         if not real:
             # was only the first pass
@@ -262,6 +363,13 @@ class LabelBase(BaseObject):
             h = int(max(h, 1))
             return w, h
 
+        self._content_size = self.size
+        if atlas:
+            # no texture, the quads are drawn from the glyph atlas
+            self.texture = None
+            self._atlas_build()
+            return
+
         # get data from provider
         data = self._render_end()
         assert(data)
@@ -282,7 +390,8 @@ class LabelBase(BaseObject):
 
     def refresh(self):
         '''Force re-rendering of the label'''
-        # first pass, calculating width/height
+        # first pass, calculating width/height. The lines are kept in the
+        # layout, and reused for the second pass.
         sz = self.render()
         self._size = sz
         # second pass, render for real
@@ -292,7 +401,7 @@ class LabelBase(BaseObject):
 
     def draw(self):
         '''Draw the label'''
-        if self.texture is None:
+        if self.texture is None and self._atlas_arrays is None:
             return
         if not len(self.label):
             # it's a empty label, don't waste time to draw it
@@ -332,6 +441,10 @@ class LabelBase(BaseObject):
         elif anchor_y == 'top':
             y -= h - padding_y
 
+        if self._atlas_arrays is not None:
+            self._draw_atlas(x, y)
+            return
+
         alpha = 1
         if len(self.options['color']) > 3:
             alpha = self.options['color'][3]
@@ -391,6 +504,8 @@ class LabelBase(BaseObject):
     @property
     def content_width(self):
         '''Return the content width'''
+        if self._atlas_arrays is not None:
+            return self._content_size[0] + 2 * self.options['padding_x']
         if self.texture is None:
             return 0
         return self.texture.width + 2 * self.options['padding_x']
@@ -398,6 +513,8 @@ class LabelBase(BaseObject):
     @property
     def content_height(self):
         '''Return the content height'''
+        if self._atlas_arrays is not None:
+            return self._content_size[1] + 2 * self.options['padding_y']
         if self.texture is None:
             return 0
         return self.texture.height + 2 * self.options['padding_y']
@@ -405,10 +522,31 @@ class LabelBase(BaseObject):
     @property
     def content_size(self):
         '''Return the content size (width, height)'''
-        if self.texture is None:
+        if self.texture is None and self._atlas_arrays is None:
             return (0, 0)
         return (self.content_width, self.content_height)
 
+    @property
+    def cache_size(self):
+        '''Return the size of the label texture in bytes, used by the Cache'''
+        if self.texture is None:
+            return 0
+        return self.texture.cache_size
+
+    @property
+    def layout(self):
+        '''Return the TextLayout of the label, used to cut the text in lines.
+        It can be used to find the line and the position of a cursor.'''
+        uw = self.usersize[0]
+        fontid = self.fontid
+        layout = self._layout
+        if layout is None or layout.fontid != fontid:
+            layout = self._layout = TextLayout(self.get_extents, fontid, uw)
+        else:
+            layout.width = uw
+        layout.text = self.label
+        return layout
+
     @property
     def fontid(self):
         '''Return an uniq id for all font parameters'''
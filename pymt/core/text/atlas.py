@@ -0,0 +1,133 @@
+'''
+Atlas: store the glyphs of a font in shared textures
+
+A label in "atlas" mode doesn't have his own texture: each glyph is
+rasterized once per font (name, size, bold, italic) in a texture shared by all
+the labels, and the label is drawn as a list of quads. Changing the text of
+the label doesn't need any rasterization or texture upload, unless a new glyph
+is used.
+
+The glyphs are rasterized in white, and colored when drawing.
+'''
+
+__all__ = ('ShelfPacker', 'GlyphAtlas')
+
+import pymt
+
+
+class ShelfPacker(object):
+    '''Pack rectangles in a fixed size area, row by row. Each row (shelf) is
+    as high as the highest rectangle in it.
+
+    :Parameters:
+        `width` : int
+            Width of the area
+        `height` : int
+            Height of the area
+        `margin` : int, default to 1
+            Space left around each rectangle
+    '''
+
+    __slots__ = ('width', 'height', 'margin', '_x', '_y', '_row_height')
+
+    def __init__(self, width, height, margin=1):
+        self.width = width
+        self.height = height
+        self.margin = margin
+        self._x = 0
+        self._y = 0
+        self._row_height = 0
+
+    def insert(self, width, height):
+        '''Reserve a rectangle, and return his (x, y) position. Return None
+        if the area is full.'''
+        margin = self.margin
+        w = width + margin
+        h = height + margin
+        if w > self.width or h > self.height:
+            return None
+        if self._x + w > self.width:
+            # start a new row
+            self._y += self._row_height
+            self._x = 0
+            self._row_height = 0
+        if self._y + h > self.height:
+            return None
+        x, y = self._x, self._y
+        self._x += w
+        if h > self._row_height:
+            self._row_height = h
+        return x, y
+
+    def clear(self):
+        '''Remove all the rectangles'''
+        self._x = self._y = self._row_height = 0
+
+
+class GlyphAtlas(object):
+    '''Glyphs of one font, stored in one or more textures (pages).
+
+    :Parameters:
+        `page_size` : int, default to 512
+            Size of a page texture
+    '''
+
+    __slots__ = ('page_size', 'pages', 'glyphs')
+
+    #: Atlas for each font id
+    atlases = {}
+
+    def __init__(self, page_size=512):
+        self.page_size = page_size
+        # list of (texture, packer)
+        self.pages = []
+        # glyph -> (page index, u1, v1, u2, v2, width, height)
+        self.glyphs = {}
+
+    @staticmethod
+    def get(fontid):
+        '''Return the atlas for a font id'''
+        atlas = GlyphAtlas.atlases.get(fontid)
+        if atlas is None:
+            atlas = GlyphAtlas.atlases[fontid] = GlyphAtlas()
+        return atlas
+
+    def get_glyph(self, glyph, label):
+        '''Return (page index, u1, v1, u2, v2, width, height) for a glyph.
+        If the glyph is not yet in the atlas, it's rasterized with the label.
+        (v1 is the top of the glyph.)'''
+        info = self.glyphs.get(glyph)
+        if info is not None:
+            return info
+        data = label._rasterize(glyph)
+        info = self.add(glyph, data)
+        self.glyphs[glyph] = info
+        return info
+
+    def add(self, glyph, data):
+        '''Store an image data in the atlas, and return his location'''
+        width, height = data.width, data.height
+        index = len(self.pages) - 1
+        pos = None
+        if index >= 0:
+            pos = self.pages[index][1].insert(width, height)
+        if pos is None:
+            index += 1
+            page_size = self.page_size
+            while page_size < max(width, height) + 1:
+                page_size *= 2
+            texture = pymt.Texture.create(page_size, page_size)
+            packer = ShelfPacker(page_size, page_size)
+            self.pages.append((texture, packer))
+            pos = packer.insert(width, height)
+        texture, packer = self.pages[index]
+        size = float(packer.width)
+        x, y = pos
+        texture.blit_data(data, pos=(x, y))
+        return (index, x / size, y / size,
+                (x + width) / size, (y + height) / size, width, height)
+
+    def clear(self):
+        '''Remove all the glyphs'''
+        self.pages = []
+        self.glyphs = {}
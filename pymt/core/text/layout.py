@@ -0,0 +1,241 @@
+'''
+Layout: incremental word wrapping of a text
+
+The text is cut in paragraphs (on "\\n"), and each paragraph is cut in lines
+that fit in a maximum width. The lines of each paragraph are cached: when the
+text is changed, only the paragraphs that have been edited are wrapped again
+::
+
+    layout = TextLayout(label.get_extents, label.fontid, width=200)
+    layout.text = 'Hello world\\nA second paragraph'
+    for start, end, width, height in layout.lines:
+        print layout.text[start:end]
+
+The size of each word is calculated once per font, from the size of his
+glyphs. The layout can also be used to place a cursor, with get_line(),
+get_cursor_pos() and get_offset_at().
+'''
+
+__all__ = ('TextLayout', )
+
+import re
+from bisect import bisect_right
+from pymt.cache import Cache
+
+# lines of the paragraphs, shared by all the layouts of the same font
+Cache.register('pymt.textlayout', limit=2000, timeout=60)
+
+
+class TextLayout(object):
+    '''Cut a text in lines, and keep the lines of each paragraph in cache.
+
+    :Parameters:
+        `get_extents`: function
+            Function that return the (width, height) of a text
+        `fontid`: str
+            Uniq id of the font. The word sizes and the paragraph lines are
+            shared between the layouts of the same font. If None, nothing is
+            shared.
+        `width`: int, default to None
+            Maximum width of a line. If None, the text is only cut on newlines,
+            and each line is measured as a whole.
+        `delimiters`: str, default to ' '
+            Characters where a line can be cut. A delimiter stay at the end of
+            the line.
+
+    The `lines` attribute is a list of (start, end, width, height), where
+    start/end are the offsets of the line in the text. The "\\n" between two
+    paragraphs is not part of any line.
+    '''
+
+    __slots__ = ('get_extents', 'fontid', 'delimiters', 'lines',
+                 'content_width', 'content_height', '_width', '_text',
+                 '_paragraphs', '_starts', '_tops', '_extents', '_split')
+
+    #: Size of the glyphs and words, per font id
+    _cache_extents = {}
+
+    #: Maximum number of words in the cache of a font
+    max_words = 10000
+
+    def __init__(self, get_extents, fontid=None, width=None, delimiters=' '):
+        self.get_extents = get_extents
+        self.fontid = fontid
+        self.delimiters = delimiters
+        self._width = width
+        self._text = None
+        self._paragraphs = []
+        self.lines = []
+        self.content_width = 0
+        self.content_height = 0
+        self._starts = []
+        self._tops = []
+        if fontid is None:
+            self._extents = {}
+        else:
+            self._extents = TextLayout._cache_extents.setdefault(fontid, {})
+        self._split = re.compile('([%s])' % re.escape(delimiters)).split
+
+    def _get_text(self):
+        return self._text
+    def _set_text(self, text):
+        if text == self._text:
+            return
+        paragraphs = text.split('\n')
+        old = self._paragraphs
+
+        # keep the paragraphs that are the same at the start and at the end
+        count = min(len(old), len(paragraphs))
+        head = 0
+        while head < count and old[head][0] == paragraphs[head]:
+            head += 1
+        tail = 0
+        while tail < count - head and \
+              old[-1 - tail][0] == paragraphs[-1 - tail]:
+            tail += 1
+
+        wrap = self._wrap_paragraph
+        edited = [(p, wrap(p))
+                  for p in paragraphs[head:len(paragraphs) - tail]]
+        self._paragraphs = old[:head] + edited + old[len(old) - tail:]
+        self._text = text
+        self._update_lines()
+    text = property(_get_text, _set_text,
+                    doc='Get/Set the text to layout')
+
+    def _get_width(self):
+        return self._width
+    def _set_width(self, width):
+        if width == self._width:
+            return
+        self._width = width
+        # all the paragraphs must be wrapped again
+        text = self._text
+        self._text = None
+        self._paragraphs = []
+        if text is not None:
+            self.text = text
+    width = property(_get_width, _set_width,
+                     doc='Get/Set the maximum width of a line')
+
+    def get_word_extents(self, word):
+        '''Return the (width, height) of a word, from his glyphs size'''
+        cache = self._extents
+        size = cache.get(word)
+        if size is not None:
+            return size
+        if len(word) <= 1:
+            size = self.get_extents(word)
+        else:
+            w = h = 0
+            for glyph in word:
+                gw, gh = self.get_word_extents(glyph)
+                w += gw
+                if gh > h:
+                    h = gh
+            size = (w, h)
+        if len(cache) > self.max_words:
+            cache.clear()
+        cache[word] = size
+        return size
+
+    def _wrap_paragraph(self, text):
+        key = None
+        if self.fontid is not None:
+            key = (self.fontid, self._width, self.delimiters, text)
+            lines = Cache.get('pymt.textlayout', key)
+            if lines is not None:
+                return lines
+        lines = self._wrap(text)
+        if key is not None:
+            Cache.append('pymt.textlayout', key, lines)
+        return lines
+
+    def _wrap(self, text):
+        # return the lines of a paragraph, with offsets relative to the
+        # paragraph.
+        width = self._width
+        if width is None:
+            w, h = self.get_extents(text)
+            return ((0, len(text), w, h), )
+
+        extents = self.get_word_extents
+        lines = []
+        start = pos = 0
+        lw = lh = 0
+        for word in self._split(text):
+            if not word:
+                continue
+            ww, wh = extents(word)
+            # the word don't fit on the line, start a new one.
+            # a word larger than the width is alone on his line.
+            if lw + ww > width and pos > start:
+                lines.append((start, pos, lw, lh))
+                start = pos
+                lw = lh = 0
+            lw += ww
+            if wh > lh:
+                lh = wh
+            pos += len(word)
+        if not lh:
+            # empty line, use the height of the font
+            lh = extents('')[1]
+        lines.append((start, pos, lw, lh))
+        return tuple(lines)
+
+    def _update_lines(self):
+        lines = []
+        starts = []
+        tops = []
+        offset = 0
+        y = 0
+        content_width = 0
+        for text, plines in self._paragraphs:
+            for start, end, w, h in plines:
+                lines.append((offset + start, offset + end, w, h))
+                starts.append(offset + start)
+                tops.append(y)
+                y += h
+                if w > content_width:
+                    content_width = w
+            offset += len(text) + 1
+        self.lines = lines
+        self._starts = starts
+        self._tops = tops
+        self.content_width = content_width
+        self.content_height = y
+
+    def get_line(self, offset):
+        '''Return the index of the line where the character at `offset` is.
+        An offset between two wrapped lines is on the second one.'''
+        return max(0, bisect_right(self._starts, offset) - 1)
+
+    def get_line_at(self, y):
+        '''Return the index of the line at `y` pixels from the top'''
+        index = bisect_right(self._tops, y) - 1
+        return max(0, min(index, len(self.lines) - 1))
+
+    def get_cursor_pos(self, offset):
+        '''Return the (x, y) position of a cursor placed before the
+        character at `offset`, y being the top of the line.'''
+        index = self.get_line(offset)
+        start, end, w, h = self.lines[index]
+        x = 0
+        extents = self.get_word_extents
+        for glyph in self._text[start:min(offset, end)]:
+            x += extents(glyph)[0]
+        return x, self._tops[index]
+
+    def get_offset_at(self, x, y):
+        '''Return the offset of the nearest cursor position from a (x, y)
+        position, y being from the top.'''
+        start, end, w, h = self.lines[self.get_line_at(y)]
+        extents = self.get_word_extents
+        text = self._text
+        lx = 0
+        for offset in xrange(start, end):
+            gw = extents(text[offset])[0]
+            if x < lx + gw / 2.:
+                return offset
+            lx += gw
+        return end
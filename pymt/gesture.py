@@ -24,33 +24,242 @@ new gesture, and compare them ! ::
 __all__ = ('Gesture', 'GestureDatabase', 'GesturePoint', 'GestureStroke')
 
 import math
+from numpy import array, empty, dot, sqrt, concatenate, arange, \
+        searchsorted, argsort
 from pymt.vector import Vector
 
+
+class _GestureGroup(object):
+    '''(internal) Templates of the database that have the same number of
+    points in each stroke. The points are stored in one contiguous array,
+    so a candidate can be scored against all of them at once.
+    '''
+
+    __slots__ = ('signature', 'offsets', 'indices', 'points', 'first',
+                 'products', 'aspects')
+
+    def __init__(self, signature, indices, gestures):
+        self.signature = signature
+        offsets = [0]
+        for count in signature:
+            offsets.append(offsets[-1] + count)
+        self.offsets = offsets
+        n = len(gestures)
+        points = empty((n, offsets[-1], 2), dtype='float64')
+        first = empty((n, 2), dtype='float64')
+        products = empty(n, dtype='float64')
+        aspects = empty(n, dtype='float64')
+        for i, g in enumerate(gestures):
+            points[i] = _gesture_to_array(g)
+            first[i] = _gesture_first_point(g)
+            products[i] = getattr(g, 'gesture_product', True)
+            aspects[i] = _gesture_aspect(g)
+
+        # sort the templates by aspect, for the aspect pre-filter
+        order = argsort(aspects, kind='mergesort')
+        self.indices = array(indices)[order]
+        self.points = points[order]
+        self.first = first[order]
+        self.products = products[order]
+        self.aspects = aspects[order]
+
+    def get_columns(self, signature):
+        '''Return the points columns to compare with a candidate of another
+        signature (with the same number of strokes). Like
+        Gesture.dot_product(), the longest strokes are truncated.'''
+        if signature == self.signature:
+            return None, None
+        columns = []
+        candidate_columns = []
+        candidate_offset = 0
+        for index, count in enumerate(signature):
+            length = min(count, self.signature[index])
+            columns.append(arange(length) + self.offsets[index])
+            candidate_columns.append(arange(length) + candidate_offset)
+            candidate_offset += count
+        return concatenate(columns), concatenate(candidate_columns)
+
+
+def _gesture_to_array(gesture):
+    points = []
+    for stroke in gesture.strokes:
+        points.extend([(p.x, p.y) for p in stroke.points])
+    return array(points, dtype='float64').reshape((len(points), 2))
+
+def _gesture_signature(gesture):
+    return tuple([len(stroke.points) for stroke in gesture.strokes])
+
+def _gesture_first_point(gesture):
+    if len(gesture.strokes) < 1 or len(gesture.strokes[0].points) < 1:
+        return (0., 0.)
+    point = gesture.strokes[0].points[0]
+    return (point.x, point.y)
+
+def _gesture_aspect(gesture):
+    # log of the width/height ratio, before the normalization. the small
+    # offset avoid infinity for horizontal or vertical lines.
+    width = getattr(gesture, 'width', 0.)
+    height = getattr(gesture, 'height', 0.)
+    return math.log((width + 1e-6) / (height + 1e-6))
+
+
 class GestureDatabase(object):
-    '''Class to handle a gesture database.'''
+    '''Class to handle a gesture database.
+
+    The gestures are indexed by number of strokes, and by number of points
+    in each stroke. All the gestures with the same layout are stored in the
+    same NumPy array, and are compared to a candidate at once. The index is
+    rebuilt automatically when gestures are added or removed. If you modify
+    a gesture that is already in the database (like normalizing it), call
+    update_index().
+    '''
     def __init__(self):
         self.db = []
+        self._index = None
+        self._index_count = 0
 
     def add_gesture(self, gesture):
         '''Add a new gesture in database'''
         self.db.append(gesture)
+        self._index = None
+
+    def update_index(self):
+        '''Rebuild the index of the gestures. This is done automatically
+        on the next find() when the database is changed with add_gesture(),
+        or when the size of `db` change.'''
+        layouts = {}
+        for index, g in enumerate(self.db):
+            if getattr(g, 'gesture_product', True) is False:
+                # never compared (see Gesture.dot_product())
+                continue
+            signature = _gesture_signature(g)
+            if signature not in layouts:
+                layouts[signature] = ([], [])
+            layouts[signature][0].append(index)
+            layouts[signature][1].append(g)
+
+        # group by number of strokes, the first pre-filter
+        index = {}
+        for signature, (indices, gestures) in layouts.iteritems():
+            group = _GestureGroup(signature, indices, gestures)
+            index.setdefault(len(signature), []).append(group)
+        self._index = index
+        self._index_count = len(self.db)
+
+    def get_scores(self, gesture, rotation_invariant=True,
+                   aspect_tolerance=None):
+        '''Return a list of (index, score) for the gestures in the database
+        that can be compared with the gesture. The scores are the same as
+        Gesture.get_score(), the gestures not returned would have a score of
+        -1.
+
+        :Parameters:
+            `aspect_tolerance` : float, default to None
+                If set, only the gestures whose width/height ratio is at
+                most `aspect_tolerance` times bigger or smaller than the
+                candidate ratio are compared. Don't use it when searching for
+                rotated gestures.
+        '''
+        if self._index is None or self._index_count != len(self.db):
+            self.update_index()
+        groups = self._index.get(len(gesture.strokes))
+        if not groups:
+            return []
+        if not rotation_invariant and \
+           getattr(gesture, 'gesture_product', True) is False:
+            return []
+
+        candidate = _gesture_to_array(gesture)
+        signature = _gesture_signature(gesture)
+        if aspect_tolerance is not None:
+            aspect = _gesture_aspect(gesture)
+            delta = math.log(aspect_tolerance)
+
+        if rotation_invariant:
+            # the candidate is rotated to align his first point with the first
+            # point of the template (see Gesture.get_rigid_rotation())
+            tx, ty = _gesture_first_point(gesture)
+            tnorm = math.sqrt(tx * tx + ty * ty)
+
+        results = []
+        for group in groups:
+            start, end = 0, len(group.indices)
+            if aspect_tolerance is not None:
+                start = searchsorted(group.aspects, aspect - delta, 'left')
+                end = searchsorted(group.aspects, aspect + delta, 'right')
+                if start >= end:
+                    continue
+
+            columns, candidate_columns = group.get_columns(signature)
+            points = group.points[start:end]
+            cpoints = candidate
+            if columns is not None:
+                points = points[:, columns]
+                cpoints = candidate[candidate_columns]
+            cx = cpoints[:, 0]
+            cy = cpoints[:, 1]
+            px = points[:, :, 0]
+            py = points[:, :, 1]
+
+            # dot product without rotation
+            scores = dot(px, cx) + dot(py, cy)
 
-    def find(self, gesture, minscore=0.9, rotation_invariant=True):
-        '''Find current gesture in database'''
+            if rotation_invariant:
+                # rotating the candidate by an angle a give:
+                #   cos(a) * sum(px.cx + py.cy) + sin(a) * sum(py.cx - px.cy)
+                cross = dot(py, cx) - dot(px, cy)
+                sx = group.first[start:end, 0]
+                sy = group.first[start:end, 1]
+                norms = sqrt(sx * sx + sy * sy) * tnorm
+                valid = norms > 0
+                norms[~valid] = 1.
+                cos = (sx * tx + sy * ty) / norms
+                sin = (sy * tx - sx * ty) / norms
+                cos[~valid] = 1.
+                sin[~valid] = 0.
+                scores = cos * scores + sin * cross
+                # the rotation doesn't change the candidate product
+                cproduct = float((candidate * candidate).sum())
+            else:
+                cproduct = getattr(gesture, 'gesture_product', True)
+
+            positive = scores > 0
+            if positive.any():
+                scores[positive] /= sqrt(
+                    group.products[start:end][positive] * cproduct)
+
+            results.extend(zip(group.indices[start:end].tolist(),
+                               scores.tolist()))
+        return results
+
+    def find(self, gesture, minscore=0.9, rotation_invariant=True,
+             aspect_tolerance=None):
+        '''Find current gesture in database. Return a tuple (score, gesture)
+        of the best match, or None if no gesture have a score higher than
+        `minscore`. See get_scores() for `aspect_tolerance`.'''
         if not gesture:
             return
 
+        results = self.get_scores(gesture, rotation_invariant,
+                                  aspect_tolerance)
         best = None
         bestscore = minscore
-        for g in self.db:
-            score = g.get_score(gesture, rotation_invariant)
+        if aspect_tolerance is None and minscore <= -1:
+            # the gestures that can't be compared have a score of -1
+            scores = dict(results)
+            results = [(index, scores.get(index, -1))
+                       for index in xrange(len(self.db))]
+        else:
+            # when scores are equal, the last gesture of the database win
+            results.sort()
+        for index, score in results:
             if score < bestscore:
                 continue
             bestscore = score
-            best = g
-        if not best:
+            best = index
+        if best is None:
             return
-        return (bestscore, best)
+        return (bestscore, self.db[best])
 
     def gesture_to_str(self, gesture):
         '''Convert a gesture into a unique string'''
@@ -71,7 +280,6 @@ class GestureDatabase(object):
         gesture = p.load()
         return gesture
 
-
 class GesturePoint:
     def __init__(self, x, y):
         '''Stores the x,y coordinates of a point in the gesture'''
@@ -5,6 +5,7 @@ Graphx: package to simplify drawing in OpenGL
 from pymt.graphx.statement import *
 from pymt.graphx.colors import *
 from pymt.graphx.draw import *
+from pymt.graphx.geometry import *
 from pymt.graphx.paint import *
 from pymt.graphx.stencil import *
 from pymt.graphx.fbo import *
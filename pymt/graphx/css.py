@@ -2,7 +2,7 @@
 CSS: Draw shapes with css attributes !
 '''
 
-__all__ = ('drawCSSRectangle', )
+__all__ = ('drawCSSRectangle', 'CSSStyle')
 
 import os
 from pymt.graphx.draw import drawRectangleAlpha, drawRectangle, \
@@ -11,47 +11,66 @@ from pymt.graphx.colors import set_color
 from pymt.cache import Cache
 from pymt.graphx.statement import GlDisplayList, gx_color
 from OpenGL.GL import GL_LINE_BIT, GL_LINE_LOOP, \
-        glPushAttrib, glPopAttrib, glLineWidth
+        glPushAttrib, glPopAttrib, glLineWidth, \
+        glPushMatrix, glPopMatrix, glTranslatef
 
 if not 'PYMT_DOC' in os.environ:
     Cache.register('pymt.cssrect', limit=100, timeout=60)
 
 
-def drawCSSRectangle(pos=(0, 0), size=(100, 100), style=dict(), prefix=None, state=None):
-    '''Draw a rectangle with CSS
-    
-    :Parameters:
-        `state`: if a certain state string is passed, we will use styles with this postifx instead.
-            for example:  style[bg-color] and style[bg-color-down] are both set.
-            if state == "down", we wil use bg-color-down instead of bg-color
+class CSSStyle(dict):
+    '''Dictionnary of the style of a widget. The fingerprints computed by
+    drawCSSRectangle() are kept in the style, and forgotten as soon as the
+    style is changed.'''
 
-    :Styles:
-        * alpha-background (color)
-        * border-radius (float)
-        * border-radius-precision (float)
-        * border-width (float)
-        * draw-alpha-background (bool)
-        * draw-background (bool)
-        * draw-border (bool)
+    __slots__ = ('fingerprints', )
 
-    '''
+    def __init__(self, *largs, **kwargs):
+        super(CSSStyle, self).__init__(*largs, **kwargs)
+        self.fingerprints = {}
 
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self.fingerprints.clear()
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self.fingerprints.clear()
+
+    def clear(self):
+        dict.clear(self)
+        self.fingerprints.clear()
+
+    def pop(self, *largs):
+        self.fingerprints.clear()
+        return dict.pop(self, *largs)
+
+    def popitem(self):
+        self.fingerprints.clear()
+        return dict.popitem(self)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self.fingerprints.clear()
+        return dict.setdefault(self, key, default)
+
+    def update(self, *largs, **kwargs):
+        dict.update(self, *largs, **kwargs)
+        self.fingerprints.clear()
+
+
+def _hashable(value):
+    if type(value) is list:
+        return tuple(value)
+    return value
+
+def _css_fingerprint(style, prefix, state):
+    '''Return the values of `style` used for drawing a rectangle, and the
+    background image'''
     bg_image = style.get('bg-image-'+str(state))
     if not bg_image:
         bg_image = style.get('bg-image')
 
-    # Check if we have a cached version
-    cache_id = '%s:%s:%s:%s:%s' % (pos, size, style, prefix, state)
-    cache = Cache.get('pymt.cssrect', cache_id)
-    if cache:
-        cache.draw()
-        if bg_image:
-            bg_image.size = size
-            bg_image.pos = pos
-            bg_image.draw()
-        return
-
-
     # lets use the ones for given state,
     # and ignore the regular ones if the state ones are there
     if state:
@@ -86,28 +105,38 @@ def drawCSSRectangle(pos=(0, 0), size=(100, 100), style=dict(), prefix=None, sta
     style.setdefault('draw-alpha-background', 0)
     style.setdefault('alpha-background', (1, 1, .5, .5))
 
-    k = { 'pos': pos, 'size': size }
+    bg_color = None
+    if state:
+        bg_color = _hashable(style.get('bg-color'))
 
-    new_cache = GlDisplayList()
-    with new_cache:
+    return (style['border-width'], style['border-radius'],
+            style['border-radius-precision'], style['draw-border'],
+            style['draw-background'], style['draw-alpha-background'],
+            _hashable(style['alpha-background']),
+            _hashable(style.get('border-color')), bg_color), bg_image
+
+def _compile_css_rectangle(size, fingerprint):
+    '''Draw the rectangle of a fingerprint at (0, 0) in a display list'''
+    linewidth, radius, precision, draw_border, draw_background, \
+        draw_alpha_background, alpha_background, bordercolor, bg_color = \
+        fingerprint
 
-        if state:
-            set_color(*style['bg-color']) #hack becasue old widgets set this themselves
+    k = { 'pos': (0, 0), 'size': size }
 
-        linewidth = style.get('border-width')
+    new_cache = GlDisplayList()
+    with new_cache:
 
-        bordercolor = None
-        if 'border-color' in style:
-            bordercolor = style['border-color']
+        if bg_color:
+            set_color(*bg_color) #hack becasue old widgets set this themselves
 
-        if style['border-radius'] > 0:
+        if radius > 0:
             k.update({
-                'radius': style['border-radius'],
-                'precision': style['border-radius-precision']
+                'radius': radius,
+                'precision': precision
             })
-            if style['draw-background']:
+            if draw_background:
                 drawRoundedRectangle(**k)
-            if style['draw-border']:
+            if draw_border:
                 if linewidth:
                     glPushAttrib(GL_LINE_BIT)
                     glLineWidth(linewidth)
@@ -118,12 +147,12 @@ def drawCSSRectangle(pos=(0, 0), size=(100, 100), style=dict(), prefix=None, sta
                     drawRoundedRectangle(style=GL_LINE_LOOP, **k)
                 if linewidth:
                     glPopAttrib()
-            if style['draw-alpha-background']:
-                drawRoundedRectangleAlpha(alpha=style['alpha-background'], **k)
+            if draw_alpha_background:
+                drawRoundedRectangleAlpha(alpha=alpha_background, **k)
         else:
-            if style['draw-background']:
+            if draw_background:
                 drawRectangle(**k)
-            if style['draw-border']:
+            if draw_border:
                 if linewidth:
                     glPushAttrib(GL_LINE_BIT)
                     glLineWidth(linewidth)
@@ -134,16 +163,68 @@ def drawCSSRectangle(pos=(0, 0), size=(100, 100), style=dict(), prefix=None, sta
                     drawRectangle(style=GL_LINE_LOOP, **k)
                 if linewidth:
                     glPopAttrib()
-            if style['draw-alpha-background']:
-                drawRectangleAlpha(alpha=style['alpha-background'], **k)
+            if draw_alpha_background:
+                drawRectangleAlpha(alpha=alpha_background, **k)
+
+    return new_cache
+
 
+def drawCSSRectangle(pos=(0, 0), size=(100, 100), style=dict(), prefix=None, state=None):
+    '''Draw a rectangle with CSS
+    
+    :Parameters:
+        `state`: if a certain state string is passed, we will use styles with this postifx instead.
+            for example:  style[bg-color] and style[bg-color-down] are both set.
+            if state == "down", we wil use bg-color-down instead of bg-color
 
-    # if the drawCSSRectangle is already inside a display list
-    # compilation will not happen, but drawing yes.
-    # so, store only if a cache is created !
-    if new_cache.is_compiled():
-        Cache.append('pymt.cssrect', cache_id, new_cache)
-        new_cache.draw()
+    :Styles:
+        * alpha-background (color)
+        * border-radius (float)
+        * border-radius-precision (float)
+        * border-width (float)
+        * draw-alpha-background (bool)
+        * draw-background (bool)
+        * draw-border (bool)
+
+    The rectangles are compiled at (0, 0) and cached by size and style
+    fingerprint, then drawn with a translation: a moving widget reuse the
+    same display list. The fingerprint of a `CSSStyle` is computed once,
+    until the style change. Use Cache.get_stats('pymt.cssrect') to read the
+    hit rate of the cache.
+    '''
+
+    # Check if we have a fingerprint of the style
+    fingerprints = getattr(style, 'fingerprints', None)
+    if fingerprints is None:
+        fingerprint, bg_image = _css_fingerprint(style, prefix, state)
+    else:
+        fingerprint = fingerprints.get((prefix, state))
+        if fingerprint is None:
+            fingerprint = _css_fingerprint(style, prefix, state)
+            style.fingerprints[(prefix, state)] = fingerprint
+        fingerprint, bg_image = fingerprint
+
+    x, y = pos
+    if x or y:
+        glPushMatrix()
+        glTranslatef(x, y, 0)
+
+    # Check if we have a cached version
+    cache_id = (fingerprint, size[0], size[1])
+    cache = Cache.get('pymt.cssrect', cache_id)
+    if cache:
+        cache.draw()
+    else:
+        new_cache = _compile_css_rectangle(size, fingerprint)
+        # if the drawCSSRectangle is already inside a display list
+        # compilation will not happen, but drawing yes.
+        # so, store only if a cache is created !
+        if new_cache.is_compiled():
+            Cache.append('pymt.cssrect', cache_id, new_cache)
+            new_cache.draw()
+
+    if x or y:
+        glPopMatrix()
 
     if bg_image:
         bg_image.size = size
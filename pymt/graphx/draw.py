@@ -13,15 +13,16 @@ __all__ = (
 )
 
 import os
-import math
 import pymt
 from pymt.cache import Cache
 from pymt.vector import Vector
 from OpenGL.GL import *
-from OpenGL.GLU import gluNewQuadric, gluDisk, gluPartialDisk
 from pymt.graphx.paint import *
 from pymt.graphx.statement import *
 from pymt.graphx.colors import *
+from pymt.graphx.geometry import get_rounded_rectangle_vertices, \
+        get_rounded_rectangle_alpha_vertices, get_disk_vertices, \
+        get_partial_disk_vertices, get_stippled_disk_vertices
 
 try:
     import pymt.c_ext.c_graphx as c_graphx
@@ -45,6 +46,18 @@ def _make_point_list(points):
     else:
         return list(points)
 
+def _draw_vertices(style, vertices, colors=None):
+    '''Draw a numpy array of (x, y) vertices, and optionally their
+    colors, in one call'''
+    glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glVertexPointer(2, GL_FLOAT, 0, vertices)
+    if colors is not None:
+        glEnableClientState(GL_COLOR_ARRAY)
+        glColorPointer(4, GL_FLOAT, 0, colors)
+    glDrawArrays(style, 0, len(vertices))
+    glPopClientAttrib()
+
 def getLabel(label, **kwargs):
     '''Get a cached label object
 
@@ -137,77 +150,15 @@ def drawRoundedRectangle(pos=(0,0), size=(100,50), radius=5, color=None,
             Indicate if round must be draw for each corners
             starting to bottom-left, bottom-right, top-right, top-left
     '''
-    x, y = pos
-    w, h = size
-
     if color:
         set_color(*color)
 
-    # use accelerate version
-    '''
-    if c_graphx:
-        c_graphx.drawRoundedRectangle()
-        return
-    '''
-
-    if size[0] < radius * 2:
-        radius = size[0] / 2
-    if size[1] < radius * 2:
-        radius = size[1] / 2
-
     if linewidth > 0:
         glPushAttrib(GL_LINE_BIT)
         glLineWidth(linewidth)
 
-    with gx_begin(style):
-
-        if corners[1]:
-            glVertex2f(x + radius, y)
-            glVertex2f(x + w-radius, y)
-            t = math.pi * 1.5
-            while t < math.pi * 2:
-                sx = x + w - radius + math.cos(t) * radius
-                sy = y + radius + math.sin(t) * radius
-                glVertex2f(sx, sy)
-                t += precision
-        else:
-            glVertex2f(x + w, y)
-
-        if corners[2]:
-            glVertex2f(x + w, y + radius)
-            glVertex2f(x + w, y + h - radius)
-            t = 0
-            while t < math.pi * 0.5:
-                sx = x + w - radius + math.cos(t) * radius
-                sy = y + h -radius + math.sin(t) * radius
-                glVertex2f(sx, sy)
-                t += precision
-        else:
-            glVertex2f(x + w, y + h)
-
-        if corners[3]:
-            glVertex2f(x + w -radius, y + h)
-            glVertex2f(x + radius, y + h)
-            t = math.pi * 0.5
-            while t < math.pi:
-                sx = x  + radius + math.cos(t) * radius
-                sy = y + h - radius + math.sin(t) * radius
-                glVertex2f(sx, sy)
-                t += precision
-        else:
-            glVertex2f(x, y + h)
-
-        if corners[0]:
-            glVertex2f(x, y + h - radius)
-            glVertex2f(x, y + radius)
-            t = math.pi
-            while t < math.pi * 1.5:
-                sx = x + radius + math.cos(t) * radius
-                sy = y + radius + math.sin(t) * radius
-                glVertex2f (sx, sy)
-                t += precision
-        else:
-            glVertex2f(x, y)
+    _draw_vertices(style, get_rounded_rectangle_vertices(
+        pos, size, radius, precision, corners))
 
     if linewidth > 0:
         glPopAttrib()
@@ -222,14 +173,11 @@ def drawCircle(pos=(0,0), radius=1.0, linewidth=0):
         `radius`: float, default to 1.0
             Radius of circle
     '''
-    x, y = pos[0], pos[1]
-    with gx_matrix:
-        glTranslatef(x, y, 0)
-        glScalef(radius, radius, 1.0)
-        if linewidth > 0:
-            gluDisk(gluNewQuadric(), 1-linewidth/float(radius), 1, 32,1)
-        else:
-            gluDisk(gluNewQuadric(), 0, 1, 32,1)
+    inner_radius = 0
+    if linewidth > 0:
+        inner_radius = radius - linewidth
+    _draw_vertices(GL_TRIANGLE_STRIP,
+                   get_disk_vertices(pos, inner_radius, radius))
 
 def drawPolygon(points, style=GL_POLYGON, linewidth=0):
     '''Draw polygon from points list
@@ -449,70 +397,12 @@ def drawRoundedRectangleAlpha(pos=(0,0), size=(100,50), radius=5, alpha=(1,1,1,1
         `style`: opengl begin, default to GL_POLYGON
             Style of the rounded rectangle (try GL_LINE_LOOP)
     '''
-    x, y = pos
-    w, h = size
-
-    if size[0] < radius * 2:
-        radius = size[0] / 2
-    if size[1] < radius * 2:
-        radius = size[1] / 2
-
-    midalpha = 0
-    for a in alpha:
-        midalpha += a
-    midalpha /= len(alpha)
-
-    c0 = (1,1,1,midalpha)
-    c1 = (1,1,1,alpha[0]) #topleft
-    c2 = (1,1,1,alpha[2]) #bottomleft
-    c3 = (1,1,1,alpha[1]) #topright
-    c4 = (1,1,1,alpha[3]) #bottomright
-
-    with DO(gx_alphablending, gx_begin(style)):
-
-        glColor4f(*c0)
-        glVertex2f(x + w/2, y + h/2)
-        glColor4f(*c1)
-        glVertex2f(x + radius, y)
-        glColor4f(*c3)
-        glVertex2f(x + w-radius, y)
-        t = math.pi * 1.5
-        while t < math.pi * 2:
-            sx = x + w - radius + math.cos(t) * radius
-            sy = y + radius + math.sin(t) * radius
-            glVertex2f(sx, sy)
-            t += precision
-
-        glVertex2f(x + w, y + radius)
-        glColor4f(*c4)
-        glVertex2f(x + w, y + h - radius)
-        t = 0
-        while t < math.pi * 0.5:
-            sx = x + w - radius + math.cos(t) * radius
-            sy = y + h -radius + math.sin(t) * radius
-            glVertex2f(sx, sy)
-            t += precision
-
-        glVertex2f(x + w -radius, y + h)
-        glColor4f(*c2)
-        glVertex2f(x + radius, y + h)
-        t = math.pi * 0.5
-        while t < math.pi:
-            sx = x  + radius + math.cos(t) * radius
-            sy = y + h - radius + math.sin(t) * radius
-            glVertex2f(sx, sy)
-            t += precision
-
-        glVertex2f(x, y + h - radius)
-        glColor4f(*c1)
-        glVertex2f(x, y + radius)
-        t = math.pi
-        while t < math.pi * 1.5:
-            sx = x + radius + math.cos(t) * radius
-            sy = y + radius + math.sin(t) * radius
-            glVertex2f (sx, sy)
-            t += precision
-        glVertex2f(x + radius, y)
+    vertices, colors = get_rounded_rectangle_alpha_vertices(
+        pos, size, radius, alpha, precision)
+    with gx_alphablending:
+        _draw_vertices(style, vertices, colors)
+    # the current color is undefined after drawing a color array
+    glColor4f(*colors[-1])
 
 def drawRectangleAlpha(pos=(0,0), size=(1.0,1.0), alpha=(1,1,1,1), style=GL_QUADS):
     '''Draw an rectangle alpha layer.
@@ -563,9 +453,8 @@ def drawSemiCircle(pos=(0,0), inner_radius=100, outer_radius=120, slices=32, loo
         `sweep_angle`: int, default to 360
             Angle to finish drawing
     '''
-    with gx_matrix:
-        glTranslatef(pos[0], pos[1], 0)
-        gluPartialDisk(gluNewQuadric(), inner_radius, outer_radius, slices, loops, start_angle, sweep_angle)
+    _draw_vertices(GL_TRIANGLE_STRIP, get_partial_disk_vertices(
+        pos, inner_radius, outer_radius, slices, start_angle, sweep_angle))
 
 def drawStippledCircle(pos=(0,0), inner_radius=200, outer_radius=400, segments=10):
     '''
@@ -583,13 +472,5 @@ def drawStippledCircle(pos=(0,0), inner_radius=200, outer_radius=400, segments=1
         `segments`: int, defaults to 10
             Number of visible segments
     '''
-    angle_delta = (360/segments)/2
-    current_angle = 0
-    quadric = gluNewQuadric()
-    with gx_matrix:
-        glTranslatef(pos[0], pos[1], 0)
-        for i in range(segments):
-            next_angle = current_angle + angle_delta
-            gluPartialDisk(quadric, inner_radius, outer_radius, 32, 1, current_angle, angle_delta)
-            # For the stipple effect, leave a part of the Disk out
-            current_angle = next_angle + angle_delta
+    _draw_vertices(GL_QUADS, get_stippled_disk_vertices(
+        pos, inner_radius, outer_radius, segments))
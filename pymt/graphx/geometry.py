@@ -0,0 +1,201 @@
+'''
+Geometry: vertices of the shapes drawed by pymt.graphx.draw
+
+The shapes are generated once in unit space, and cached according to the
+parameters that change their topology (precision, corners, slices...). The
+vertices for a position and a size are then computed with one numpy
+operation. No OpenGL call is done here ::
+
+    vertices = get_rounded_rectangle_vertices((10, 10), (100, 50), radius=5)
+    # vertices is a numpy array of (x, y) float32, to be drawed with
+    # glDrawArrays()
+'''
+
+__all__ = ('get_rounded_rectangle_vertices',
+           'get_rounded_rectangle_alpha_vertices',
+           'get_disk_vertices', 'get_partial_disk_vertices',
+           'get_stippled_disk_vertices')
+
+import os
+import math
+import numpy
+from pymt.cache import Cache
+
+if not 'PYMT_DOC' in os.environ:
+    Cache.register('pymt.geometry', limit=256)
+
+def _get_template(key, generate):
+    template = Cache.get('pymt.geometry', key)
+    if template is None:
+        template = generate(*key[1:])
+        Cache.append('pymt.geometry', key, template)
+    return template
+
+def _arc(start, end, precision):
+    # same steps as the original drawing loops
+    angles = []
+    t = start
+    while t < end:
+        angles.append(t)
+        t += precision
+    return angles
+
+def _rounded_rectangle_template(precision, corners, alpha):
+    '''Each vertex is x = kw * w + kr * radius and y = kh * h + kr * radius,
+    returned as a (kw, kh) and a (kr, kr) array. For the alpha version, the
+    index of the alpha of each vertex is also returned (0 is the middle).'''
+    wh = []
+    r = []
+    alphas = []
+
+    def add(kw, kh, krx, kry, a=None):
+        wh.append((kw, kh))
+        r.append((krx, kry))
+        alphas.append(a)
+
+    def arc(kw, kh, krx, kry, start, end, a=None):
+        for t in _arc(start, end, precision):
+            add(kw, kh, krx + math.cos(t), kry + math.sin(t), a)
+
+    pi = math.pi
+    if alpha:
+        # middle, topleft, topright, bottomleft, bottomright
+        add(.5, .5, 0, 0, 0)
+        add(0, 0, 1, 0, 1)
+        add(1, 0, -1, 0, 2)
+        arc(1, 0, -1, 1, pi * 1.5, pi * 2, 2)
+        add(1, 0, 0, 1, 2)
+        add(1, 1, 0, -1, 4)
+        arc(1, 1, -1, -1, 0, pi * .5, 4)
+        add(1, 1, -1, 0, 4)
+        add(0, 1, 1, 0, 3)
+        arc(0, 1, 1, -1, pi * .5, pi, 3)
+        add(0, 1, 0, -1, 3)
+        add(0, 0, 0, 1, 1)
+        arc(0, 0, 1, 1, pi, pi * 1.5, 1)
+        add(0, 0, 1, 0, 1)
+    else:
+        if corners[1]:
+            add(0, 0, 1, 0)
+            add(1, 0, -1, 0)
+            arc(1, 0, -1, 1, pi * 1.5, pi * 2)
+        else:
+            add(1, 0, 0, 0)
+        if corners[2]:
+            add(1, 0, 0, 1)
+            add(1, 1, 0, -1)
+            arc(1, 1, -1, -1, 0, pi * .5)
+        else:
+            add(1, 1, 0, 0)
+        if corners[3]:
+            add(1, 1, -1, 0)
+            add(0, 1, 1, 0)
+            arc(0, 1, 1, -1, pi * .5, pi)
+        else:
+            add(0, 1, 0, 0)
+        if corners[0]:
+            add(0, 1, 0, -1)
+            add(0, 0, 0, 1)
+            arc(0, 0, 1, 1, pi, pi * 1.5)
+        else:
+            add(0, 0, 0, 0)
+
+    wh = numpy.array(wh, dtype='float32')
+    r = numpy.array(r, dtype='float32')
+    if alpha:
+        return wh, r, numpy.array(alphas)
+    return wh, r
+
+def _clamp_radius(size, radius):
+    if size[0] < radius * 2:
+        radius = size[0] / 2
+    if size[1] < radius * 2:
+        radius = size[1] / 2
+    return radius
+
+def get_rounded_rectangle_vertices(pos, size, radius=5, precision=.5,
+                                   corners=(True, True, True, True)):
+    '''Return the vertices of a rounded rectangle, to be drawed as a polygon
+    (see drawRoundedRectangle() for the parameters)'''
+    corners = tuple([bool(x) for x in corners])
+    wh, r = _get_template(('rrect', precision, corners, False),
+                          _rounded_rectangle_template)
+    radius = _clamp_radius(size, radius)
+    vertices = numpy.multiply(wh, (size[0], size[1]), dtype='float32')
+    vertices += r * radius
+    vertices += (pos[0], pos[1])
+    return vertices
+
+def get_rounded_rectangle_alpha_vertices(pos, size, radius=5, alpha=(1, 1, 1, 1),
+                                         precision=.5):
+    '''Return the vertices and the colors of a rounded rectangle alpha
+    layer, to be drawed as a triangle fan (see drawRoundedRectangleAlpha()
+    for the parameters)'''
+    wh, r, alphas = _get_template(('rrect', precision, None, True),
+                                  _rounded_rectangle_template)
+    radius = _clamp_radius(size, radius)
+    vertices = numpy.multiply(wh, (size[0], size[1]), dtype='float32')
+    vertices += r * radius
+    vertices += (pos[0], pos[1])
+    midalpha = 0
+    for a in alpha:
+        midalpha += a
+    midalpha /= len(alpha)
+    values = numpy.array((midalpha, alpha[0], alpha[1], alpha[2], alpha[3]),
+                         dtype='float32')
+    colors = numpy.ones((len(alphas), 4), dtype='float32')
+    colors[:, 3] = values[alphas]
+    return vertices, colors
+
+def _ring_template(slices, start_angle, sweep_angle):
+    '''Unit vertices of a partial disk, as a triangle strip alternating the
+    outer and the inner circle. The angles are in degrees, clockwise from
+    the y axis, like gluPartialDisk().'''
+    angles = numpy.radians(start_angle +
+        sweep_angle * numpy.arange(slices + 1, dtype='float64') / slices)
+    unit = numpy.empty((len(angles) * 2, 2), dtype='float32')
+    unit[0::2, 0] = unit[1::2, 0] = numpy.sin(angles)
+    unit[0::2, 1] = unit[1::2, 1] = numpy.cos(angles)
+    inner = numpy.zeros((len(unit), 1), dtype='float32')
+    inner[1::2] = 1
+    return unit, inner
+
+def _ring_vertices(unit, inner, pos, inner_radius, outer_radius):
+    vertices = unit * (inner * (inner_radius - outer_radius) + outer_radius)
+    vertices += (pos[0], pos[1])
+    return vertices
+
+def get_partial_disk_vertices(pos, inner_radius, outer_radius, slices=32,
+                              start_angle=0, sweep_angle=360):
+    '''Return the vertices of a partial disk, to be drawed as a triangle
+    strip. The angles are in degrees, clockwise from the y axis, like
+    gluPartialDisk().'''
+    unit, inner = _get_template(('ring', slices, start_angle, sweep_angle),
+                                _ring_template)
+    return _ring_vertices(unit, inner, pos, inner_radius, outer_radius)
+
+def get_disk_vertices(pos, inner_radius, outer_radius, slices=32):
+    '''Return the vertices of a disk, to be drawed as a triangle strip. If
+    the inner radius is 0, the disk is filled.'''
+    return get_partial_disk_vertices(pos, inner_radius, outer_radius, slices)
+
+def _stippled_template(segments, slices):
+    '''Unit vertices of the segments of a stippled circle, as quads'''
+    angle_delta = (360 / segments) / 2
+    units = []
+    inners = []
+    for i in xrange(segments):
+        unit, inner = _ring_template(slices, i * angle_delta * 2, angle_delta)
+        # strip to quads: outer i, inner i, inner i + 1, outer i + 1
+        index = numpy.arange(slices)[:, None] * 2 + (0, 1, 3, 2)
+        units.append(unit[index.ravel()])
+        inners.append(inner[index.ravel()])
+    return numpy.concatenate(units), numpy.concatenate(inners)
+
+def get_stippled_disk_vertices(pos, inner_radius, outer_radius, segments=10,
+                               slices=32):
+    '''Return the vertices of a stippled circle, to be drawed as quads (see
+    drawStippledCircle() for the parameters)'''
+    unit, inner = _get_template(('stippled', segments, slices),
+                                _stippled_template)
+    return _ring_vertices(unit, inner, pos, inner_radius, outer_radius)
@@ -5,5 +5,6 @@ Input: All input providers (TUIO, WiiMote, Pen...)
 from pymt.input.postproc import *
 from pymt.input.provider import *
 from pymt.input.factory import *
+from pymt.input.recorder import *
 from pymt.input.providers import *
 from pymt.input.touch import *
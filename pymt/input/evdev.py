@@ -0,0 +1,208 @@
+'''
+Evdev: decode linux input events, and track the multitouch contacts
+
+This module is used by the hidinput and mtdev providers. The events are
+read by large blocks, decoded at once with numpy, and fed to a
+:class:`MultitouchState`. The state of the contacts is kept in preallocated
+slots, and an immutable snapshot of the contacts is made at each
+SYN_REPORT. The reading thread only send the snapshots to the main thread,
+where the touches are created and updated ::
+
+    state = MultitouchState(ranges={'position_x': (0, 4096)})
+    for contacts in state.feed(decode_input_events(data)):
+        for contact in contacts:
+            print contact.id, contact.x, contact.y
+
+Both multitouch protocols are supported: protocol A (anonymous contacts
+separated by SYN_MT_REPORT) and protocol B (slots).
+'''
+
+__all__ = ('MultitouchContact', 'MultitouchState', 'EvdevTouchProvider',
+           'decode_input_events', 'input_event_dtype')
+
+import collections
+import numpy
+from pymt.input.provider import TouchProvider
+
+# Event types and codes, from linux/input.h
+EV_SYN              = 0x00
+EV_ABS              = 0x03
+SYN_REPORT          = 0
+SYN_MT_REPORT       = 2
+ABS_MT_SLOT         = 0x2f
+ABS_MT_TOUCH_MAJOR  = 0x30
+ABS_MT_TOUCH_MINOR  = 0x31
+ABS_MT_POSITION_X   = 0x35
+ABS_MT_POSITION_Y   = 0x36
+ABS_MT_TRACKING_ID  = 0x39
+ABS_MT_PRESSURE     = 0x3a
+
+#: numpy type of struct input_event (timeval, type, code, value)
+input_event_dtype = numpy.dtype([('sec', 'L'), ('usec', 'L'), ('type', 'H'),
+                                 ('code', 'H'), ('value', 'i')])
+
+def decode_input_events(data):
+    '''Decode a buffer of struct input_event, and return the list of
+    (type, code, value) of the EV_SYN and EV_ABS events. The buffer must
+    contain only complete events.'''
+    events = numpy.frombuffer(data, dtype=input_event_dtype)
+    types = events['type']
+    events = events[(types == EV_ABS) | (types == EV_SYN)]
+    return zip(events['type'].tolist(), events['code'].tolist(),
+               events['value'].tolist())
+
+
+#: A contact of a snapshot. The position is normalized, pressure, size_w and
+#: size_h are None if the device doesn't report them.
+MultitouchContact = collections.namedtuple('MultitouchContact',
+    ('id', 'x', 'y', 'pressure', 'size_w', 'size_h'))
+
+# columns of the slots
+_ID, _X, _Y, _PRESSURE, _MAJOR, _MINOR = range(6)
+
+class MultitouchState(object):
+    '''State of the contacts of a multitouch device.
+
+    :Parameters:
+        `ranges` : dict
+            Minimum and maximum of the values, by name: position_x,
+            position_y, pressure, touch_major, touch_minor. The values without
+            range are not normalized.
+        `max_slots` : int, default to 32
+            Maximum number of contacts
+    '''
+
+    _columns = {
+        ABS_MT_TRACKING_ID: _ID,
+        ABS_MT_POSITION_X: _X,
+        ABS_MT_POSITION_Y: _Y,
+        ABS_MT_PRESSURE: _PRESSURE,
+        ABS_MT_TOUCH_MAJOR: _MAJOR,
+        ABS_MT_TOUCH_MINOR: _MINOR,
+    }
+
+    _range_columns = (('position_x', _X), ('position_y', _Y),
+                      ('pressure', _PRESSURE), ('touch_major', _MAJOR),
+                      ('touch_minor', _MINOR))
+
+    def __init__(self, ranges=None, max_slots=32):
+        self.max_slots = max_slots
+        #: 'A' or 'B', detected from the events
+        self.protocol = 'B'
+        # the last slot receive the values of the invalid slots
+        self.slots = numpy.zeros((max_slots + 1, 6), dtype='int32')
+        self.slots[:, _ID] = -1
+        self.mins = numpy.zeros(6)
+        self.scales = numpy.ones(6)
+        for name, column in self._range_columns:
+            if ranges and name in ranges:
+                vmin, vmax = ranges[name]
+                self.mins[column] = vmin
+                if vmax != vmin:
+                    self.scales[column] = 1. / (vmax - vmin)
+        self._reported = [False] * 6
+        self._slot = 0
+        self._count = 0
+        self._changed = False
+
+    def feed(self, events):
+        '''Update the state with a list of (type, code, value) events, and
+        return the snapshots made, one for each SYN_REPORT changing the
+        contacts. A snapshot is a tuple of :class:`MultitouchContact`.'''
+        snapshots = []
+        slots = self.slots
+        columns = self._columns
+        reported = self._reported
+        max_slots = self.max_slots
+        slot = self._slot
+        changed = self._changed
+        for ev_type, ev_code, ev_value in events:
+            if ev_type == EV_ABS:
+                column = columns.get(ev_code)
+                if column is not None:
+                    slots[slot, column] = ev_value
+                    reported[column] = True
+                    changed = True
+                elif ev_code == ABS_MT_SLOT:
+                    slot = ev_value
+                    if slot < 0 or slot >= max_slots:
+                        slot = max_slots
+            elif ev_code == SYN_MT_REPORT:
+                self.protocol = 'A'
+                self._count += 1
+                slot = min(self._count, max_slots)
+                changed = True
+            elif ev_code == SYN_REPORT:
+                if self.protocol == 'A':
+                    # the contacts are sent again at each report
+                    snapshots.append(self._snapshot(slots[:self._count]))
+                    slots[:, _ID] = -1
+                    self._count = slot = 0
+                elif changed:
+                    snapshots.append(self._snapshot(slots[:max_slots]))
+                changed = False
+        self._slot = slot
+        self._changed = changed
+        return snapshots
+
+    def _snapshot(self, rows):
+        rows = rows[rows[:, _ID] >= 0]
+        values = (rows - self.mins) * self.scales
+        values[:, _Y] = 1. - values[:, _Y]
+        reported = self._reported
+        has_pressure = reported[_PRESSURE]
+        has_size = reported[_MAJOR] and reported[_MINOR]
+        contacts = []
+        for tid, row in zip(rows[:, _ID].tolist(), values.tolist()):
+            contacts.append(MultitouchContact(tid, row[_X], row[_Y],
+                row[_PRESSURE] if has_pressure else None,
+                row[_MAJOR] if has_size else None,
+                row[_MINOR] if has_size else None))
+        return tuple(contacts)
+
+
+class EvdevTouchProvider(TouchProvider):
+    '''Base of the providers reading the contacts in a thread. The thread
+    push the snapshots of the contacts in `self.queue`, and the touches are
+    created and updated from the snapshots in the main thread.'''
+
+    #: Class of the touches created
+    touch_class = None
+
+    def __init__(self, device, args):
+        super(EvdevTouchProvider, self).__init__(device, args)
+        self.queue = collections.deque()
+        self.touches = {}
+        self._contacts = {}
+
+    def update(self, dispatch_fn):
+        touches = self.touches
+        last_contacts = self._contacts
+        queue = self.queue
+        while queue:
+            contacts = queue.popleft()
+            actives = set()
+            for contact in contacts:
+                tid = contact.id
+                actives.add(tid)
+                if last_contacts.get(tid) == contact:
+                    continue
+                last_contacts[tid] = contact
+                args = {'id': tid, 'x': contact.x, 'y': contact.y}
+                if contact.pressure is not None:
+                    args['pressure'] = contact.pressure
+                if contact.size_w is not None:
+                    args['size_w'] = contact.size_w
+                    args['size_h'] = contact.size_h
+                touch = touches.get(tid)
+                if touch is None:
+                    touch = touches[tid] = self.touch_class(
+                        self.device, tid, args)
+                    dispatch_fn('down', touch)
+                else:
+                    touch.move(args)
+                    dispatch_fn('move', touch)
+            for tid in touches.keys():
+                if tid not in actives:
+                    del last_contacts[tid]
+                    dispatch_fn('up', touches.pop(tid))
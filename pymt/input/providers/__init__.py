@@ -8,6 +8,7 @@ import os
 
 from pymt.input.providers.tuio import *
 from pymt.input.providers.mouse import *
+from pymt.input.providers.replay import *
 
 if sys.platform == 'win32' or 'PYMT_DOC' in os.environ:
     try:
@@ -31,6 +31,12 @@ configuration ::
     [input]
     t101m = hidinput,/dev/input/event7,max_position_x=32768,max_position_y=32768
 
+The events can also be read from a file captured from the device (for
+example with `cat /dev/input/event7 > capture`), to replay a session ::
+
+    [input]
+    replay = hidinput,capture,max_position_x=32768,max_position_y=32768
+
 '''
 
 __all__ = ('HIDInputTouchProvider', 'HIDTouch')
@@ -63,10 +69,11 @@ if 'PYMT_DOC' in os.environ:
 
 else:
     import threading
-    import collections
     import struct
     import fcntl
-    from pymt.input.provider import TouchProvider
+    import stat
+    from pymt.input.evdev import EvdevTouchProvider, MultitouchState, \
+            decode_input_events
     from pymt.input.factory import TouchFactory
     from pymt.logger import pymt_logger
 
@@ -128,7 +135,9 @@ else:
     struct_input_absinfo_sz = struct.calcsize('iiiiii')
     sz_l = struct.calcsize('Q')
 
-    class HIDInputTouchProvider(TouchProvider):
+    class HIDInputTouchProvider(EvdevTouchProvider):
+
+        touch_class = HIDTouch
 
         options = ('min_position_x', 'max_position_x',
                    'min_position_y', 'max_position_y',
@@ -181,14 +190,11 @@ else:
         def start(self):
             if self.input_fn is None:
                 return
-            self.uid = 0
-            self.queue = collections.deque()
             self.thread = threading.Thread(
                 target=self._thread_run,
                 kwargs=dict(
                     queue=self.queue,
                     input_fn=self.input_fn,
-                    device=self.device,
                     default_ranges=self.default_ranges
                 ))
             self.thread.daemon = True
@@ -197,52 +203,44 @@ else:
         def _thread_run(self, **kwargs):
             input_fn = kwargs.get('input_fn')
             queue = kwargs.get('queue')
-            device = kwargs.get('device')
             drs = kwargs.get('default_ranges').get
-            touches = {}
-            touches_sent = []
-            point = {}
-            l_points = []
 
             # prepare some vars to get limit of some component
-            range_min_position_x    = 0
-            range_max_position_x    = 2048
-            range_min_position_y    = 0
-            range_max_position_y    = 2048
-            range_min_pressure      = 0
-            range_max_pressure      = 255
-
-            def process(points):
-                actives = [args['id'] for args in points]
-                for args in points:
-                    tid = args['id']
-                    try:
-                        touch = touches[tid]
-                        if touch.sx == args['x'] and touch.sy == args['y']:
-                            continue
-                        touch.move(args)
-                        if tid not in touches_sent:
-                            queue.append(('down', touch))
-                            touches_sent.append(tid)
-                        queue.append(('move', touch))
-                    except KeyError:
-                        touch = HIDTouch(device, tid, args)
-                        touches[touch.id] = touch
-
-                for tid in touches.keys()[:]:
-                    if tid not in actives:
-                        touch = touches[tid]
-                        if tid in touches_sent:
-                            queue.append(('up', touch))
-                            touches_sent.remove(tid)
-                        del touches[tid]
-
-            def normalize(value, vmin, vmax):
-                return (value - vmin) / float(vmax - vmin)
+            ranges = {
+                'position_x': (drs('min_position_x', 0),
+                               drs('max_position_x', 2048)),
+                'position_y': (drs('min_position_y', 0),
+                               drs('max_position_y', 2048)),
+                'pressure': (drs('min_pressure', 0),
+                             drs('max_pressure', 255)),
+            }
 
             # open the input
-            fd = open(input_fn, 'rb')
+            fd = os.open(input_fn, os.O_RDONLY)
+
+            # a captured event file can be replayed instead of the device
+            if stat.S_ISCHR(os.fstat(fd).st_mode):
+                self._read_ranges(fd, drs, ranges)
+
+            state = MultitouchState(ranges=ranges)
+            buf = ''
+
+            # read until the end, as much events as available
+            while True:
+                data = os.read(fd, struct_input_event_sz * 256)
+                if not data:
+                    break
+                buf += data
+                size = len(buf) - len(buf) % struct_input_event_sz
+                if not size:
+                    continue
+                events = decode_input_events(buf[:size])
+                buf = buf[size:]
+                queue.extend(state.feed(events))
 
+            os.close(fd)
+
+        def _read_ranges(self, fd, drs, ranges):
             # get the controler name (EVIOCGNAME)
             device_name = fcntl.ioctl(fd, EVIOCGNAME + (256 << 16), " " * 256).split('\x00')[0]
             pymt_logger.info('HIDTouch: using <%s>' % device_name)
@@ -269,83 +267,23 @@ else:
                     abs_value, abs_min, abs_max, abs_fuzz, \
                         abs_flat, abs_res = struct.unpack('iiiiii', absinfo)
                     if y == ABS_MT_POSITION_X:
-                        range_min_position_x = drs('min_position_x', abs_min)
-                        range_max_position_x = drs('max_position_x', abs_max)
+                        ranges['position_x'] = (drs('min_position_x', abs_min),
+                                                drs('max_position_x', abs_max))
                         pymt_logger.info('HIDTouch: ' +
                             '<%s> range position X is %d - %d' % (
                             device_name, abs_min, abs_max))
                     elif y == ABS_MT_POSITION_Y:
-                        range_min_position_y = drs('min_position_y', abs_min)
-                        range_max_position_y = drs('max_position_y', abs_max)
+                        ranges['position_y'] = (drs('min_position_y', abs_min),
+                                                drs('max_position_y', abs_max))
                         pymt_logger.info('HIDTouch: ' +
                             '<%s> range position Y is %d - %d' % (
                             device_name, abs_min, abs_max))
                     elif y == ABS_MT_PRESSURE:
-                        range_min_pressure = drs('min_pressure', abs_min)
-                        range_max_pressure = drs('max_pressure', abs_max)
+                        ranges['pressure'] = (drs('min_pressure', abs_min),
+                                              drs('max_pressure', abs_max))
                         pymt_logger.info('HIDTouch: ' +
                             '<%s> range pressure is %d - %d' % (
                             device_name, abs_min, abs_max))
 
-            # read until the end
-            while fd:
-
-                data = fd.read(struct_input_event_sz)
-                if len(data) < struct_input_event_sz:
-                    break
-
-                # extract each event
-                for i in xrange(len(data) / struct_input_event_sz):
-                    ev = data[i * struct_input_event_sz:]
-
-                    # extract timeval + event infos
-                    tv_sec, tv_usec, ev_type, ev_code, ev_value = \
-                            struct.unpack('LLHHi', ev[:struct_input_event_sz])
-
-                    # sync event
-                    if ev_type == EV_SYN:
-                        if ev_code == SYN_MT_REPORT:
-                            if 'id' not in point:
-                                continue
-                            l_points.append(point)
-                        elif ev_code == SYN_REPORT:
-                            process(l_points)
-                            l_points = []
-
-                    elif ev_type == EV_MSC and ev_code in (MSC_RAW, MSC_SCAN):
-                        pass
-
-                    else:
-                        # compute multitouch track
-                        if ev_code == ABS_MT_TRACKING_ID:
-                            point = {}
-                            point['id'] = ev_value
-                        elif ev_code == ABS_MT_POSITION_X:
-                            point['x'] = normalize(ev_value,
-                                range_min_position_x, range_max_position_x)
-                        elif ev_code == ABS_MT_POSITION_Y:
-                            point['y'] = 1. - normalize(ev_value,
-                                range_min_position_y, range_max_position_y)
-                        elif ev_code == ABS_MT_ORIENTATION:
-                            point['orientation'] = ev_value
-                        elif ev_code == ABS_MT_BLOB_ID:
-                            point['blobid'] = ev_value
-                        elif ev_code == ABS_MT_PRESSURE:
-                            point['pressure'] = normalize(ev_value,
-                                range_min_pressure, range_max_pressure)
-                        elif ev_code == ABS_MT_TOUCH_MAJOR:
-                            point['size_w'] = ev_value
-                        elif ev_code == ABS_MT_TOUCH_MINOR:
-                            point['size_h'] = ev_value
-
-        def update(self, dispatch_fn):
-            # dispatch all event from threads
-            try:
-                while True:
-                    event_type, touch = self.queue.popleft()
-                    dispatch_fn(event_type, touch)
-            except:
-                pass
-
 
     TouchFactory.register('hidinput', HIDInputTouchProvider)
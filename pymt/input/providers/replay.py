@@ -0,0 +1,131 @@
+'''
+Replay: replay the touches recorded by the recorder module
+
+To configure the replay provider, put in your configuration ::
+
+    [input]
+    # name = replay,<filename>[,speed=<speed>][,loop=1]
+    session = replay,/home/user/session.rec
+
+The `speed` option change the speed of the replay : 1 is the recorded speed
+(default), 4 is 4 times faster. With 0, the events are replayed as fast as
+possible : one recorded frame is dispatched at each frame.
+With `loop=1`, the record is replayed again when it's finished.
+
+The touches keep the device, id, profile and attributes of the recorded
+touches. See `pymt.input.recorder` for recording the touches.
+'''
+
+__all__ = ('ReplayTouchProvider', 'ReplayTouch')
+
+from pymt.clock import getClock
+from pymt.logger import pymt_logger
+from pymt.input.provider import TouchProvider
+from pymt.input.factory import TouchFactory
+from pymt.input.touch import Touch
+from pymt.input.recorder import TouchRecordReader
+
+class ReplayTouch(Touch):
+    # attributes recomputed by the touch itself, or private to the
+    # application, that are not replayed
+    ignored_attrs = ('device', 'id', 'attr', 'x', 'y', 'z',
+                     'dxpos', 'dypos', 'dzpos', 'oxpos', 'oypos', 'ozpos',
+                     'dsxpos', 'dsypos', 'dszpos', 'osxpos', 'osypos', 'oszpos',
+                     'time_start', 'userdata')
+
+    def depack(self, args):
+        ignored_attrs = self.ignored_attrs
+        for attr, value in args.iteritems():
+            if attr not in ignored_attrs:
+                setattr(self, attr, value)
+        super(ReplayTouch, self).depack(args)
+
+
+class ReplayTouchProvider(TouchProvider):
+    '''Replay the touches of a record file'''
+
+    options = ('speed', 'loop')
+
+    def __init__(self, device, args):
+        super(ReplayTouchProvider, self).__init__(device, args)
+        args = args.split(',')
+        self.filename = args[0]
+        self.speed = 1.
+        self.loop = False
+        for arg in args[1:]:
+            if arg == '':
+                continue
+            arg = arg.split('=', 1)
+            if len(arg) != 2 or arg[0] not in self.options:
+                pymt_logger.error('Replay: invalid parameter %s' % str(arg))
+                continue
+            key, value = arg
+            if key == 'speed':
+                self.speed = float(value)
+            else:
+                self.loop = value.lower() in ('1', 'true', 'yes')
+        #: Number of events dispatched
+        self.count = 0
+        self.touches = {}
+        self._records = None
+        self._next = None
+        self._start = None
+
+    def start(self):
+        '''Start the replay from the beginning of the record'''
+        self._records = iter(TouchRecordReader(self.filename))
+        self._next = next(self._records, None)
+        self._start = None
+        pymt_logger.info('Replay: Start replay of %s' % self.filename)
+
+    def stop(self):
+        '''Stop the replay'''
+        self._records = self._next = None
+
+    def update(self, dispatch_fn):
+        record = self._next
+        if record is None:
+            return
+        if self.speed:
+            now = getClock().get_time()
+            if self._start is None:
+                self._start = now
+            limit = (now - self._start) * self.speed
+        else:
+            # as fast as possible: one recorded frame at each frame
+            limit = record[1]
+
+        records = self._records
+        touches = self.touches
+        while record is not None and record[1] <= limit:
+            session, timestamp, event, attrs, values = record
+            args = dict(zip(attrs, values))
+            key = (session, args['device'], args['id'])
+            if event == 'down':
+                touch = ReplayTouch(args['device'], args['id'], args)
+                touches[key] = touch
+            else:
+                touch = touches.get(key)
+                if touch is None:
+                    # the down event was not recorded
+                    record = next(records, None)
+                    continue
+                touch.move(args)
+                if event == 'up':
+                    del touches[key]
+            dispatch_fn(event, touch)
+            self.count += 1
+            record = next(records, None)
+        self._next = record
+
+        if record is None:
+            # release the touches still down at the end of the record
+            for touch in touches.itervalues():
+                dispatch_fn('up', touch)
+            touches.clear()
+            if self.loop:
+                self.start()
+            else:
+                pymt_logger.info('Replay: End of %s' % self.filename)
+
+TouchFactory.register('replay', ReplayTouchProvider)
@@ -0,0 +1,189 @@
+'''
+Touch Recorder: record the touch events in a binary file, and read them back
+
+A record file is append-only : it starts with a magic string, followed by
+records. Each record is a small binary header (type, timestamp, size of the
+payload), followed by a marshalled payload :
+
+    * a session record, written each time a recorder is opened on the file.
+      The timestamps of the next records are relative to the start of the
+      session.
+    * a schema record, written the first time a touch class is seen, with
+      the name of the attributes of the touch (`Touch.__attrs__`).
+    * a down, move or up record, with the schema of the touch and the values
+      of all the attributes.
+
+If the application is killed, only the last record can be incomplete, and
+it's ignored by the reader.
+
+To record the touches of an application, activate the recorder module ::
+
+    python myapp.py -m recorder:filename=session.rec
+
+And replay it with the replay provider (see `pymt.input.providers.replay`).
+'''
+
+__all__ = ('TouchRecorder', 'TouchRecordReader')
+
+import marshal
+import struct
+import time
+from pymt.clock import getClock
+from pymt.logger import pymt_logger
+from pymt.input.shape import TouchShapeRect
+
+RECORD_MAGIC = 'PYMTREC1'
+
+# type, timestamp, size of the payload
+record_header = struct.Struct('<cdI')
+
+RECORD_SESSION = 'S'
+RECORD_SCHEMA = 'A'
+
+record_types = {'down': 'D', 'move': 'M', 'up': 'U'}
+record_events = dict((v, k) for k, v in record_types.iteritems())
+
+
+class TouchRecorder(object):
+    '''Append touch events in a record file. The file is created if it
+    doesn't exist.
+
+    The recorder can be used as a postproc module of the event loop : all
+    the events are recorded, and returned unchanged.
+
+    :Parameters:
+        `filename` : str
+            Filename of the record file
+    '''
+
+    def __init__(self, filename):
+        self.filename = filename
+        #: Number of events recorded
+        self.count = 0
+        self._schemas = {}
+        self._start = getClock().get_time()
+        self._fd = open(filename, 'ab')
+        self._fd.seek(0, 2)
+        if self._fd.tell() == 0:
+            self._fd.write(RECORD_MAGIC)
+        self._write(RECORD_SESSION, 0, time.time())
+
+    def _write(self, rtype, timestamp, data):
+        data = marshal.dumps(data, 2)
+        self._fd.write(record_header.pack(rtype, timestamp, len(data)))
+        self._fd.write(data)
+
+    def _get_schema(self, touch, timestamp):
+        cls = touch.__class__
+        schema = self._schemas.get(cls)
+        if schema is None:
+            attrs = cls.__attrs__
+            schema = self._schemas[cls] = (len(self._schemas), attrs,
+                                           list(attrs).index('shape'))
+            self._write(RECORD_SCHEMA, timestamp, schema[:2])
+        return schema
+
+    def record(self, event, touch, timestamp=None):
+        '''Record an event ('down', 'move' or 'up') of a touch'''
+        if self._fd is None:
+            return
+        if timestamp is None:
+            timestamp = getClock().get_time() - self._start
+        index, attrs, shape_index = self._get_schema(touch, timestamp)
+        values = [getattr(touch, x, None) for x in attrs]
+        shape = values[shape_index]
+        if isinstance(shape, TouchShapeRect):
+            values[shape_index] = (shape.width, shape.height)
+        elif shape is not None:
+            values[shape_index] = None
+        try:
+            self._write(record_types[event], timestamp, (index, values))
+        except ValueError:
+            # some values can't be marshalled, drop them
+            self._write(record_types[event], timestamp,
+                        (index, map(_marshallable, values)))
+        self.count += 1
+
+    def process(self, events):
+        timestamp = getClock().get_time() - self._start
+        for event, touch in events:
+            self.record(event, touch, timestamp)
+        self._fd.flush()
+        return events
+
+    def close(self):
+        '''Flush and close the record file'''
+        if self._fd is None:
+            return
+        self._fd.close()
+        self._fd = None
+
+
+def _marshallable(value):
+    try:
+        marshal.dumps(value, 2)
+    except ValueError:
+        return None
+    return value
+
+
+class TouchRecordReader(object):
+    '''Read the events of a record file. Iterate on the reader to get all
+    the events, as (session, timestamp, event, attrs, values) :
+
+        * `session` is the index of the session in the file
+        * `timestamp` is the time of the event, in seconds since the start of
+          the first session. The sessions are played one after the other.
+        * `event` is 'down', 'move' or 'up'
+        * `attrs` is the list of the recorded attributes, and `values` their
+          values.
+
+    :Parameters:
+        `filename` : str
+            Filename of the record file
+    '''
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    def __iter__(self):
+        with open(self.filename, 'rb') as fd:
+            if fd.read(len(RECORD_MAGIC)) != RECORD_MAGIC:
+                raise ValueError('%s is not a touch record file' %
+                                 self.filename)
+            session = -1
+            offset = last = 0
+            schemas = {}
+            header_size = record_header.size
+            unpack = record_header.unpack
+            loads = marshal.loads
+            read = fd.read
+            while True:
+                header = read(header_size)
+                if len(header) < header_size:
+                    break
+                rtype, timestamp, size = unpack(header)
+                data = read(size)
+                if len(data) < size:
+                    pymt_logger.warning('Recorder: %s is truncated, '
+                                        'last record ignored' % self.filename)
+                    break
+                data = loads(data)
+                if rtype == RECORD_SESSION:
+                    session += 1
+                    offset = last
+                    schemas = {}
+                    continue
+                timestamp += offset
+                last = timestamp
+                if rtype == RECORD_SCHEMA:
+                    index, attrs = data
+                    schemas[index] = (attrs, list(attrs).index('shape'))
+                    continue
+                index, values = data
+                attrs, shape_index = schemas[index]
+                shape = values[shape_index]
+                if shape is not None:
+                    rect = values[shape_index] = TouchShapeRect()
+                    rect.width, rect.height = shape
+                yield (session, timestamp, record_events[rtype], attrs, values)
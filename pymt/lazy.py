@@ -0,0 +1,215 @@
+'''
+Lazy: import the PyMT subsystems on first use
+
+`import pymt` loads only the base of PyMT (configuration, logger, clock,
+events, input). The other subsystems (OpenGL drawing, core providers,
+widgets...) are imported the first time one of their names is accessed ::
+
+    import pymt
+    # pymt.ui.widgets.scatter is imported here
+    scatter = pymt.MTScatter()
+
+The core providers (image, text, video, camera...) are selected when their
+module is imported, so only the providers really used are loaded.
+
+`from pymt import *` still imports everything.
+
+The names loaded on demand are listed in :data:`lazy_registry`. A new public
+class of a lazy package must be added in it.
+'''
+
+__all__ = ('LazyModule', 'install_lazy_module', 'lazy_import',
+           'lazy_registry')
+
+import sys
+from types import ModuleType
+
+#: Public names of the modules imported on demand, by module
+lazy_registry = {
+    'pymt.core': ('core_register_libs', 'core_select_lib'),
+    'pymt.core.audio': ('Sound', 'SoundLoader'),
+    'pymt.core.camera': ('Camera', 'CameraBase'),
+    'pymt.core.image': ('Image', 'ImageData', 'ImageLoader'),
+    'pymt.core.spelling': (
+        'NoLanguageSelectedError', 'NoSuchLangError', 'Spelling',
+        'SpellingBase',
+    ),
+    'pymt.core.svg': ('Svg',),
+    'pymt.core.text': ('Label', 'LabelBase'),
+    'pymt.core.text.markup': ('MarkupLabel',),
+    'pymt.core.video': ('Video', 'VideoBase'),
+    'pymt.gesture': (
+        'Gesture', 'GestureDatabase', 'GesturePoint', 'GestureStroke',
+    ),
+    'pymt.graphx.bezier': ('BezierPath',),
+    'pymt.graphx.colors': ('set_color',),
+    'pymt.graphx.css': ('CSSStyle', 'drawCSSRectangle'),
+    'pymt.graphx.draw': (
+        'drawCircle', 'drawLabel', 'drawLine', 'drawPolygon', 'drawRectangle',
+        'drawRectangleAlpha', 'drawRoundedRectangle',
+        'drawRoundedRectangleAlpha', 'drawSemiCircle', 'drawStippledCircle',
+        'drawTexturedRectangle', 'drawTriangle', 'getLabel', 'getLastLabel',
+    ),
+    'pymt.graphx.fbo': (
+        'Fbo', 'HardwareFbo', 'SoftwareFbo', 'UnsupportedFboException',
+    ),
+    'pymt.graphx.geometry': (
+        'get_disk_vertices', 'get_partial_disk_vertices',
+        'get_rounded_rectangle_alpha_vertices',
+        'get_rounded_rectangle_vertices', 'get_stippled_disk_vertices',
+    ),
+    'pymt.graphx.paint': (
+        'get_texture_id', 'get_texture_target', 'paintLine', 'set_brush',
+        'set_brush_size', 'set_texture',
+    ),
+    'pymt.graphx.shader': ('Shader', 'ShaderException'),
+    'pymt.graphx.statement': (
+        'DO', 'GlAttrib', 'GlBegin', 'GlBlending', 'GlColor', 'GlDisplayList',
+        'GlEnable', 'GlMatrix', 'GlTexture', 'gx_alphablending', 'gx_attrib',
+        'gx_begin', 'gx_blending', 'gx_blending_replace', 'gx_color',
+        'gx_enable', 'gx_matrix', 'gx_matrix_identity', 'gx_texture',
+    ),
+    'pymt.graphx.stencil': (
+        'GlStencil', 'gx_stencil', 'stencilPop', 'stencilPush', 'stencilUse',
+    ),
+    'pymt.loader': ('Loader', 'LoaderBase', 'ProxyImage'),
+    'pymt.modules': ('pymt_modules',),
+    'pymt.obj': ('Material', 'MaterialGroup', 'Mesh', 'OBJ'),
+    'pymt.texture': ('PixelBuffer', 'Texture', 'TextureRegion'),
+    'pymt.ui.animation': ('Animation', 'AnimationAlpha', 'Delay', 'Repeat'),
+    'pymt.ui.colors': (
+        'css_add_file', 'css_add_keyword', 'css_add_sheet', 'css_get_style',
+        'css_get_widget_id', 'css_register_prefix', 'css_register_state',
+        'css_reload', 'get_truncated_classname', 'pymt_sheet',
+    ),
+    'pymt.ui.factory': ('MTWidgetFactory',),
+    'pymt.ui.widgets.button': ('MTButton', 'MTImageButton', 'MTToggleButton'),
+    'pymt.ui.widgets.buttonmatrix': ('MTButtonMatrix',),
+    'pymt.ui.widgets.circularslider': ('MTCircularSlider', 'RangeException'),
+    'pymt.ui.widgets.composed.colorpick': ('MTColorPicker',),
+    'pymt.ui.widgets.composed.filebrowser': (
+        'MTFileBrowser', 'MTFileBrowserView', 'MTFileEntryView',
+        'MTFileIconEntryView', 'MTFileListEntryView',
+    ),
+    'pymt.ui.widgets.composed.innerwindow': ('MTInnerWindow',),
+    'pymt.ui.widgets.composed.kineticlist': (
+        'MTKineticImage', 'MTKineticItem', 'MTKineticList',
+        'MTKineticListModel', 'MTKineticObject',
+    ),
+    'pymt.ui.widgets.composed.modalpopup': ('MTModalPopup',),
+    'pymt.ui.widgets.composed.popup': ('MTPopup',),
+    'pymt.ui.widgets.composed.tabs': ('MTTabs',),
+    'pymt.ui.widgets.composed.textarea': ('MTTextArea',),
+    'pymt.ui.widgets.composed.textinput': ('MTTextInput',),
+    'pymt.ui.widgets.composed.video': ('MTSimpleVideo', 'MTVideo'),
+    'pymt.ui.widgets.composed.vkeyboard': (
+        'KeyboardLayout', 'KeyboardLayoutAZERTY', 'KeyboardLayoutQWERTY',
+        'MTVKeyboard',
+    ),
+    'pymt.ui.widgets.composed.vkeyboardspellcheck': ('MTSpellVKeyboard',),
+    'pymt.ui.widgets.container': ('MTContainer', 'MTScatterContainer'),
+    'pymt.ui.widgets.coverflow': ('MTCoverFlow',),
+    'pymt.ui.widgets.dragable': ('MTDragable',),
+    'pymt.ui.widgets.flippable': ('MTFlippableWidget',),
+    'pymt.ui.widgets.gesturewidget': ('MTGestureWidget',),
+    'pymt.ui.widgets.image': ('MTImage',),
+    'pymt.ui.widgets.kinetic': ('MTKinetic',),
+    'pymt.ui.widgets.klist': ('MTList', 'MTListContainer'),
+    'pymt.ui.widgets.label': ('MTLabel',),
+    'pymt.ui.widgets.layout.abstractlayout': ('MTAbstractLayout',),
+    'pymt.ui.widgets.layout.anchorlayout': ('MTAnchorLayout',),
+    'pymt.ui.widgets.layout.boxlayout': ('MTBoxLayout',),
+    'pymt.ui.widgets.layout.gridlayout': (
+        'GridLayoutException', 'MTGridLayout',
+    ),
+    'pymt.ui.widgets.layout.screenlayout': ('MTScreenLayout',),
+    'pymt.ui.widgets.modalwindow': ('MTModalWindow',),
+    'pymt.ui.widgets.objectdisplay': ('MTObjectDisplay',),
+    'pymt.ui.widgets.radial': ('MTVectorSlider',),
+    'pymt.ui.widgets.rectangle': ('MTRectangularWidget',),
+    'pymt.ui.widgets.scatter': (
+        'MTScatter', 'MTScatterImage', 'MTScatterPlane', 'MTScatterSvg',
+        'MTScatterWidget',
+    ),
+    'pymt.ui.widgets.sidepanel': ('MTSidePanel',),
+    'pymt.ui.widgets.slider': (
+        'MTBoundarySlider', 'MTMultiSlider', 'MTSlider', 'MTXYSlider',
+    ),
+    'pymt.ui.widgets.spatial': ('MTSpatialWidget', 'SpatialGrid'),
+    'pymt.ui.widgets.speechbubble': ('MTSpeechBubble',),
+    'pymt.ui.widgets.stencilcontainer': ('MTStencilContainer',),
+    'pymt.ui.widgets.svg': ('MTSvg', 'MTSvgButton'),
+    'pymt.ui.widgets.widget': ('MTWidget', 'getWidgetById'),
+    'pymt.ui.widgets.xmlwidget': ('XMLWidget',),
+    'pymt.ui.window': ('BaseWindow', 'MTDisplay', 'MTWindow'),
+}
+
+# name -> module defining it
+_lazy_names = {}
+for _module, _names in lazy_registry.iteritems():
+    for _name in _names:
+        _lazy_names[_name] = _module
+del _module, _names, _name
+
+
+def lazy_import(name, package='pymt'):
+    '''Import the module defining `name` in `package`, and return the value.
+    Raise AttributeError if the name is unknown.'''
+    module = _lazy_names.get(name)
+    if module is None or not module.startswith(package + '.'):
+        raise AttributeError(name)
+    __import__(module)
+    return getattr(sys.modules[module], name)
+
+
+class LazyModule(ModuleType):
+    '''Module resolving the names of :data:`lazy_registry` on first access.
+    Other names are searched in the wrapped module, so the globals defined
+    after the installation are available too.'''
+
+    def __init__(self, module):
+        super(LazyModule, self).__init__(module.__name__, module.__doc__)
+        # keep a reference: when a module is deleted, his globals are reset
+        self.__dict__['_LazyModule__module'] = module
+        for attr in ('__file__', '__path__', '__package__'):
+            if hasattr(module, attr):
+                self.__dict__[attr] = getattr(module, attr)
+
+    def __getattr__(self, name):
+        module = self.__module
+        if name in module.__dict__:
+            return module.__dict__[name]
+        if name == '__all__':
+            return self._get_all()
+        if name.startswith('__'):
+            raise AttributeError(name)
+        fullname = '%s.%s' % (self.__name__, name)
+        if [x for x in lazy_registry if x == fullname or
+            x.startswith(fullname + '.')]:
+            __import__(fullname)
+            return sys.modules[fullname]
+        value = lazy_import(name, self.__name__)
+        setattr(self, name, value)
+        return value
+
+    def _get_all(self):
+        # names exported by "from package import *"
+        names = [x for x in self.__module.__dict__.keys() +
+                 self.__dict__.keys() if not x.startswith('_')]
+        prefix = self.__name__ + '.'
+        names += [name for name, module in _lazy_names.iteritems()
+                  if module.startswith(prefix)]
+        return list(set(names))
+
+    def __dir__(self):
+        return sorted(set(self.__dict__.keys() + self._get_all()))
+
+
+def install_lazy_module(name):
+    '''Replace the module `name` in sys.modules by a :class:`LazyModule`.
+    Must be called at the beginning of the package, before the import of
+    any submodule.'''
+    module = sys.modules[name]
+    if not isinstance(module, LazyModule):
+        sys.modules[name] = LazyModule(module)
+    return sys.modules[name]
@@ -5,16 +5,25 @@ Example usage:
     my_svg = squirtle.SVG('filename.svg')
     my_svg.draw(100, 200, angle=15)
 
+The parsing and tessellation produce flat vertex/color arrays, which are
+stored in ~/.pymt/svg, keyed by the content of the file and the tessellation
+parameters. The next runs read the arrays back without parsing the file.
+Many files can be tessellated at startup in a pool of processes ::
+
+    squirtle.precache(['icon1.svg', 'icon2.svg'])
+
 '''
 
-__all__ = ('SVG', 'setup_gl')
+__all__ = ('SVG', 'setup_gl', 'precache')
 
 from OpenGL.GL import GL_BLEND, GL_LINE_SMOOTH, GL_SRC_ALPHA, \
         GL_ONE_MINUS_SRC_ALPHA, GL_COMPILE, GL_TRIANGLES, GL_LINES, \
-        GL_TRIANGLE_FAN, GL_TRIANGLE_STRIP, \
+        GL_TRIANGLE_FAN, GL_TRIANGLE_STRIP, GL_FLOAT, GL_UNSIGNED_BYTE, \
+        GL_VERTEX_ARRAY, GL_COLOR_ARRAY, GL_CLIENT_VERTEX_ARRAY_BIT, \
         glEnable, glGenLists, glNewList, glEndList, glPushMatrix, \
         glPopMatrix, glTranslatef, glRotatef, glScalef, glCallList, \
-        glBegin, glEnd, glColor4ub, glVertex3f, glBlendFunc
+        glBlendFunc, glPushClientAttrib, glPopClientAttrib, \
+        glEnableClientState, glVertexPointer, glColorPointer, glDrawArrays
 from OpenGL.GLU import GLU_TESS_WINDING_RULE, GLU_TESS_WINDING_NONZERO, \
         GLU_TESS_VERTEX, GLU_TESS_BEGIN, GLU_TESS_END, GLU_TESS_ERROR, \
         GLU_TESS_COMBINE, \
@@ -22,19 +31,38 @@ from OpenGL.GLU import GLU_TESS_WINDING_RULE, GLU_TESS_WINDING_NONZERO, \
         gluTessBeginContour, gluTessEndContour, gluTessBeginPolygon, \
         gluTessEndPolygon, gluTessVertex, gluErrorString
 from xml.etree.cElementTree import parse
+from hashlib import sha1
+from numpy import array, empty, frombuffer, float32, uint8
+import os
 import re
 import math
+import struct
+import cPickle
 try:
     # get the faster one
     from cStringIO import StringIO
 except ImportError:
     # fallback to the default one
     from StringIO import StringIO
+from pymt import pymt_home_dir
 from pymt.logger import pymt_logger
 
 BEZIER_POINTS = 10
 CIRCLE_POINTS = 24
 TOLERANCE = 0.001
+
+#: Version of the geometry cache format. Change it when the format or the
+#: tessellation change.
+SVG_CACHE_VERSION = 1
+
+#: Directory of the geometry cache, None to disable it
+cache_path = None
+if pymt_home_dir is not None:
+    cache_path = os.path.join(pymt_home_dir, 'svg')
+
+_cache_magic = 'PYMTSVG'
+_cache_header = struct.Struct('<7sBI')
+
 def setup_gl():
     """Set various pieces of OpenGL state for better rendering of SVG.
 
@@ -402,16 +430,7 @@ class SVG(object):
                 Raw data string (you need to set a fake filename for cache anyway)
                 Defaults to None.
         """
-        self._tess = gluNewTess()
-        gluTessNormal(self._tess, 0, 0, 1)
-        gluTessProperty(self._tess, GLU_TESS_WINDING_RULE, GLU_TESS_WINDING_NONZERO)
-
-        self.filename = filename
-        self.rawdata = rawdata
-        self.bezier_points = bezier_points
-        self.circle_points = circle_points
-        self.bezier_coefficients = []
-        self.gradients = GradientContainer()
+        self._init_parser(filename, rawdata, bezier_points, circle_points)
         self.generate_disp_list()
         self.anchor_x = anchor_x
         self.anchor_y = anchor_y
@@ -448,25 +467,68 @@ class SVG(object):
 
     anchor_y = property(_get_anchor_y, _set_anchor_y)
 
+    def _init_parser(self, filename, rawdata, bezier_points, circle_points):
+        self.filename = filename
+        self.rawdata = rawdata
+        self.bezier_points = bezier_points
+        self.circle_points = circle_points
+        self.bezier_coefficients = []
+        self.gradients = GradientContainer()
+
+    @staticmethod
+    def load_geometry(filename, bezier_points=BEZIER_POINTS,
+                      circle_points=CIRCLE_POINTS, rawdata=None):
+        """Return the geometry of an SVG file, as a tuple (width, height,
+        vertices, colors, runs), without using OpenGL. The geometry is read
+        from the cache if possible, otherwise the file is parsed and
+        tessellated, and the result is written in the cache.
+
+        `vertices` is a float32 array of (x, y), `colors` an uint8 array of
+        (r, g, b, a), and `runs` a list of (mode, first, count) to draw with
+        glDrawArrays().
+        """
+        svg = SVG.__new__(SVG)
+        svg._init_parser(filename, rawdata, bezier_points, circle_points)
+        return svg._load_geometry()
+
+    def _load_geometry(self):
+        if self.rawdata is not None:
+            data = self.rawdata
+        else:
+            with open(self.filename, 'rb') as fd:
+                data = fd.read()
+        digest = sha1(data)
+        digest.update(repr((SVG_CACHE_VERSION, self.bezier_points,
+                            self.circle_points)))
+        digest = digest.hexdigest()
+
+        geometry = _read_cache(digest)
+        if geometry is not None:
+            return geometry
+
+        if data[:3] == '\x1f\x8b\x08': #gzip magic numbers
+            import gzip
+            f = gzip.GzipFile(fileobj=StringIO(data), mode='rb')
+        else:
+            f = StringIO(data)
+        self.tree = parse(f)
+        self.parse_doc()
+        geometry = self.tessellate()
+        _write_cache(digest, geometry)
+        return geometry
+
     def generate_disp_list(self):
-        if (self.filename, self.bezier_points) in self._disp_list_cache:
-            self.disp_list, self.width, self.height = self._disp_list_cache[self.filename, self.bezier_points]
+        key = (self.filename, self.bezier_points, self.circle_points)
+        if key in self._disp_list_cache:
+            self.disp_list, self.width, self.height = self._disp_list_cache[key]
         else:
-            if self.rawdata != None:
-                f = StringIO(self.rawdata)
-            else:
-                if open(self.filename, 'rb').read(3) == '\x1f\x8b\x08': #gzip magic numbers
-                    import gzip
-                    f = gzip.open(self.filename, 'rb')
-                else:
-                    f = open(self.filename, 'rb')
-            self.tree = parse(f)
-            self.parse_doc()
+            self.width, self.height, self.vertices, self.colors, self.runs = \
+                    self._load_geometry()
             self.disp_list = glGenLists(1)
             glNewList(self.disp_list, GL_COMPILE)
-            self.render_slowly()
+            self.render_arrays()
             glEndList()
-            self._disp_list_cache[self.filename, self.bezier_points] = (self.disp_list, self.width, self.height)
+            self._disp_list_cache[key] = (self.disp_list, self.width, self.height)
 
     def draw(self, x, y, z=0, angle=0, scale=1):
         """Draws the SVG to screen.
@@ -500,46 +562,67 @@ class SVG(object):
         glCallList(self.disp_list)
         glPopMatrix()
 
-    def render_slowly(self):
+    def render_arrays(self):
+        """Draw the tessellated arrays (used to compile the display list)"""
         self.n_tris = 0
         self.n_lines = 0
+        glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glVertexPointer(2, GL_FLOAT, 0, self.vertices)
+        glColorPointer(4, GL_UNSIGNED_BYTE, 0, self.colors)
+        for mode, first, count in self.runs:
+            if mode == GL_TRIANGLES:
+                self.n_tris += count / 3
+            else:
+                self.n_lines += count / 2
+            glDrawArrays(mode, first, count)
+        glPopClientAttrib()
+
+    def tessellate(self):
+        """Convert the parsed paths to flat arrays. The triangles of the
+        fills and the lines of the strokes are kept in the drawing order, as
+        runs of the same primitive. Return (width, height, vertices, colors,
+        runs)."""
+        vertices = []
+        colors = []
+        runs = []
+
+        def push(mode, points, color, transform):
+            if isinstance(color, str):
+                g = self.gradients[color]
+                colors.extend([g.interp(x) for x in points])
+            else:
+                colors.extend([color] * len(points))
+            a, b, c, d, e, f = transform.values
+            vertices.extend([(a * x + c * y + e, b * x + d * y + f)
+                             for x, y in points])
+            if runs and runs[-1][0] == mode:
+                runs[-1][2] += len(points)
+            else:
+                runs.append([mode, len(vertices) - len(points), len(points)])
+
         for path, stroke, tris, fill, transform in self.paths:
             if tris:
-                self.n_tris += len(tris)/3
-                if isinstance(fill, str):
-                    g = self.gradients[fill]
-                    fills = [g.interp(x) for x in tris]
-                else:
-                    fills = [fill for x in tris]
-                #pyglet.graphics.draw(len(tris), GL_TRIANGLES,
-                #                     ('v3f', sum((x + [0] for x in tris), [])),
-                #                     ('c3B', sum(fills, [])))
-                glBegin(GL_TRIANGLES)
-                for vtx, clr in zip(tris, fills):
-                    vtx = transform(vtx)
-                    glColor4ub(*clr)
-                    glVertex3f(vtx[0], vtx[1], 0)
-                glEnd()
+                push(GL_TRIANGLES, tris, fill, transform)
             if path:
                 for loop in path:
-                    self.n_lines += len(loop) - 1
                     loop_plus = []
                     for i in xrange(len(loop) - 1):
                         loop_plus += [loop[i], loop[i+1]]
-                    if isinstance(stroke, str):
-                        g = self.gradients[stroke]
-                        strokes = [g.interp(x) for x in loop_plus]
-                    else:
-                        strokes = [stroke for x in loop_plus]
-                    #pyglet.graphics.draw(len(loop_plus), GL_LINES,
-                    #                     ('v3f', sum((x + [0] for x in loop_plus), [])),
-                    #                     ('c3B', sum((stroke for x in loop_plus), [])))
-                    glBegin(GL_LINES)
-                    for vtx, clr in zip(loop_plus, strokes):
-                        vtx = transform(vtx)
-                        glColor4ub(*clr)
-                        glVertex3f(vtx[0], vtx[1], 0)
-                    glEnd()
+                    if loop_plus:
+                        push(GL_LINES, loop_plus, stroke, transform)
+
+        count = len(vertices)
+        if count:
+            vertices = array(vertices, dtype=float32).reshape(-1)
+            colors = array(colors, dtype=uint8).reshape(-1)
+        else:
+            vertices = empty(0, dtype=float32)
+            colors = empty(0, dtype=uint8)
+        runs = [(int(mode), first, n) for mode, first, n in runs]
+        return self.width, self.height, vertices, colors, runs
+
     def parse_float(self, txt):
         if txt.endswith('px'):
             return float(txt[:-2])
@@ -825,6 +908,12 @@ class SVG(object):
         self.path = []
 
     def triangulate(self, looplist):
+        if self._tess is None:
+            # the tessellator doesn't need an OpenGL context
+            self._tess = gluNewTess()
+            gluTessNormal(self._tess, 0, 0, 1)
+            gluTessProperty(self._tess, GLU_TESS_WINDING_RULE,
+                            GLU_TESS_WINDING_NONZERO)
         tlist = []
         self.curr_shape = []
 
@@ -901,3 +990,105 @@ class SVG(object):
 
     def warn(self, message):
         pymt_logger.warning('Squirtle: svg parser on %s: %s' % (self.filename, message))
+
+
+def _get_cache_filename(digest):
+    return os.path.join(cache_path, '%s.svgcache' % digest)
+
+def _read_cache(digest):
+    '''(internal) Read the geometry of a svg from the cache, or return None
+    if it's not in the cache'''
+    if cache_path is None:
+        return None
+    try:
+        fd = open(_get_cache_filename(digest), 'rb')
+        try:
+            magic, version, length = _cache_header.unpack(
+                fd.read(_cache_header.size))
+            if magic != _cache_magic or version != SVG_CACHE_VERSION:
+                return None
+            header = cPickle.loads(fd.read(length))
+            count = header['count']
+            vertices = frombuffer(fd.read(count * 8), dtype=float32)
+            colors = frombuffer(fd.read(count * 4), dtype=uint8)
+        finally:
+            fd.close()
+    except (IOError, OSError, struct.error, cPickle.UnpicklingError,
+            EOFError, ValueError, KeyError):
+        return None
+    if len(vertices) != count * 2 or len(colors) != count * 4:
+        return None
+    return header['width'], header['height'], vertices, colors, header['runs']
+
+def _write_cache(digest, geometry):
+    '''(internal) Write the geometry of a svg in the cache: a small header,
+    followed by the vertices and the colors.'''
+    if cache_path is None:
+        return
+    width, height, vertices, colors, runs = geometry
+    cachefn = _get_cache_filename(digest)
+    tmpfn = '%s.%d.tmp' % (cachefn, os.getpid())
+    try:
+        if not os.path.isdir(cache_path):
+            os.makedirs(cache_path)
+        pickled = cPickle.dumps({
+            'width': width,
+            'height': height,
+            'count': len(vertices) / 2,
+            'runs': runs}, 2)
+        fd = open(tmpfn, 'wb')
+        try:
+            fd.write(_cache_header.pack(_cache_magic, SVG_CACHE_VERSION,
+                                        len(pickled)))
+            fd.write(pickled)
+            fd.write(vertices.tostring())
+            fd.write(colors.tostring())
+        finally:
+            fd.close()
+        os.rename(tmpfn, cachefn)
+    except (IOError, OSError), e:
+        pymt_logger.debug('Squirtle: unable to write cache for %s: %s' % (
+            digest, e))
+        try:
+            os.unlink(tmpfn)
+        except OSError:
+            pass
+
+def _precache_file(args):
+    '''(internal) Tessellate a file in a worker process'''
+    filename, bezier_points, circle_points = args
+    try:
+        SVG.load_geometry(filename, bezier_points, circle_points)
+    except Exception:
+        pymt_logger.exception('Squirtle: unable to tessellate %s' % filename)
+        return False
+    return True
+
+def precache(filenames, processes=None, bezier_points=BEZIER_POINTS,
+             circle_points=CIRCLE_POINTS):
+    '''Tessellate many svg files in a pool of processes, and store their
+    geometry in the cache. The files already in the cache are only read.
+    Return the list of the files that failed.
+
+    :Parameters:
+        `filenames` : list
+            Filenames of the svg
+        `processes` : int, default to None
+            Number of processes, default to the number of CPUs
+        `bezier_points` : int
+            Must be the same as the SVG() that will use the cache
+        `circle_points` : int
+            Must be the same as the SVG() that will use the cache
+    '''
+    from multiprocessing import Pool
+    filenames = list(filenames)
+    if cache_path is None or not filenames:
+        return []
+    args = [(x, bezier_points, circle_points) for x in filenames]
+    pool = Pool(processes)
+    try:
+        results = pool.map(_precache_file, args)
+    finally:
+        pool.close()
+        pool.join()
+    return [x for x, ok in zip(filenames, results) if not ok]
@@ -16,22 +16,59 @@ If you want to change the default loading image, you can do ::
 
     Loader.loading_image = Image('another_loading.png')
 
+The loader can also load any kind of data. The loading function is called in
+the loader, and the callback from the main thread ::
+
+    def load_text(filename):
+        return open(filename).read()
+
+    def on_load(filename, data):
+        print 'got', len(data), 'bytes'
+
+    Loader.load('README', load_text, on_load)
+
+The requests are loaded by a pool of threads, from the highest priority to
+the lowest. The most recent requests are loaded first for the same priority.
+If your application shows many images, you can give an higher priority to
+the visible ones, or change it later ::
+
+    image = Loader.image('thumbnail.jpg', priority=10)
+    Loader.prioritize('thumbnail.jpg', 0)
+
+When every ProxyImage of a filename is garbage collected before the image is
+loaded, the request is cancelled. You can also cancel it yourself with
+Loader.cancel(filename).
+
+The loaded data are delivered from the main thread, and the loader don't
+spend more than `time_budget` seconds per frame to do it.
+
+If you only need a small version of an image, give the size you want. The
+image is scaled once, and stored in the thumbnail cache (see
+`pymt.thumbnail`): the next time, it's read from the disk without decoding
+the original image ::
+
+    image = Loader.image('holidays.jpg', size=(128, 128))
 '''
 
 __all__ = ('Loader', 'LoaderBase', 'ProxyImage')
 
 from pymt import pymt_data_dir
 from pymt.logger import pymt_logger
+from pymt.base import requestRedraw
 from pymt.clock import getClock
 from pymt.cache import Cache
-from pymt.utils import SafeList
 from pymt.core.image import ImageLoader, Image
 from pymt.event import EventDispatcher
+from pymt import thumbnail
 from abc import ABCMeta, abstractmethod
+from heapq import heappush, heappop
+from functools import partial
 
 import time
 import collections
 import os
+import threading
+import weakref
 
 # Register a cache for loader
 Cache.register('pymt.loader', limit=500, timeout=60)
@@ -57,6 +94,26 @@ class ProxyImage(Image, EventDispatcher):
         pass
 
 
+class _LoaderRequest(object):
+    '''(internal) A request in the loader queue'''
+
+    __slots__ = ('filename', 'load_callback', 'post_callback', 'callback',
+                 'priority', 'seq', 'cancelled', 'size', 'key')
+
+    def __init__(self, filename, load_callback, post_callback, callback,
+                 priority, size=None, key=None):
+        self.filename = filename
+        self.size = size
+        self.key = key
+        self.load_callback = load_callback
+        self.post_callback = post_callback
+        self.callback = callback
+        self.priority = priority
+        # sequence of the entry in the queue, None when it's not queued
+        self.seq = None
+        self.cancelled = False
+
+
 class LoaderBase(object):
     '''Common base for Loader and specific implementation.
     By default, Loader will be the best available loader implementation.
@@ -67,18 +124,27 @@ class LoaderBase(object):
 
     __metaclass__ = ABCMeta
 
+    #: Maximum time spent by _update() to deliver the loaded data, in
+    #: seconds. At least one data is delivered at each update.
+    time_budget = 1 / 200.
+
     def __init__(self):
 
         self._loading_image = None
         self._error_image = None
 
-        self._q_load  = collections.deque()
+        # heap of (-priority, -seq, request), protected by _q_cond
+        self._q_load  = []
+        self._q_cond  = threading.Condition()
+        self._q_seq   = 0
         self._q_done  = collections.deque()
-        self._client  = SafeList()
+        # pending image requests, and weak references to their clients
+        self._requests = {}
+        self._clients = {}
         self._running = False
         self._start_wanted = False
 
-        getClock().schedule_interval(self._update, 1 / 25.)
+        getClock().schedule_interval(self._update, 1 / 25., background=True)
 
     def __del__(self):
         try:
@@ -116,25 +182,79 @@ class LoaderBase(object):
     def stop(self):
         '''Stop the loader thread/process'''
         self._running = False
+        with self._q_cond:
+            self._q_cond.notifyAll()
+
+    def _push_request(self, request):
+        '''(internal) Add a request in the queue'''
+        with self._q_cond:
+            self._q_seq += 1
+            request.seq = self._q_seq
+            heappush(self._q_load, (-request.priority, -request.seq, request))
+            self._q_cond.notify()
+        self._start_wanted = True
+
+    def _pop_request(self, block=False):
+        '''(internal) Return the request with the highest priority. If the
+        queue is empty, wait for a request if `block` is True, or return
+        None. None is also returned when the loader is stopped.'''
+        with self._q_cond:
+            while True:
+                while self._q_load:
+                    priority, seq, request = heappop(self._q_load)
+                    # skip the cancelled requests, and the old entries of
+                    # the requests that have been prioritized again
+                    if request.cancelled or request.seq != -seq:
+                        continue
+                    request.seq = None
+                    return request
+                if not block or not self._running:
+                    return None
+                self._q_cond.wait()
 
-    def _load(self, parameters):
+    def _load(self, request):
         '''(internal) Loading function, called by the thread.
         Will call _load_local() if the file is local,
         or _load_urllib() if the file is on Internet'''
 
-        filename, load_callback, post_callback = parameters
+        filename = request.filename
+        if request.callback is not None:
+            # generic loading, see load()
+            try:
+                data = request.load_callback(filename)
+            except Exception:
+                pymt_logger.exception('Loader: failed to load <%s>' % filename)
+                data = None
+            self._q_done.append((request, data))
+            return
+
         proto = filename.split(':', 1)[0]
-        if load_callback is not None:
-            data = load_callback(filename)
-        elif proto in ('http', 'https', 'ftp'):
-            data = self._load_urllib(filename)
-        else:
-            data = self._load_local(filename)
+        try:
+            if request.size is not None and thumbnail.Thumbnails is not None:
+                data = self._load_thumbnail(filename, request.size,
+                                            request.load_callback)
+            elif request.load_callback is not None:
+                data = request.load_callback(filename)
+            elif proto in ('http', 'https', 'ftp'):
+                data = self._load_urllib(filename)
+            else:
+                data = self._load_local(filename)
+
+            if request.post_callback:
+                data = request.post_callback(data)
+        except Exception:
+            pymt_logger.exception('Loader: failed to load image <%s>' % filename)
+            data = self.error_image
 
-        if post_callback:
-            data = post_callback(data)
+        self._q_done.append((request, data))
 
-        self._q_done.append((filename, data))
+    def _load_thumbnail(self, filename, size, load_callback=None):
+        '''(internal) Loading a thumbnail of an image, from the thumbnail
+        cache if possible'''
+        proto = filename.split(':', 1)[0]
+        if proto in ('http', 'https', 'ftp'):
+            return thumbnail.Thumbnails.load_url(filename, size, load_callback)
+        return thumbnail.Thumbnails.load(filename, size, load_callback)
 
     def _load_local(self, filename):
         '''(internal) Loading a local file'''
@@ -177,27 +297,64 @@ class LoaderBase(object):
                 self.start()
             self._start_wanted = False
 
-        while True:
-            try:
-                filename, data = self._q_done.pop()
-            except IndexError:
-                return
-
-            # create the image
-            image = data#ProxyImage(data)
-            Cache.append('pymt.loader', filename, image)
-
-            # update client
-            for c_filename, client in self._client[:]:
-                if filename != c_filename:
-                    continue
-                # got one client to update
-                client.image = image
-                client.loaded = True
-                client.dispatch_event('on_load')
-                self._client.remove((c_filename, client))
-
-    def image(self, filename, load_callback=None, post_callback=None):
+        q_done = self._q_done
+        if q_done:
+            requestRedraw()
+        deadline = time.time() + self.time_budget
+        while q_done:
+            request, data = q_done.popleft()
+            filename = request.filename
+
+            if request.callback is not None:
+                request.callback(filename, data)
+            else:
+                self._deliver_image(request.key, data)
+
+            # don't block the frame, the next data will be delivered later
+            if time.time() > deadline:
+                break
+
+    def _deliver_image(self, key, data):
+        '''(internal) Store a loaded image in the cache, and update the
+        clients waiting for it'''
+        # create the image
+        image = data
+        Cache.append('pymt.loader', key, image)
+
+        # the image is here, a pending request of the same file is useless
+        request = self._requests.pop(key, None)
+        if request is not None:
+            request.cancelled = True
+
+        # update client
+        for ref in self._clients.pop(key, ()):
+            client = ref()
+            if client is None:
+                continue
+            # got one client to update
+            client.image = image
+            client.loaded = True
+            client.dispatch_event('on_load')
+
+    def _client_dead(self, key, ref):
+        '''(internal) Called when a ProxyImage is garbage collected. If
+        nobody is waiting for the image anymore, the loading is cancelled.'''
+        clients = self._clients.get(key)
+        if clients is None:
+            return
+        if ref in clients:
+            clients.remove(ref)
+        if not clients:
+            self._cancel(key)
+
+    def _get_key(self, filename, size):
+        '''(internal) Key of an image in the cache and the requests'''
+        if size is None:
+            return filename
+        return (filename, tuple(size))
+
+    def image(self, filename, load_callback=None, post_callback=None,
+              priority=0, size=None):
         '''Load a image using loader. A Proxy image is returned
         with a loading image ::
 
@@ -208,9 +365,13 @@ class LoaderBase(object):
             # the loader will change the img.image property
             # to the new loaded image
 
+        The images with the highest `priority` are loaded first. If a `size`
+        is given, a thumbnail that fit in this size is loaded instead of the
+        full image.
         '''
-        data = Cache.get('pymt.loader', filename)
-        if data not in (None, False):
+        key = self._get_key(filename, size)
+        data = Cache.get('pymt.loader', key)
+        if data is not None:
             # found image
             return ProxyImage(data,
                     loading_image=self.loading_image,
@@ -218,85 +379,124 @@ class LoaderBase(object):
 
         client = ProxyImage(self.loading_image,
                     loading_image=self.loading_image)
-        self._client.append((filename, client))
-
-        if data is None:
-            # if data is None, this is really the first time
-            self._q_load.append((filename, load_callback, post_callback))
-            Cache.append('pymt.loader', filename, False)
-            self._start_wanted = True
-        else:
-            # already queued for loading
-            pass
+
+        request = self._requests.get(key)
+        if request is None:
+            # if there is no request, this is really the first time
+            request = _LoaderRequest(filename, load_callback, post_callback,
+                                     None, priority, size, key)
+            self._requests[key] = request
+            self._clients[key] = []
+            self._push_request(request)
+        elif priority > request.priority:
+            # already queued for loading, but it's more urgent now
+            self.prioritize(filename, priority, size)
+
+        self._clients[key].append(
+            weakref.ref(client, partial(self._client_dead, key)))
 
         return client
 
+    def prioritize(self, filename, priority, size=None):
+        '''Change the priority of an image that is waiting to be loaded.
+        Nothing is done if the image is already loading or loaded.'''
+        request = self._requests.get(self._get_key(filename, size))
+        if request is None or request.seq is None:
+            return
+        request.priority = priority
+        # the old entry in the queue will be skipped
+        self._push_request(request)
+
+    def cancel(self, filename, size=None):
+        '''Cancel the loading of an image. The ProxyImage returned for this
+        filename will not be updated.'''
+        self._cancel(self._get_key(filename, size))
+
+    def _cancel(self, key):
+        request = self._requests.pop(key, None)
+        self._clients.pop(key, None)
+        if request is not None:
+            request.cancelled = True
+
+    def load(self, filename, load_callback, callback, priority=0):
+        '''Load any data using the loader. The data are not cached.
+
+        :Parameters:
+            `filename` : str
+                Filename (or any identifier) passed to the callbacks
+            `load_callback` : function
+                Function called in the loader with the filename, that must
+                return the data. If it fails, data will be None.
+            `callback` : function
+                Function called from the main thread with the filename and
+                the data.
+            `priority` : int, default to 0
+                The requests with the highest priority are loaded first.
+        '''
+        self._push_request(_LoaderRequest(filename, load_callback, None,
+                                          callback, priority))
+
 #
 # Loader implementation
 #
 
-if 'PYMT_DOC' in os.environ:
+class LoaderThreadPool(LoaderBase):
+    '''Loader implementation using a pool of threads. The threads are
+    waiting for requests, they don't poll the queue.'''
 
-    Loader = None
+    #: Number of threads used to load the data
+    num_workers = 2
 
-else:
+    def __init__(self):
+        super(LoaderThreadPool, self).__init__()
+        self._workers = []
 
-    #
-    # Try to use pygame as our first choice for loader
-    #
-
-    try:
-        import pygame
-
-        class LoaderPygame(LoaderBase):
-            def __init__(self):
-                super(LoaderPygame, self).__init__()
-                self.worker = None
-
-            def start(self):
-                super(LoaderPygame, self).start()
-                self.worker = pygame.threads.WorkerQueue()
-                self.worker.do(self.run)
-
-            def stop(self):
-                super(LoaderPygame, self).stop()
-                self.worker.stop()
-
-            def run(self, *largs):
-                while self._running:
-                    try:
-                        parameters = self._q_load.pop()
-                    except:
-                        time.sleep(0.1)
-                        continue
-                    self.worker.do(self._load, parameters)
+    def start(self):
+        super(LoaderThreadPool, self).start()
+        for x in xrange(self.num_workers):
+            worker = threading.Thread(target=self.run,
+                                      name='PyMT loader %d' % x)
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
 
-        Loader = LoaderPygame()
-        pymt_logger.info('Loader: using <pygame> as thread loader')
+    def stop(self):
+        super(LoaderThreadPool, self).stop()
+        self._workers = []
 
-    except:
+    def run(self, *largs):
+        while self._running:
+            request = self._pop_request(block=True)
+            if request is None:
+                continue
+            self._load(request)
 
-        #
-        # Default to the clock loader
-        #
 
-        class LoaderClock(LoaderBase):
-            '''Loader implementation using a simple Clock()'''
-            def start(self):
-                super(LoaderClock, self).start()
-                getClock().schedule_interval(self.run, 0.0001)
+class LoaderClock(LoaderBase):
+    '''Loader implementation using a simple Clock(). The data are loaded
+    in the main thread, at least one per frame, in the limit of
+    `time_budget`.'''
+    def start(self):
+        super(LoaderClock, self).start()
+        getClock().schedule_interval(self.run, 0, background=True)
 
-            def stop(self):
-                super(LoaderClock, self).stop()
-                getClock().unschedule(self.run)
+    def stop(self):
+        super(LoaderClock, self).stop()
+        getClock().unschedule(self.run)
 
-            def run(self, *largs):
-                try:
-                    parameters = self._q_load.pop()
-                except IndexError:
-                    return
-                self._load(parameters)
+    def run(self, *largs):
+        deadline = time.time() + self.time_budget
+        while True:
+            request = self._pop_request()
+            if request is None:
+                return
+            self._load(request)
+            if time.time() > deadline:
+                return
 
-        Loader = LoaderClock()
-        pymt_logger.info('Loader: using <clock> as thread loader')
 
+if 'PYMT_DOC' in os.environ:
+    Loader = None
+else:
+    Loader = LoaderThreadPool()
+    pymt_logger.info('Loader: using <thread pool> as thread loader')
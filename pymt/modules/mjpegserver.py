@@ -1,26 +1,27 @@
 '''
 Stream the PyMT video inside MJPEG HTTP server
 
+Each frame is encoded once, in a thread, and sent to all the connected
+clients. A client that is slower than the encoding get only the last frame
+(the others are dropped), and the window is not captured when no client is
+connected.
+
+The statistics of the clients (fps, bandwidth, dropped frames) are available
+in JSON at http://ip:port/stats.
+
 :Configuration:
     `ip` : str, default to ''
         By default, server will listen on all ips availables
     `port` : int, default to 8000
         TCP Port to listen
     `fps` : int, default to 20
-        Fix a FPS to try to have the same FPS on the whole video
+        Maximum FPS of the capture
     `size` : str, default to ''
         If the image must be resized, set size to "320x240" for example
+    `quality` : int, default to 75
+        JPEG quality, from 1 to 95
 
 '''
-#
-# Developper note
-#
-# Double lock is needed if we don't want the sensation about laggy video
-# The deal is, if we don't lock the screen, you got more FPS on OpenGL than
-# streaming (and that would be good.) Except that since it's not synced,
-# video look laggy.
-# Double-lock was just the faster solution to do right now :)
-#
 
 import os
 import pymt
@@ -28,152 +29,280 @@ import threading
 import time
 import StringIO
 import random
+from json import dumps
+from SocketServer import ThreadingMixIn
 from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
 from OpenGL.GL import glReadBuffer, glReadPixels, GL_RGB, GL_UNSIGNED_BYTE, GL_FRONT
-from pymt.utils import curry
 
 if 'PYMT_DOC' not in os.environ:
 	from PIL import Image
 
-lock_current    = threading.Lock()
-sem_current     = threading.Semaphore(0)
-sem_next        = threading.Semaphore(1)
-img_current     = None
-connected       = False
+#: Broadcaster of the running server
+broadcaster = None
 
 def keep_running():
     return True
 
+class MjpegClient(object):
+    '''A connected client. It keeps only the last frame not yet sent: if a
+    new frame arrive before, the previous one is dropped.'''
+
+    def __init__(self, address):
+        self.address = address
+        self.frames = 0
+        self.dropped = 0
+        self.bytes = 0
+        self.fps = 0.
+        self.bandwidth = 0.
+        self._jpeg = None
+        self._condition = threading.Condition()
+        self._stats_time = time.time()
+        self._stats_frames = 0
+        self._stats_bytes = 0
+
+    def offer(self, jpeg):
+        '''Give a new frame to send (called by the encoder)'''
+        with self._condition:
+            if self._jpeg is not None:
+                self.dropped += 1
+            self._jpeg = jpeg
+            self._condition.notify()
+
+    def wait_frame(self, timeout=1.):
+        '''Return the next frame to send, or None after the timeout'''
+        with self._condition:
+            if self._jpeg is None:
+                self._condition.wait(timeout)
+            jpeg = self._jpeg
+            self._jpeg = None
+        return jpeg
+
+    def sent(self, size):
+        '''Update the statistics after a frame have been sent'''
+        self.frames += 1
+        self.bytes += size
+        self._stats_frames += 1
+        self._stats_bytes += size
+        now = time.time()
+        d = now - self._stats_time
+        if d > 2.:
+            self.fps = self._stats_frames / d
+            self.bandwidth = self._stats_bytes / d
+            self._stats_time = now
+            self._stats_frames = self._stats_bytes = 0
+
+    def get_stats(self):
+        '''Return a dict with the statistics of the client'''
+        return {'address': '%s:%d' % self.address, 'fps': self.fps,
+                'bandwidth': self.bandwidth, 'frames': self.frames,
+                'dropped': self.dropped, 'bytes': self.bytes}
+
+
+class MjpegBroadcaster(object):
+    '''Encode the captured frames once, in a thread, and send them to all
+    the clients.
+
+    :Parameters:
+        `fps` : float, default to 0
+            Maximum FPS of the capture, 0 for no limit
+        `size` : tuple, default to None
+            Size of the streamed images, None to keep the window size
+        `quality` : int, default to 75
+            JPEG quality
+    '''
+
+    def __init__(self, fps=0, size=None, quality=75):
+        self.fps = fps
+        self.size = size
+        self.quality = quality
+        self.encoded = 0
+        self.skipped = 0
+        self._clients = []
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._frame = None
+        self._last_capture = 0
+        self._thread = None
+
+    def add_client(self, client):
+        with self._lock:
+            self._clients.append(client)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run_encoder)
+                self._thread.daemon = True
+                self._thread.start()
+
+    def remove_client(self, client):
+        with self._lock:
+            self._clients.remove(client)
+
+    @property
+    def clients(self):
+        '''List of the connected clients'''
+        with self._lock:
+            return self._clients[:]
+
+    def want_frame(self):
+        '''Return True if a new frame must be captured: at least one client
+        is connected, the encoder is not busy, and the fps limit is
+        respected'''
+        with self._lock:
+            if not self._clients:
+                return False
+            if self._frame is not None:
+                self.skipped += 1
+                return False
+        if self.fps and time.time() - self._last_capture < 1. / self.fps:
+            return False
+        return True
+
+    def push_frame(self, data, size):
+        '''Give a RGB frame to encode (flipped, as read by glReadPixels)'''
+        self._last_capture = time.time()
+        with self._condition:
+            self._frame = (data, size)
+            self._condition.notify()
+
+    def encode(self, data, size):
+        '''Encode a RGB frame in JPEG'''
+        im = Image.fromstring('RGB', size, data)
+        if self.size:
+            im = im.resize(self.size)
+        im = im.transpose(Image.FLIP_TOP_BOTTOM)
+        buf = StringIO.StringIO()
+        im.save(buf, format='JPEG', quality=self.quality)
+        return buf.getvalue()
+
+    def _run_encoder(self):
+        while keep_running():
+            with self._condition:
+                while self._frame is None:
+                    self._condition.wait()
+                data, size = self._frame
+            try:
+                jpeg = self.encode(data, size)
+            except Exception:
+                pymt.pymt_logger.exception('MjpegServer: unable to encode')
+                jpeg = None
+            with self._lock:
+                self._frame = None
+                clients = self._clients[:]
+            if jpeg is None:
+                continue
+            self.encoded += 1
+            for client in clients:
+                client.offer(jpeg)
+
+    def get_stats(self):
+        '''Return a dict with the statistics of the broadcaster and the
+        clients'''
+        return {'encoded': self.encoded, 'skipped': self.skipped,
+                'clients': [client.get_stats() for client in self.clients]}
+
+
 class MjpegHttpRequestHandler(BaseHTTPRequestHandler):
     def do_GET(self):
-        global connected, sem_next
+        if self.path == '/stats':
+            self._send_stats()
+            return
+        client = MjpegClient(self.client_address)
+        pymt.pymt_logger.info(
+            'MjpegServer: Client %s:%d connected' % self.client_address)
+        self.server.broadcaster.add_client(client)
         try:
-            connected = True
-            self._stream_video()
+            self._stream_video(client)
+        except IOError:
+            pass
         finally:
-            connected = False
-            # to prevent that app hang
-            sem_next.release()
+            self.server.broadcaster.remove_client(client)
             pymt.pymt_logger.info(
                 'MjpegServer: Client %s:%d disconnect' % self.client_address)
 
-    def _stream_video(self):
-        global img_current
-
-        lfps        = []
-        dt          = 0
-        frames      = 0
-        fps_wanted  = self.server.config.get('fps')
-        if fps_wanted == '':
-            fps_wanted = 0
-        fps_wanted = float(fps_wanted)
-        if fps_wanted <= 1:
-            fps_wanted = 0
-        else:
-            fps_wanted = 1 / fps_wanted
-        size        = self.server.config.get('size')
-        if size == '':
-            size = None
-        else:
-            size = map(int, size.split('x'))
-
-        pymt.pymt_logger.info(
-            'MjpegServer: Client %s:%d connected' % self.client_address)
+    def _send_stats(self):
+        stats = dumps(self.server.broadcaster.get_stats())
+        self.send_response(200, 'OK')
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(stats)))
+        self.end_headers()
+        self.wfile.write(stats)
 
+    def _stream_video(self, client):
         self.send_response(200, 'OK')
         self.boundary = 'pymt-mjpegserver-boundary-%d' % (random.randint(1, 9999999))
         self.send_header('Server', 'PyMT MjpegServer')
         self.send_header('Content-type', 'multipart/x-mixed-replace; boundary=%s' % self.boundary)
         self.end_headers()
 
-        # don't accept connection until the window is created
-        # XXX really needed ?
-        while not pymt.getWindow():
-            time.sleep(0.1)
-        win = pymt.getWindow()
-
-        dt = dt_current = dt_old = time.time()
+        fps = 0
         while keep_running():
-
-            # SYNC START
-            sem_current.acquire()
-
-            with lock_current:
-                im = Image.fromstring('RGB', win.size, img_current)
-                img_current = None
-
-            sem_next.release()
-            # SYNC END
-
-            buf = StringIO.StringIO()
-            if size:
-                im = im.resize(size)
-            im = im.transpose(Image.FLIP_TOP_BOTTOM)
-            im.save(buf, format='JPEG')
-            jpeg = buf.getvalue()
+            jpeg = client.wait_frame()
+            if jpeg is None:
+                continue
 
             self.wfile.write('--%s\r\n' % self.boundary)
             self.wfile.write('Content-Type: image/jpeg\r\n')
             self.wfile.write('Content-Length: %d\r\n\r\n' % len(jpeg))
             self.wfile.write(jpeg)
+            client.sent(len(jpeg))
 
-            dt_old = dt_current
-            dt_current = time.time()
-
-            d = dt_current - dt_old
-            if d < fps_wanted:
-                time.sleep(d)
+            if client.fps != fps:
+                fps = client.fps
+                pymt.pymt_logger.debug(
+                    'MjpegServer: Client %s:%d FPS is %.1f, %.1f KB/s, '
+                    '%d frames dropped' % (client.address + (fps,
+                    client.bandwidth / 1024., client.dropped)))
 
-            frames += 1
-            if dt_current - dt > 2.:
-                fps = frames / (dt_current - dt)
-                lfps.append(fps)
-                x = sum(lfps) / len(lfps)
-                pymt.pymt_logger.debug('MjpegServer: current FPS is %.1f, average is %.1f' % (fps, x))
-                dt = dt_current
-                frames = 0
+class MjpegHttpServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
 
 class MjpegServerThread(threading.Thread):
-    def __init__(self, config):
+    def __init__(self, config, broadcaster):
         super(MjpegServerThread, self).__init__()
         self.config = config
+        self.broadcaster = broadcaster
 
     def run(self):
         server_address = (self.config.get('ip'), int(self.config.get('port')))
-        httpd = HTTPServer(server_address, MjpegHttpRequestHandler)
+        httpd = MjpegHttpServer(server_address, MjpegHttpRequestHandler)
         httpd.config = self.config
+        httpd.broadcaster = self.broadcaster
         pymt.pymt_logger.info('MjpegServer: Listen to %s:%d' % server_address)
         while keep_running():
             httpd.handle_request()
 
 def window_flip_and_save():
-    global img_current
+    if broadcaster is None or not broadcaster.want_frame():
+        return
     win = pymt.getWindow()
-
-    with lock_current:
-        if not connected:
-            return
-
-    sem_next.acquire()
-
-    with lock_current:
-        glReadBuffer(GL_FRONT)
-        data = glReadPixels(0, 0, win.width, win.height, GL_RGB, GL_UNSIGNED_BYTE)
-        img_current = str(buffer(data))
-
-    sem_current.release()
+    glReadBuffer(GL_FRONT)
+    data = glReadPixels(0, 0, win.width, win.height, GL_RGB, GL_UNSIGNED_BYTE)
+    broadcaster.push_frame(str(buffer(data)), win.size)
 
 def start(win, ctx):
+    global broadcaster
     win.push_handlers(on_flip=window_flip_and_save)
 
     ctx.config.setdefault('ip', '')
     ctx.config.setdefault('port', '8000')
-    ctx.config.setdefault('fps', '')
+    ctx.config.setdefault('fps', '20')
     ctx.config.setdefault('size', '')
-
-    ctx.server = MjpegServerThread(ctx.config)
+    ctx.config.setdefault('quality', '75')
+
+    size = ctx.config.get('size')
+    if size == '':
+        size = None
+    else:
+        size = map(int, size.split('x'))
+    fps = ctx.config.get('fps')
+    fps = float(fps) if fps != '' else 0
+
+    broadcaster = ctx.broadcaster = MjpegBroadcaster(
+        fps=fps, size=size, quality=int(ctx.config.get('quality')))
+    ctx.server = MjpegServerThread(ctx.config, broadcaster)
     ctx.server.daemon = True
     ctx.server.start()
 
 def stop(win, ctx):
+    global broadcaster
     win.remove_handlers(on_flip=window_flip_and_save)
+    broadcaster = None
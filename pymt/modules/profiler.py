@@ -0,0 +1,114 @@
+'''
+Profile the frames, and draw the time spent in each part of the last frames
+
+Each bar of the graph is a frame, colored by the time spent in the input
+providers, the postproc modules, the touch dispatch, the clock callbacks, the
+window events, on_update, on_draw and on_flip. The line is at 1/60s.
+
+When the application is closed, the summary of the frames is printed, and the
+frames are exported in the Chrome trace event format (open it in
+chrome://tracing).
+
+:Configuration:
+    `frames` : int, default to 300
+        Number of frames recorded
+    `trace` : str, default to 'pymt-profile.json'
+        Filename of the trace exported at the end
+    `graph` : bool, default to 1
+        Draw the graph of the last frames
+'''
+
+import pymt
+from OpenGL.GL import GL_QUADS, glColor4f, glVertex2f
+
+#: Colors of the categories in the graph
+category_colors = (
+    ('input', (.2, .6, 1, .8)),
+    ('postproc', (0, .8, .8, .8)),
+    ('dispatch', (0, .4, 1, .8)),
+    ('clock', (1, .8, 0, .8)),
+    ('events', (.6, .6, .6, .8)),
+    ('update', (.6, 1, .2, .8)),
+    ('draw', (1, .3, .3, .8)),
+    ('flip', (.8, .3, 1, .8)),
+)
+
+class ProfilerGraph(pymt.MTWidget):
+    '''Graph of the last frames. 1 pixel per frame, `scale` pixels per
+    millisecond.'''
+    def __init__(self, **kwargs):
+        kwargs.setdefault('size', (300, 200))
+        kwargs.setdefault('pos', (0, 20))
+        super(ProfilerGraph, self).__init__(**kwargs)
+        self.scale = kwargs.get('scale', 4)
+
+    def on_update(self):
+        # moving the graph mark the window as dirty, do it only when needed
+        # to not draw every frame in render on demand mode
+        if self.parent and self.parent.children[-1] is not self:
+            self.bring_to_front()
+
+    def draw(self):
+        x, y = self.pos
+        w, h = self.size
+        scale = self.scale * 1000.
+        pymt.set_color(0, 0, 0, .5)
+        pymt.drawRectangle(pos=self.pos, size=self.size)
+
+        frames = pymt.getProfiler().get_frames()[-int(w):]
+        with pymt.gx_begin(GL_QUADS):
+            for index, frame in enumerate(frames):
+                times = frame.get_times()
+                fx = x + index
+                fy = y
+                for category, color in category_colors:
+                    duration = times.get(category)
+                    if not duration:
+                        continue
+                    top = min(fy + duration * scale, y + h)
+                    glColor4f(*color)
+                    glVertex2f(fx, fy)
+                    glVertex2f(fx + 1, fy)
+                    glVertex2f(fx + 1, top)
+                    glVertex2f(fx, top)
+                    fy = top
+
+        # 60 fps
+        pymt.set_color(1, 1, 1, .8)
+        top = y + min(scale / 60., h)
+        pymt.drawLine((x, top, x + w, top))
+
+        # legend
+        for index, (category, color) in enumerate(category_colors):
+            pymt.set_color(*color)
+            pymt.drawRectangle(pos=(x + w + 5, y + h - 12 * (index + 1)),
+                               size=(8, 8))
+            pymt.drawLabel(label=category, center=False, font_size=8,
+                           pos=(x + w + 16, y + h - 12 * (index + 1) - 2))
+        if frames:
+            average = sum([f.duration for f in frames]) / len(frames)
+            pymt.drawLabel(label='frame: %.2fms' % (average * 1000.),
+                           center=False, font_size=8, pos=(x, y + h + 2))
+
+def start(win, ctx):
+    ctx.config.setdefault('frames', 300)
+    ctx.config.setdefault('trace', 'pymt-profile.json')
+    ctx.config.setdefault('graph', 1)
+    profiler = pymt.getProfiler()
+    profiler.set_max_frames(int(ctx.config.get('frames')))
+    profiler.start()
+    ctx.graph = None
+    if int(ctx.config.get('graph')):
+        ctx.graph = ProfilerGraph()
+        win.add_widget(ctx.graph)
+
+def stop(win, ctx):
+    profiler = pymt.getProfiler()
+    profiler.stop()
+    if ctx.graph is not None:
+        win.remove_widget(ctx.graph)
+    profiler.print_summary()
+    filename = ctx.config.get('trace')
+    profiler.export_chrome_trace(filename)
+    pymt.pymt_logger.info('Profiler: %d frames exported in %s' % (
+                          len(profiler.frames), filename))
@@ -0,0 +1,41 @@
+'''
+Record all the touch events in a file, for replaying them later
+
+The events are recorded before the postproc modules, in a binary append-only
+file. Replay the file with the replay input provider ::
+
+    [input]
+    session = replay,pymt-session.rec
+
+:Configuration:
+    `filename` : str, default to 'pymt-session.rec'
+        Filename of the record file. If the file exist, the new session is
+        appended at the end.
+'''
+
+import pymt
+from pymt.input.recorder import TouchRecorder
+
+def install_recorder(ctx, *largs):
+    # the event loop is created after the window
+    evloop = pymt.getEventLoop()
+    if evloop is None:
+        pymt.getClock().schedule_once(pymt.curry(install_recorder, ctx), 0)
+        return
+    # record the events before any postproc module
+    evloop.postproc_modules.insert(0, ctx.recorder)
+
+def start(win, ctx):
+    ctx.config.setdefault('filename', 'pymt-session.rec')
+    ctx.recorder = TouchRecorder(ctx.config.get('filename'))
+    pymt.pymt_logger.info('Recorder: Record touches in %s' %
+                          ctx.config.get('filename'))
+    install_recorder(ctx)
+
+def stop(win, ctx):
+    evloop = pymt.getEventLoop()
+    if evloop is not None:
+        evloop.remove_postproc_module(ctx.recorder)
+    ctx.recorder.close()
+    pymt.pymt_logger.info('Recorder: %d events recorded in %s' % (
+                          ctx.recorder.count, ctx.recorder.filename))
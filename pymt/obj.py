@@ -3,11 +3,28 @@ Obj: handle 3D mesh from the OBJ format file.
 
 OBJ is a geometry definition file, adopted by many vendor graphics.
 To known more about the format, check http://en.wikipedia.org/wiki/Obj
+
+The geometry is parsed into float32 arrays, in GL_T2F_N3F_V3F format. When
+the object is loaded from a filename, a binary cache of the geometry is
+written next to the file (`<filename>.pymtcache`), and memory-mapped on the
+next load. The cache is ignored if the size or the modification time of the
+OBJ file changed. Use `cache=False` to disable it.
+
+The parsing can be done in the loader thread ::
+
+    def on_load(obj):
+        self.model = obj
+
+    OBJ.load_async('monkey.obj', on_load)
 '''
 __all__ = ('OBJ', 'Material', 'MaterialGroup', 'Mesh')
 
 import os
+import struct
 import warnings
+import cPickle
+from numpy import array, empty, memmap, ascontiguousarray
+from pymt.logger import pymt_logger
 from pymt.core.image import Image
 from OpenGL.GL import GL_FRONT_AND_BACK, GL_DIFFUSE, GL_AMBIENT, GL_SPECULAR, \
         GL_SHININESS, GL_AMBIENT_AND_DIFFUSE, GL_COLOR_MATERIAL, GLfloat, \
@@ -63,7 +80,8 @@ class MaterialGroup(object):
     def __init__(self, material):
         self.material = material
 
-        # Interleaved array of floats in GL_T2F_N3F_V3F format
+        # Interleaved array of floats in GL_T2F_N3F_V3F format. Can be a list
+        # or a float32 array.
         self.vertices = []
         self.array = None
 
@@ -93,21 +111,20 @@ class Mesh(object):
             if group.material:
                 group.material.apply()
             if group.array is None:
+                vertices = group.vertices
+                if type(vertices) is list:
+                    vertices = array(vertices, dtype='float32')
                 if group.material and group.material.texture:
                     if group.material.texture.rectangle:
                         # texture is a rectangle texture
                         # that's mean we need to adjust the range of texture
                         # coordinate from original 0-1 to 0-width/0-height
-                        group.vertices[0::8] = map(
-                            lambda x: x * group.material.texture.width,
-                            group.vertices[0::8]
-                        )
-                        group.vertices[1::8] = map(
-                            lambda x: x * group.material.texture.height,
-                            group.vertices[1::8]
-                        )
-                group.array = (GLfloat * len(group.vertices))(*group.vertices)
-                group.triangles = len(group.vertices) / 8
+                        # (the vertices can be a read-only mapped cache)
+                        vertices = array(vertices, dtype='float32')
+                        vertices[0::8] *= group.material.texture.width
+                        vertices[1::8] *= group.material.texture.height
+                group.array = ascontiguousarray(vertices, dtype='float32')
+                group.triangles = len(vertices) / 8
             glInterleavedArrays(GL_T2F_N3F_V3F, 0, group.array)
             glDrawArrays(GL_TRIANGLES, 0, group.triangles)
             if group.material:
@@ -116,7 +133,8 @@ class Mesh(object):
         glPopClientAttrib()
 
     def compile(self):
-        '''Compile the mesh in display list'''
+        '''Compile the mesh in display list. The vertices are uploaded
+        directly from their float32 arrays.'''
         if self.list:
             return
         gllist = glGenLists(1)
@@ -126,6 +144,232 @@ class Mesh(object):
         self.list = gllist
 
 
+#: Version of the binary cache format
+OBJ_CACHE_VERSION = 1
+_cache_magic = 'PYMTOBJ'
+_cache_header = struct.Struct('<7sBI')
+
+def _parse_obj(fd):
+    '''(internal) Parse an OBJ file. Return the list of material libraries,
+    and the meshes as a list of (name, named, groups). Each group is a tuple
+    of (material name, default, float32 array): when default is True, the
+    default material is used if the material is unknown.'''
+    # the numbers are kept as strings, and converted all together at the end.
+    # index 0 is used for missing index
+    vertices = ['0', '0', '0']
+    normals = ['0', '0', '0']
+    tex_coords = ['0', '0']
+    nv = nn = nt = 1
+
+    mtllibs = []
+    meshes = []
+    mesh = None
+    group = None
+    # None mean default material, until an usemtl is found
+    material = None
+
+    # faces corners, as (vertex, texcoord, normal) indices
+    corners = {}
+
+    for line in fd:
+        if line.startswith('#'):
+            continue
+        values = line.split()
+        if not values:
+            continue
+
+        key = values[0]
+        if key == 'v':
+            v = values[1:4]
+            if len(v) != 3:
+                v = (v + ['0', '0', '0'])[:3]
+            vertices.extend(v)
+            nv += 1
+        elif key == 'vn':
+            v = values[1:4]
+            if len(v) != 3:
+                v = (v + ['0', '0', '0'])[:3]
+            normals.extend(v)
+            nn += 1
+        elif key == 'vt':
+            v = values[1:3]
+            if len(v) != 2:
+                v = (v + ['0', '0'])[:2]
+            tex_coords.extend(v)
+            nt += 1
+        elif key == 'f':
+            if mesh is None:
+                mesh = ('', False, [])
+                meshes.append(mesh)
+            if group is None:
+                group = (material, True, [])
+                mesh[2].append(group)
+            indices = group[2]
+
+            # For fan triangulation, remember first and latest vertices
+            v1 = None
+            vlast = None
+            for i, token in enumerate(values[1:]):
+                corner = corners.get(token)
+                if corner is None:
+                    v_index, t_index, n_index = \
+                        (map(int, [j or 0 for j in token.split('/')]) + [0, 0])[:3]
+                    # negative indices are relative to the current end
+                    if v_index < 0:
+                        v_index += nv
+                    if t_index < 0:
+                        t_index += nt
+                    if n_index < 0:
+                        n_index += nn
+                    corner = (v_index, t_index, n_index)
+                    if '-' not in token:
+                        corners[token] = corner
+
+                if i >= 3:
+                    # Triangulate
+                    indices.extend(v1)
+                    indices.extend(vlast)
+                indices.extend(corner)
+
+                if i == 0:
+                    v1 = corner
+                vlast = corner
+        elif key == 'mtllib':
+            mtllibs.append(values[1])
+        elif key in ('usemtl', 'usemat'):
+            material = values[1]
+            if mesh is not None:
+                group = (material, False, [])
+                mesh[2].append(group)
+        elif key == 'o':
+            mesh = (values[1], True, [])
+            meshes.append(mesh)
+            group = None
+
+    vertices = array(vertices, dtype='float32').reshape((nv, 3))
+    normals = array(normals, dtype='float32').reshape((nn, 3))
+    tex_coords = array(tex_coords, dtype='float32').reshape((nt, 2))
+
+    # build the interleaved arrays
+    result = []
+    for name, named, groups in meshes:
+        out_groups = []
+        for material, default, indices in groups:
+            indices = array(indices, dtype='int32').reshape((-1, 3))
+            data = empty((len(indices), 8), dtype='float32')
+            data[:, 0:2] = tex_coords[indices[:, 1]]
+            data[:, 2:5] = normals[indices[:, 2]]
+            data[:, 5:8] = vertices[indices[:, 0]]
+            out_groups.append((material, default, data.reshape(-1)))
+        result.append((name, named, out_groups))
+    return mtllibs, result
+
+def _get_cache_filename(filename):
+    return '%s.pymtcache' % filename
+
+def _read_cache(filename):
+    '''(internal) Read the binary cache of an OBJ file, if it's valid.
+    The arrays are mapped from the cache file.'''
+    cachefn = _get_cache_filename(filename)
+    try:
+        stat = os.stat(filename)
+        fd = open(cachefn, 'rb')
+        try:
+            magic, version, length = _cache_header.unpack(
+                fd.read(_cache_header.size))
+            if magic != _cache_magic or version != OBJ_CACHE_VERSION:
+                return None
+            header = cPickle.loads(fd.read(length))
+        finally:
+            fd.close()
+    except (IOError, OSError, struct.error, cPickle.UnpicklingError,
+            EOFError, ValueError):
+        return None
+
+    if header['size'] != stat.st_size or header['mtime'] != stat.st_mtime:
+        return None
+    if header['count'] == 0:
+        data = empty(0, dtype='float32')
+    else:
+        data = memmap(cachefn, dtype='float32', mode='r',
+                      offset=header['offset'], shape=(header['count'], ))
+
+    meshes = []
+    for name, named, groups in header['meshes']:
+        out_groups = []
+        for material, default, offset, count in groups:
+            out_groups.append((material, default, data[offset:offset + count]))
+        meshes.append((name, named, out_groups))
+    return header['mtllibs'], meshes
+
+def _write_cache(filename, mtllibs, meshes):
+    '''(internal) Write the binary cache of an OBJ file: a small header,
+    followed by all the float32 arrays.'''
+    cachefn = _get_cache_filename(filename)
+    tmpfn = '%s.%d.tmp' % (cachefn, os.getpid())
+    try:
+        stat = os.stat(filename)
+        offset = 0
+        header_meshes = []
+        for name, named, groups in meshes:
+            header_groups = []
+            for material, default, data in groups:
+                header_groups.append((material, default, offset, len(data)))
+                offset += len(data)
+            header_meshes.append((name, named, header_groups))
+        header = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'mtllibs': mtllibs,
+            'meshes': header_meshes,
+            'count': offset,
+            'offset': 0,
+        }
+        # the data start after the header, aligned on 16 bytes
+        length = len(cPickle.dumps(header, 2)) + 16
+        header['offset'] = (_cache_header.size + length + 15) & ~15
+        pickled = cPickle.dumps(header, 2)
+        pickled += ' ' * (length - len(pickled))
+
+        fd = open(tmpfn, 'wb')
+        try:
+            fd.write(_cache_header.pack(_cache_magic, OBJ_CACHE_VERSION,
+                                        len(pickled)))
+            fd.write(pickled)
+            fd.write('\0' * (header['offset'] - fd.tell()))
+            for name, named, groups in meshes:
+                for material, default, data in groups:
+                    fd.write(data.tostring())
+        finally:
+            fd.close()
+        os.rename(tmpfn, cachefn)
+    except (IOError, OSError), e:
+        pymt_logger.debug('OBJ: unable to write cache for <%s>: %s' % (
+            filename, e))
+        try:
+            os.unlink(tmpfn)
+        except OSError:
+            pass
+
+def _load_obj_data(filename, file=None, cache=True):
+    '''(internal) Load the geometry of an OBJ, from the cache if possible.
+    This function doesn't use OpenGL, it can be called from a thread.'''
+    if file is None and cache:
+        data = _read_cache(filename)
+        if data is not None:
+            return data
+    if file is None:
+        file = open(filename, 'r')
+        try:
+            data = _parse_obj(file)
+        finally:
+            file.close()
+        if cache:
+            _write_cache(filename, *data)
+        return data
+    return _parse_obj(file)
+
+
 class OBJ:
     '''3D object representation.
 
@@ -133,95 +377,69 @@ class OBJ:
         `filename` : string
             Filename of object
         `file` : File object, default to None
-            Use file instead of filename if possible
+            Use file instead of filename if possible. The cache is not used.
         `path` : string, default to None
             Use custom path for material
         `compat` : bool, default to True
             Set to False if you want to take care yourself of the lights, depth
             test, color...
+        `cache` : bool, default to True
+            Use a binary cache of the geometry, stored next to the file.
     '''
-    def __init__(self, filename, file=None, path=None, compat=True):
+    def __init__(self, filename, file=None, path=None, compat=True,
+                 cache=True, data=None):
         self.materials = {}
         self.meshes = {}        # Name mapping
         self.mesh_list = []     # Also includes anonymous meshes
         self.compat = compat
 
-        if file is None:
-            file = open(filename, 'r')
-
         if path is None:
             path = os.path.dirname(filename)
-            self.path = path
+        self.path = path
 
-        mesh = None
-        group = None
-        material = None
+        # data can be given by load_async()
+        if data is None:
+            data = _load_obj_data(filename, file=file, cache=cache)
+        mtllibs, meshes = data
 
-        vertices = [[0., 0., 0.]]
-        normals = [[0., 0., 0.]]
-        tex_coords = [[0., 0.]]
+        for mtllib in mtllibs:
+            self.load_material_library(mtllib)
 
-        for line in open(filename, 'r'):
-            if line.startswith('#'):
-                continue
-            values = line.split()
-            if not values:
-                continue
-
-            if values[0] == 'v':
-                vertices.append(map(float, values[1:4]))
-            elif values[0] == 'vn':
-                normals.append(map(float, values[1:4]))
-            elif values[0] == 'vt':
-                tex_coords.append(map(float, values[1:3]))
-            elif values[0] == 'mtllib':
-                self.load_material_library(values[1])
-            elif values[0] in ('usemtl', 'usemat'):
-                material = self.materials.get(values[1], None)
-                if material is None:
-                    warnings.warn('Unknown material: %s' % values[1])
-                if mesh is not None:
-                    group = MaterialGroup(material)
-                    mesh.groups.append(group)
-            elif values[0] == 'o':
-                mesh = Mesh(values[1])
+        default_material = None
+        for name, named, groups in meshes:
+            mesh = Mesh(name)
+            if named:
                 self.meshes[mesh.name] = mesh
-                self.mesh_list.append(mesh)
-                group = None
-            elif values[0] == 'f':
-                if mesh is None:
-                    mesh = Mesh('')
-                    self.mesh_list.append(mesh)
-                if material is None:
-                    material = Material('')
-                if group is None:
-                    group = MaterialGroup(material)
-                    mesh.groups.append(group)
-
-                # For fan triangulation, remember first and latest vertices
-                v1 = None
-                vlast = None
-                for i, v in enumerate(values[1:]):
-                    v_index, t_index, n_index = \
-                        (map(int, [j or 0 for j in v.split('/')]) + [0, 0])[:3]
-                    if v_index < 0:
-                        v_index += len(vertices) - 1
-                    if t_index < 0:
-                        t_index += len(tex_coords) - 1
-                    if n_index < 0:
-                        n_index += len(normals) - 1
-                    vertex = tex_coords[t_index] + \
-                            normals[n_index] + \
-                            vertices[v_index]
-
-                    if i >= 3:
-                        # Triangulate
-                        group.vertices += v1 + vlast
-                    group.vertices += vertex
-
-                    if i == 0:
-                        v1 = vertex
-                    vlast = vertex
+            self.mesh_list.append(mesh)
+            for material_name, default, vertices in groups:
+                material = None
+                if material_name is not None:
+                    material = self.materials.get(material_name, None)
+                    if material is None:
+                        warnings.warn('Unknown material: %s' % material_name)
+                if material is None and default:
+                    if default_material is None:
+                        default_material = Material('')
+                    material = default_material
+                group = MaterialGroup(material)
+                group.vertices = vertices
+                mesh.groups.append(group)
+
+    @staticmethod
+    def load_async(filename, callback, **kwargs):
+        '''Load an OBJ with the Loader. The file (or his cache) is read
+        in the loader thread, and callback(obj) is called when the object
+        is ready. The keywords arguments are passed to OBJ().'''
+        from pymt.loader import Loader
+        cache = kwargs.get('cache', True)
+        def load_callback(filename):
+            return _load_obj_data(filename, cache=cache)
+        def on_load(filename, data):
+            if data is None:
+                callback(None)
+                return
+            callback(OBJ(filename, data=data, **kwargs))
+        Loader.load(filename, load_callback, on_load)
 
     def open_material_file(self, filename):
         '''Override for loading from archive/network etc.'''
@@ -0,0 +1,243 @@
+'''
+Profiler: record where the time of each frame goes
+
+The profiler records, for each frame, the time spent in the input providers,
+each postproc module, the dispatch of the touch events, each scheduled clock
+callback, and the window events (on_update, on_draw, on_flip). The time of
+on_update and on_draw is also recorded for each widget class ::
+
+    profiler = getProfiler()
+    profiler.start()
+    # ... later
+    profiler.stop()
+    profiler.print_summary()
+    profiler.export_chrome_trace('frames.json')
+
+The last frames are kept in a ring buffer. The exported trace can be opened
+in chrome://tracing. When the profiler is stopped, nothing is recorded and
+the event loop run at full speed.
+
+The profiler module draw a graph of the last frames on the window ::
+
+    python myapp.py -m profiler
+'''
+
+__all__ = ('FrameProfiler', 'ProfiledFrame', 'getProfiler')
+
+import collections
+import time
+from pymt.clock import getClock
+
+
+class ProfiledFrame(object):
+    '''Times of a frame.
+
+    `spans` is the list of (category, name, start, duration) of the frame
+    phases. `widgets` is a dict of (event, widget class name) -> [calls,
+    time]. The time of a widget doesn't include the time of his children.
+    '''
+
+    __slots__ = ('index', 'start', 'duration', 'spans', 'widgets')
+
+    def __init__(self, index, start):
+        self.index = index
+        self.start = start
+        self.duration = 0.
+        self.spans = []
+        self.widgets = {}
+
+    def get_times(self):
+        '''Return a dict of category -> time spent in the frame'''
+        times = {}
+        for category, name, start, duration in self.spans:
+            times[category] = times.get(category, 0.) + duration
+        return times
+
+
+class FrameProfiler(object):
+    '''Record the time spent in each part of the frames.
+
+    :Parameters:
+        `max_frames` : int, default to 300
+            Number of frames kept in the ring buffer
+    '''
+
+    def __init__(self, max_frames=300):
+        self.running = False
+        #: Last frames recorded, in a ring buffer
+        self.frames = collections.deque(maxlen=max_frames)
+        #: Frame in progress
+        self.frame = None
+        self._count = 0
+        # time of the children of the widgets being dispatched
+        self._stack = []
+        self._widget_cls = None
+        self._dispatch_event = None
+
+    def start(self):
+        '''Start the recording'''
+        if self.running:
+            return
+        self.running = True
+        getClock().set_profile_callback(self._add_clock_callback)
+        self._install_widget_hook()
+
+    def stop(self):
+        '''Stop the recording. The recorded frames are kept.'''
+        if not self.running:
+            return
+        self.running = False
+        self.frame = None
+        getClock().set_profile_callback(None)
+        self._uninstall_widget_hook()
+
+    def clear(self):
+        '''Remove all the recorded frames'''
+        self.frames.clear()
+
+    def set_max_frames(self, max_frames):
+        '''Change the size of the ring buffer'''
+        self.frames = collections.deque(self.frames, maxlen=max_frames)
+
+    def begin_frame(self):
+        '''Start a new frame. Called by the event loop.'''
+        self._count += 1
+        self._stack = []
+        self.frame = ProfiledFrame(self._count, time.time())
+
+    def end_frame(self):
+        '''End the current frame, and store it in the ring buffer'''
+        frame = self.frame
+        if frame is None:
+            return
+        frame.duration = time.time() - frame.start
+        self.frames.append(frame)
+        self.frame = None
+
+    def add_span(self, category, name, start):
+        '''Add the time from `start` to now in the current frame'''
+        frame = self.frame
+        if frame is not None:
+            frame.spans.append((category, name, start, time.time() - start))
+
+    def _add_clock_callback(self, name, start, duration):
+        frame = self.frame
+        if frame is not None:
+            frame.spans.append(('clock', name, start, duration))
+
+    def _install_widget_hook(self):
+        from pymt.ui.widgets.widget import MTWidget
+        dispatch_event = MTWidget.dispatch_event
+        profiler = self
+
+        def profiled_dispatch_event(widget, event_type, *largs):
+            if event_type != 'on_draw' and event_type != 'on_update':
+                return dispatch_event(widget, event_type, *largs)
+            stack = profiler._stack
+            stack.append(0.)
+            start = time.time()
+            try:
+                return dispatch_event(widget, event_type, *largs)
+            finally:
+                duration = time.time() - start
+                children = stack.pop()
+                if stack:
+                    stack[-1] += duration
+                frame = profiler.frame
+                if frame is not None:
+                    key = (event_type, widget.__class__.__name__)
+                    stats = frame.widgets.get(key)
+                    if stats is None:
+                        frame.widgets[key] = [1, duration - children]
+                    else:
+                        stats[0] += 1
+                        stats[1] += duration - children
+
+        self._widget_cls = MTWidget
+        self._dispatch_event = MTWidget.__dict__.get('dispatch_event')
+        MTWidget.dispatch_event = profiled_dispatch_event
+
+    def _uninstall_widget_hook(self):
+        cls = self._widget_cls
+        if cls is None:
+            return
+        if self._dispatch_event is None:
+            del cls.dispatch_event
+        else:
+            cls.dispatch_event = self._dispatch_event
+        self._widget_cls = self._dispatch_event = None
+
+    def get_frames(self):
+        '''Return the list of the recorded frames (:class:`ProfiledFrame`)'''
+        return list(self.frames)
+
+    def get_summary(self):
+        '''Return a dict of name -> (calls, total time, max time) for the
+        recorded frames. The name is "category:name" for the frame phases,
+        and "event:class" for the widgets.'''
+        summary = {}
+        def add(name, calls, duration):
+            stats = summary.get(name)
+            if stats is None:
+                summary[name] = [calls, duration, duration]
+                return
+            stats[0] += calls
+            stats[1] += duration
+            if duration > stats[2]:
+                stats[2] = duration
+        for frame in self.frames:
+            add('frame', 1, frame.duration)
+            for category, name, start, duration in frame.spans:
+                add('%s:%s' % (category, name), 1, duration)
+            for (event, cls), (calls, duration) in frame.widgets.iteritems():
+                add('%s:%s' % (event, cls), calls, duration)
+        return dict((name, tuple(stats))
+                    for name, stats in summary.iteritems())
+
+    def print_summary(self):
+        '''Print the summary on the console, ordered by total time'''
+        summary = self.get_summary().items()
+        summary.sort(key=lambda x: x[1][1], reverse=True)
+        print 'Frame profile (%d frames) :' % len(self.frames)
+        for name, (calls, total, maxtime) in summary:
+            print ' * %-50s calls=%-6d total=%.3fms avg=%.3fms max=%.3fms' % (
+                name, calls, total * 1000., total * 1000. / calls,
+                maxtime * 1000.)
+
+    def export_chrome_trace(self, filename=None):
+        '''Return the recorded frames in the Chrome trace event format, and
+        write them in `filename` if given. The phases are complete events,
+        the widgets times are counters.'''
+        events = []
+        for frame in self.frames:
+            ts = frame.start * 1000000.
+            events.append({'name': 'frame', 'cat': 'frame', 'ph': 'X',
+                           'ts': ts, 'dur': frame.duration * 1000000.,
+                           'pid': 1, 'tid': 1,
+                           'args': {'index': frame.index}})
+            for category, name, start, duration in frame.spans:
+                events.append({'name': name, 'cat': category, 'ph': 'X',
+                               'ts': start * 1000000.,
+                               'dur': duration * 1000000.,
+                               'pid': 1, 'tid': 1})
+            counters = {}
+            for (event, cls), (calls, duration) in frame.widgets.iteritems():
+                counters.setdefault(event, {})[cls] = duration * 1000.
+            for event, args in counters.iteritems():
+                events.append({'name': '%s (ms)' % event, 'cat': 'widgets',
+                               'ph': 'C', 'ts': ts, 'pid': 1, 'tid': 1,
+                               'args': args})
+        trace = {'traceEvents': events, 'displayTimeUnit': 'ms'}
+        if filename is not None:
+            import json
+            with open(filename, 'w') as fd:
+                json.dump(trace, fd)
+        return trace
+
+
+# create a default profiler
+_default_profiler = FrameProfiler()
+
+def getProfiler():
+    '''Return the profiler used by the PyMT event loop'''
+    return _default_profiler
@@ -25,4 +25,4 @@ def install_gobject_iteration():
     # schedule the iteration each frame
     def _gobject_iteration(*largs):
         context.iteration(False)
-    getClock().schedule_interval(_gobject_iteration, 0)
+    getClock().schedule_interval(_gobject_iteration, 0, background=True)
@@ -2,11 +2,12 @@
 Texture: abstraction to handle GL texture, and region
 '''
 
-__all__ = ('Texture', 'TextureRegion')
+__all__ = ('Texture', 'TextureRegion', 'PixelBuffer')
 
 import os
 import re
-from array import array
+import threading
+import numpy
 from pymt import pymt_logger
 import OpenGL
 from OpenGL.GL import GL_RGBA, GL_UNSIGNED_BYTE, GL_TEXTURE_MIN_FILTER, \
@@ -25,12 +26,6 @@ from OpenGL.extensions import hasGLExtension
 # same hack as FBO :(
 OpenGLversion = tuple(int(re.match('^(\d+)', i).groups()[0]) \
                       for i in OpenGL.__version__.split('.'))
-if OpenGLversion < (3, 0, 1):
-    try:
-        import numpy
-        have_numpy = True
-    except Exception:
-        have_numpy = False
 
 
 def _nearest_pow2(v):
@@ -48,6 +43,28 @@ def _is_pow2(v):
     # http://graphics.stanford.edu/~seander/bithacks.html#DetermineIfPowerOf2
     return (v & (v - 1)) == 0
 
+def _buffer_to_array(data):
+    # flat uint8 view of an object implementing the buffer protocol (str,
+    # numpy array, memoryview, mmap...), without copy if it's contiguous
+    if isinstance(data, numpy.ndarray):
+        array = data
+    elif isinstance(data, memoryview):
+        array = numpy.asarray(data)
+    else:
+        array = numpy.frombuffer(data, dtype=numpy.uint8)
+    return numpy.ascontiguousarray(array).reshape(-1).view(numpy.uint8)
+
+def _swap_red_blue(src, dst, channels):
+    # copy the pixels of src in dst, with red and blue channels swapped
+    count = min(len(src), len(dst)) // channels * channels
+    src = src[:count].reshape(-1, channels)
+    dst = dst[:count].reshape(-1, channels)
+    dst[:, 0] = src[:, 2]
+    dst[:, 1] = src[:, 1]
+    dst[:, 2] = src[:, 0]
+    if channels == 4:
+        dst[:, 3] = src[:, 3]
+
 #
 # Releasing texture through GC is problematic
 # GC can happen in a middle of glBegin/glEnd
@@ -66,7 +83,7 @@ def _texture_release(*largs):
         # So, maybe numpy or pyopengl is unloaded, and have weird things happen.
         #
         try:
-            if OpenGLversion < (3, 0, 1) and have_numpy:
+            if OpenGLversion < (3, 0, 1):
                 glDeleteTextures(numpy.array(texture_id))
             else:
                 glDeleteTextures(texture_id)
@@ -81,7 +98,8 @@ class Texture(object):
     or complex texture based on ImageData.'''
 
     __slots__ = ('tex_coords', '_width', '_height', '_target', '_id', '_mipmap',
-                '_gl_wrap', '_gl_min_filter', '_gl_mag_filter', '_rectangle')
+                '_gl_wrap', '_gl_min_filter', '_gl_mag_filter', '_rectangle',
+                '_staging')
 
     _has_bgr = None
     _has_bgr_tested = False
@@ -99,6 +117,7 @@ class Texture(object):
         self._gl_min_filter = None
         self._gl_mag_filter = None
         self._rectangle     = rectangle
+        self._staging       = None
 
     def __del__(self):
         # Add texture deletion outside GC call.
@@ -293,8 +312,9 @@ class Texture(object):
         '''Blit a buffer into a texture.
 
         :Parameters:
-            `buffer` : str
-                Image data
+            `buffer` : str or object implementing the buffer protocol
+                Image data. Numpy arrays, memoryview or mmap are uploaded
+                without copy.
             `size` : tuple, default to texture size
                 Size of the image (width, height)
             `mode` : str, default to 'RGB'
@@ -331,18 +351,19 @@ class Texture(object):
     @staticmethod
     def has_bgr():
         if not Texture._has_bgr_tested:
-            pymt_logger.warning('Texture: BGR/BGRA format is not supported by'
-                                'your graphic card')
-            pymt_logger.warning('Texture: Software conversion will be done to'
-                                'RGB/RGBA')
             Texture._has_bgr = hasGLExtension('GL_EXT_bgra')
             Texture._has_bgr_tested = True
+            if not Texture._has_bgr:
+                pymt_logger.warning('Texture: BGR/BGRA format is not '
+                                    'supported by your graphic card')
+                pymt_logger.warning('Texture: Software conversion will be '
+                                    'done to RGB/RGBA')
         return Texture._has_bgr
 
     @staticmethod
     def is_gl_format_supported(format):
         if format in (GL_BGR, GL_BGRA):
-            return not Texture.has_bgr()
+            return Texture.has_bgr()
         return True
 
     @staticmethod
@@ -354,33 +375,38 @@ class Texture(object):
         return format
 
     def _convert_buffer(self, data, format):
-        # check if format is supported by user
-        ret_format = format
-        ret_buffer = data
-
-        # BGR / BGRA conversion not supported by hardware ?
-        if not Texture.is_gl_format_supported(format):
-            if format == GL_BGR:
-                ret_format = GL_RGB
-                a = array('b', data)
-                a[0::3], a[2::3] = a[2::3], a[0::3]
-                ret_buffer = a.tostring()
-            elif format == GL_BGRA:
-                ret_format = GL_RGBA
-                a = array('b', data)
-                a[0::4], a[2::4] = a[2::4], a[0::4]
-                ret_buffer = a.tostring()
-            else:
-                pymt_logger.critical('Texture: non implemented'
-                                     '%s texture conversion' % str(format))
-                raise Exception('Unimplemented texture conversion for %s' %
-                                str(format))
-        return ret_buffer, ret_format
+        # strings and numpy arrays are given as-is to OpenGL, other buffers
+        # are wrapped in an array (without copy)
+        if not isinstance(data, (str, numpy.ndarray)):
+            data = _buffer_to_array(data)
+
+        if Texture.is_gl_format_supported(format):
+            return data, format
+
+        # BGR / BGRA conversion not supported by hardware: swap the channels
+        # in a staging array, reused for the next frames of the same size
+        if format not in (GL_BGR, GL_BGRA):
+            pymt_logger.critical('Texture: non implemented'
+                                 '%s texture conversion' % str(format))
+            raise Exception('Unimplemented texture conversion for %s' %
+                            str(format))
+        data = _buffer_to_array(data)
+        staging = self._staging
+        if staging is None or len(staging) != len(data):
+            staging = self._staging = numpy.empty(len(data), dtype=numpy.uint8)
+        _swap_red_blue(data, staging, Texture.gl_format_size(format))
+        return staging, Texture.convert_gl_format(format)
 
     @property
     def size(self):
         return (self.width, self.height)
 
+    @property
+    def cache_size(self):
+        '''Return the size of the texture pixels in bytes, used by the Cache
+        (readonly)'''
+        return self._width * self._height * 4
+
     @staticmethod
     def mode_to_gl_format(format):
         if format == 'RGBA':
@@ -436,9 +462,73 @@ class TextureRegion(Texture):
         # don't use self of owner !
         pass
 
+    @property
+    def cache_size(self):
+        '''Return the size of the owner texture, the region keep it alive
+        (readonly)'''
+        return self.owner.cache_size
+
+class PixelBuffer(object):
+    '''Double buffered staging area, to hand over frames from a producer
+    (like the thread of a camera or a video) to a texture. The frames are
+    copied in two arrays allocated once: the producer write in one while
+    the other is uploaded by the main thread ::
+
+        pixelbuffer = PixelBuffer((640, 480), 'BGR')
+
+        # in the camera thread
+        pixelbuffer.write(frame)
+
+        # in the main thread
+        pixelbuffer.upload(texture)
+
+    Only one thread must write in the buffer.
+
+    :Parameters:
+        `size` : tuple
+            Size of the frames (width, height)
+        `mode` : str, default to 'RGB'
+            Mode of the frames, can be one of RGB, RGBA, BGR, BGRA
+    '''
+
+    def __init__(self, size, mode='RGB'):
+        self.size = tuple(size)
+        self.mode = mode
+        length = size[0] * size[1] * len(mode)
+        self._buffers = [numpy.empty(length, dtype=numpy.uint8),
+                         numpy.empty(length, dtype=numpy.uint8)]
+        self._front = 0
+        self._fresh = False
+        self._lock = threading.Lock()
+
+    def write(self, data):
+        '''Copy a frame in the back buffer, and make it the next frame to
+        upload. `data` can be a str or any object implementing the buffer
+        protocol.'''
+        data = _buffer_to_array(data)
+        back = self._buffers[1 - self._front]
+        if len(data) < len(back):
+            raise ValueError('Frame too small for a buffer of %s %s' %
+                             (self.size, self.mode))
+        back[:] = data[:len(back)]
+        with self._lock:
+            self._front = 1 - self._front
+            self._fresh = True
+
+    def upload(self, texture, pos=(0, 0)):
+        '''Blit the last written frame into the texture. Return False if no
+        frame was written since the last upload.'''
+        with self._lock:
+            if not self._fresh:
+                return False
+            texture.blit_buffer(self._buffers[self._front], size=self.size,
+                                mode=self.mode, pos=pos)
+            self._fresh = False
+        return True
+
 if 'PYMT_DOC' not in os.environ:
     from pymt.clock import getClock
 
     # install tick to release texture every 200ms
-    getClock().schedule_interval(_texture_release, 0.2)
+    getClock().schedule_interval(_texture_release, 0.2, background=True)
 
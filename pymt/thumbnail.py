@@ -0,0 +1,333 @@
+'''
+Thumbnail: on-disk cache of scaled images
+
+Decoding a big picture to show it in 128 pixels is slow. The thumbnail cache
+store the scaled pixels (raw RGBA) in ~/.pymt/thumbnails, and read them back
+with a memory map ::
+
+    from pymt.thumbnail import Thumbnails
+    image = Thumbnails.load('holidays.jpg', (128, 128))
+
+Usually, you don't use it directly, but through the loader ::
+
+    image = Loader.image('holidays.jpg', size=(128, 128))
+
+A thumbnail is identified by the path and modification time of the file, or
+by the url and the ETag returned by the server. The image is scaled to fit
+in the size, keeping his aspect ratio, and is never enlarged.
+
+The cache is limited in size: when `max_size` is reached, the least recently
+used thumbnails are removed.
+'''
+
+__all__ = ('ThumbnailCache', 'ImageThumbnail', 'Thumbnails')
+
+import os
+import struct
+import threading
+import cPickle
+from hashlib import sha1
+from numpy import frombuffer, memmap, uint8, empty, arange
+from pymt import pymt_home_dir
+from pymt.logger import pymt_logger
+from pymt.core.image import ImageLoaderBase, ImageData
+
+#: Version of the thumbnail files. Change it when the format change.
+THUMBNAIL_VERSION = 1
+
+_header = struct.Struct('<5sBII')
+_magic = 'PYMTT'
+
+
+class ImageThumbnail(ImageLoaderBase):
+    '''Image loader for an already decoded ImageData (used by the
+    thumbnails)'''
+
+    def __init__(self, filename, data, **kwargs):
+        self._thumbnail = data
+        super(ImageThumbnail, self).__init__(filename, **kwargs)
+
+    def load(self, filename):
+        data = self._thumbnail
+        self._thumbnail = None
+        return data
+
+
+def scale_image_data(data, size):
+    '''Return a RGBA ImageData scaled to fit in `size`, keeping the aspect
+    ratio. The image is never enlarged.'''
+    w, h = data.width, data.height
+    channels = 3 if data.mode in ('RGB', 'BGR') else 4
+    pixels = frombuffer(data.data, dtype=uint8)
+    pixels = pixels[:w * h * channels].reshape(h, w, channels)
+    if data.mode in ('BGR', 'BGRA'):
+        pixels = pixels[:, :, [2, 1, 0] + range(3, channels)]
+
+    tw, th = size
+    ratio = min(tw / float(w), th / float(h), 1.)
+    tw = max(1, int(w * ratio))
+    th = max(1, int(h * ratio))
+
+    # average blocks of pixels, then pick the nearest pixels for the
+    # remaining scale.
+    block = min(w // tw, h // th)
+    if block > 1:
+        bh, bw = h // block, w // block
+        pixels = pixels[:bh * block, :bw * block].reshape(
+            bh, block, bw, block, channels).mean(axis=3).mean(axis=1) + .5
+        h, w = bh, bw
+    if (w, h) != (tw, th):
+        ys = (arange(th) * h) // th
+        xs = (arange(tw) * w) // tw
+        pixels = pixels[ys][:, xs]
+
+    out = empty((th, tw, 4), dtype=uint8)
+    out[:, :, :channels] = pixels
+    if channels == 3:
+        out[:, :, 3] = 255
+    return ImageData(tw, th, 'RGBA', out.tostring())
+
+
+class ThumbnailCache(object):
+    '''Directory of thumbnails, limited in size.
+
+    :Parameters:
+        `path` : str
+            Directory where the thumbnails are stored
+        `max_size` : int, default to 64MB
+            Maximum size of the thumbnails, in bytes
+    '''
+
+    def __init__(self, path, max_size=64 * 1024 * 1024):
+        self.path = path
+        self.max_size = max_size
+        self._lock = threading.RLock()
+        # filename -> [size, access order], read on the first use
+        self._files = None
+        self._total = 0
+        self._access = 0
+        self._etags = None
+
+    def _scan(self):
+        # index the thumbnails already on disk
+        if self._files is not None:
+            return
+        self._files = {}
+        self._total = 0
+        if not os.path.isdir(self.path):
+            return
+        files = []
+        for name in os.listdir(self.path):
+            if not name.endswith('.thumb'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.path, name))
+            except OSError:
+                continue
+            files.append((st.st_mtime, name, st.st_size))
+        # the modification time is the last access time of the previous runs
+        files.sort()
+        for mtime, name, size in files:
+            self._files[name] = [size, self._touch()]
+            self._total += size
+
+    def _touch(self):
+        self._access += 1
+        return self._access
+
+    def _get_name(self, source, version, size):
+        key = repr((THUMBNAIL_VERSION, source, version, tuple(size)))
+        return '%s.thumb' % sha1(key).hexdigest()
+
+    def _read(self, name):
+        '''Read a thumbnail, and mark it as recently used. Return None if
+        it's not in the cache.'''
+        with self._lock:
+            self._scan()
+            if name not in self._files:
+                return None
+            filename = os.path.join(self.path, name)
+            try:
+                with open(filename, 'rb') as fd:
+                    magic, version, width, height = _header.unpack(
+                        fd.read(_header.size))
+                if magic != _magic or version != THUMBNAIL_VERSION:
+                    raise ValueError('invalid thumbnail')
+                pixels = memmap(filename, dtype=uint8, mode='r',
+                                offset=_header.size,
+                                shape=(width * height * 4, ))
+                # the modification time is used as access time
+                os.utime(filename, None)
+            except Exception:
+                pymt_logger.warning('Thumbnail: unable to read <%s>' % name)
+                self._remove(name)
+                return None
+            self._files[name][1] = self._touch()
+        return ImageData(width, height, 'RGBA', pixels)
+
+    def _write(self, name, data):
+        '''Write a thumbnail, and remove the oldest ones if needed'''
+        with self._lock:
+            self._scan()
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+            filename = os.path.join(self.path, name)
+            tmpfilename = '%s.%d.tmp' % (filename, threading.currentThread().ident)
+            try:
+                with open(tmpfilename, 'wb') as fd:
+                    fd.write(_header.pack(_magic, THUMBNAIL_VERSION,
+                                          data.width, data.height))
+                    fd.write(data.data)
+                os.rename(tmpfilename, filename)
+            except (IOError, OSError):
+                pymt_logger.exception('Thumbnail: unable to write <%s>' % name)
+                return
+            if name in self._files:
+                self._total -= self._files[name][0]
+            size = os.path.getsize(filename)
+            self._files[name] = [size, self._touch()]
+            self._total += size
+            self._evict(name)
+
+    def _remove(self, name):
+        info = self._files.pop(name, None)
+        if info is None:
+            return
+        self._total -= info[0]
+        try:
+            os.unlink(os.path.join(self.path, name))
+        except OSError:
+            pass
+
+    def _evict(self, keep):
+        '''Remove the least recently used thumbnails, until the cache size is
+        under the limit'''
+        if self._total <= self.max_size:
+            return
+        files = sorted(self._files.iteritems(), key=lambda x: x[1][1])
+        for name, info in files:
+            if self._total <= self.max_size:
+                break
+            if name != keep:
+                self._remove(name)
+
+    def clear(self):
+        '''Remove all the thumbnails'''
+        with self._lock:
+            self._scan()
+            for name in self._files.keys():
+                self._remove(name)
+
+    def get_stats(self):
+        '''Return a dict with the count and size of the thumbnails'''
+        with self._lock:
+            self._scan()
+            return {'count': len(self._files), 'size': self._total,
+                    'max_size': self.max_size}
+
+    def load(self, filename, size, load_callback=None):
+        '''Return a thumbnail of a local image, as an ImageThumbnail.
+
+        :Parameters:
+            `filename` : str
+                Filename of the image
+            `size` : tuple
+                Maximum (width, height) of the thumbnail
+            `load_callback` : function, default to None
+                Function used to load the full image if the thumbnail is not
+                in the cache. Default to ImageLoader.load.
+        '''
+        filename = os.path.abspath(filename)
+        name = self._get_name(filename, os.path.getmtime(filename), size)
+        data = self._read(name)
+        if data is None:
+            data = self._create(filename, size, load_callback)
+            self._write(name, data)
+        return ImageThumbnail(filename, data)
+
+    def load_url(self, url, size, load_callback=None):
+        '''Return a thumbnail of an image on Internet, as an ImageThumbnail.
+        If the server answer with an ETag, the thumbnail is kept and the
+        image is not downloaded again until it changes. If the server is not
+        reachable, the last thumbnail is used.'''
+        import urllib2, tempfile
+        etag = self._get_etags().get(url)
+        name = None
+        request = urllib2.Request(url)
+        if etag is not None:
+            name = self._get_name(url, etag, size)
+            if name in self._files:
+                request.add_header('If-None-Match', etag)
+            else:
+                name = None
+
+        try:
+            fd = urllib2.urlopen(request)
+        except urllib2.HTTPError, e:
+            if e.code != 304 or name is None:
+                raise
+            fd = None
+        except urllib2.URLError:
+            if name is None:
+                raise
+            fd = None
+        if fd is None:
+            data = self._read(name)
+            if data is not None:
+                return ImageThumbnail(url, data)
+            fd = urllib2.urlopen(url)
+
+        # download the image
+        try:
+            idata = fd.read()
+            etag = fd.info().getheader('ETag')
+        finally:
+            fd.close()
+        suffix = '.%s'  % (url.split('.')[-1])
+        osfd, tmpfilename = tempfile.mkstemp(prefix='pymtthumb', suffix=suffix)
+        try:
+            os.write(osfd, idata)
+            os.close(osfd)
+            data = self._create(tmpfilename, size, load_callback)
+        finally:
+            os.unlink(tmpfilename)
+
+        if etag is not None:
+            self._write(self._get_name(url, etag, size), data)
+            self._set_etag(url, etag)
+        return ImageThumbnail(url, data)
+
+    def _create(self, filename, size, load_callback):
+        if load_callback is None:
+            from pymt.core.image import ImageLoader
+            load_callback = ImageLoader.load
+        image = load_callback(filename)
+        return scale_image_data(image._data, size)
+
+    def _get_etags(self):
+        with self._lock:
+            self._scan()
+            if self._etags is None:
+                self._etags = {}
+                try:
+                    with open(os.path.join(self.path, 'etags'), 'rb') as fd:
+                        self._etags = cPickle.load(fd)
+                except Exception:
+                    pass
+            return self._etags
+
+    def _set_etag(self, url, etag):
+        with self._lock:
+            etags = self._get_etags()
+            etags[url] = etag
+            try:
+                with open(os.path.join(self.path, 'etags'), 'wb') as fd:
+                    cPickle.dump(etags, fd, cPickle.HIGHEST_PROTOCOL)
+            except IOError:
+                pass
+
+
+#: Default thumbnail cache, in the PyMT home directory
+Thumbnails = None
+if pymt_home_dir is not None:
+    Thumbnails = ThumbnailCache(os.path.join(pymt_home_dir, 'thumbnails'))
@@ -14,6 +14,7 @@ from OpenGL.GL import *
 from random import randint, random
 from pymt import *
 from pymt.graphics import *
+from pymt.base import TouchEventLoop
 from time import clock, time, ctime
 
 clockfn = time
@@ -39,6 +40,29 @@ class bench_core_label:
             o.append(Label(label=x))
 
 
+class bench_core_text_layout:
+    '''Core: text layout (1000 edits in 100 paragraphs of 50 words)'''
+    def __init__(self):
+        from pymt.core.text.layout import TextLayout
+        paragraphs = []
+        for x in xrange(100):
+            words = []
+            for y in xrange(50):
+                word = map(lambda x: chr(randint(ord('a'), ord('z'))), xrange(randint(1, 10)))
+                words.append(''.join(word))
+            paragraphs.append(' '.join(words))
+        self.paragraphs = paragraphs
+        label = Label(label='')
+        self.layout = TextLayout(label.get_extents, label.fontid, width=300)
+        self.layout.text = '\n'.join(paragraphs)
+    def run(self):
+        paragraphs = self.paragraphs
+        layout = self.layout
+        for x in xrange(1000):
+            index = randint(0, len(paragraphs) - 1)
+            paragraphs[index] += chr(randint(ord('a'), ord('z')))
+            layout.text = '\n'.join(paragraphs)
+
 class bench_widget_creation:
     '''Widget: creation (10000 MTWidget)'''
     def run(self):
@@ -61,6 +85,249 @@ class bench_widget_dispatch:
         for x in xrange(1000):
             root.dispatch_event('on_update')
 
+class _bench_touch_dispatch:
+    widget_cls = MTWidget
+    count = 0
+    def __init__(self):
+        class BenchTouch(Touch):
+            pass
+        w, h = window_size
+        root = self.widget_cls(size=window_size)
+        for x in xrange(self.count):
+            root.add_widget(MTScatter(pos=(random() * w, random() * h),
+                                      size=(100, 100)))
+        self.root = root
+        self.touches = []
+        for x in xrange(100):
+            touch = BenchTouch(0, 'bench', None)
+            touch.x, touch.y = random() * w, random() * h
+            self.touches.append(touch)
+    def run(self):
+        root = self.root
+        touches = self.touches
+        for x in xrange(10):
+            for touch in touches:
+                root.dispatch_event('on_touch_move', touch)
+
+class bench_widget_touch_dispatch_100(_bench_touch_dispatch):
+    '''Widget: touch dispatch (1000 touches in 100 MTScatter)'''
+    count = 100
+
+class bench_widget_touch_dispatch_1000(_bench_touch_dispatch):
+    '''Widget: touch dispatch (1000 touches in 1000 MTScatter)'''
+    count = 1000
+
+class bench_widget_touch_dispatch_10000(_bench_touch_dispatch):
+    '''Widget: touch dispatch (1000 touches in 10000 MTScatter)'''
+    count = 10000
+
+class bench_spatial_touch_dispatch_100(_bench_touch_dispatch):
+    '''Spatial: touch dispatch (1000 touches in 100 MTScatter)'''
+    widget_cls = MTSpatialWidget
+    count = 100
+
+class bench_spatial_touch_dispatch_1000(_bench_touch_dispatch):
+    '''Spatial: touch dispatch (1000 touches in 1000 MTScatter)'''
+    widget_cls = MTSpatialWidget
+    count = 1000
+
+class bench_spatial_touch_dispatch_10000(_bench_touch_dispatch):
+    '''Spatial: touch dispatch (1000 touches in 10000 MTScatter)'''
+    widget_cls = MTSpatialWidget
+    count = 10000
+
+class bench_widget_kineticlist_virtual:
+    '''Widget: virtualized MTKineticList layout (20000 items, 100 frames)'''
+    def __init__(self):
+        def factory(item):
+            return MTKineticObject(deletable=False, size=(200, 30))
+        def updater(widget, item):
+            return True
+        model = MTKineticListModel(data=range(20000), factory=factory,
+                                   updater=updater, item_size=(200, 30))
+        self.klist = MTKineticList(model=model, size=(400, 600),
+                                   deletable=False, searchable=False,
+                                   title=None)
+    def run(self):
+        klist = self.klist
+        for x in xrange(100):
+            klist.yoffset = -x * 50
+            klist.do_layout()
+
+class bench_image_atlas_packing:
+    '''Image: pack 10000 icons (8-64px) in atlas pages'''
+    def __init__(self):
+        from pymt.core.image.atlas import AtlasPacker
+        self.packer = AtlasPacker
+        self.sizes = [(randint(8, 64), randint(8, 64)) for x in xrange(10000)]
+    def run(self):
+        pages = [self.packer(1024, 1024)]
+        for w, h in self.sizes:
+            if pages[-1].insert(w, h) is None:
+                pages.append(self.packer(1024, 1024))
+                pages[-1].insert(w, h)
+        efficiency = sum([p.used for p in pages]) / (len(pages) * 1024. ** 2)
+        self.info = '(%d pages, %d%% used)' % (len(pages), efficiency * 100)
+
+class _bench_image_icons:
+    atlas = True
+    def __init__(self):
+        import pymt.core.image
+        from pymt.core.image.atlas import TextureAtlas
+        from pymt.thumbnail import ImageThumbnail
+        old_atlas = pymt.core.image.image_atlas
+        if not self.atlas:
+            pymt.core.image.image_atlas = None
+        elif old_atlas is None:
+            pymt.core.image.image_atlas = TextureAtlas()
+        try:
+            self.images = []
+            for x in xrange(500):
+                data = ImageData(32, 32, 'RGBA', chr(x % 256) * (32 * 32 * 4))
+                image = Image(ImageThumbnail('icon%d' % x, data, atlas=True))
+                image.texture
+                self.images.append(image)
+            # count the texture changes when drawing the icons
+            ids = [image.texture.id for image in self.images]
+            binds = len([x for x in xrange(len(ids)) if not x or ids[x] != ids[x - 1]])
+            self.info = '(%d binds)' % binds
+        finally:
+            if not self.atlas:
+                pymt.core.image.image_atlas = old_atlas
+    def run(self):
+        images = self.images
+        for x in xrange(100):
+            for image in images:
+                image.draw()
+
+class bench_image_icons_atlas(_bench_image_icons):
+    '''Image: draw 500 icons of 32x32 100 times (atlas)'''
+
+class bench_image_icons_noatlas(_bench_image_icons):
+    '''Image: draw 500 icons of 32x32 100 times (no atlas)'''
+    atlas = False
+
+class _bench_texture_upload:
+    mode = 'RGB'
+    def __init__(self):
+        import numpy
+        size = (640, 480)
+        self.texture = Texture.create(*size)
+        self.pixelbuffer = PixelBuffer(size, self.mode)
+        self.frame = numpy.zeros(size[0] * size[1] * len(self.mode),
+                                 dtype=numpy.uint8)
+    def run(self):
+        for x in xrange(100):
+            self.pixelbuffer.write(self.frame)
+            self.pixelbuffer.upload(self.texture)
+
+class bench_texture_upload_rgb(_bench_texture_upload):
+    '''Texture: upload 100 RGB frames of 640x480'''
+
+class bench_texture_upload_bgra(_bench_texture_upload):
+    '''Texture: upload 100 BGRA frames of 640x480'''
+    mode = 'BGRA'
+
+class _bench_input_burst:
+    coalescing = 'last'
+    def __init__(self):
+        # burst of 10000 events from a 60 touches table
+        class BenchTouch(Touch):
+            pass
+        touches = [BenchTouch(0, 'bench', None) for x in xrange(60)]
+        events = [('down', touch) for touch in touches]
+        while len(events) < 10000 - len(touches):
+            events.append(('move', touches[randint(0, len(touches) - 1)]))
+        events.extend([('up', touch) for touch in touches])
+        self.events = events
+        self.evloop = TouchEventLoop()
+        self.evloop.input_coalescing = self.coalescing
+    def run(self):
+        evloop = self.evloop
+        dispatch = evloop._dispatch_input
+        for x in xrange(10):
+            for event, touch in self.events:
+                dispatch(event, touch)
+            evloop.dispatch_input()
+
+class bench_input_burst_last(_bench_input_burst):
+    '''Input: coalescing 10 bursts of 10000 events (last move)'''
+    coalescing = 'last'
+
+class bench_input_burst_all(_bench_input_burst):
+    '''Input: coalescing 10 bursts of 10000 events (every move)'''
+    coalescing = 'all'
+
+class bench_input_replay:
+    '''Input: replay 500 frames of a 40 hands table'''
+    def __init__(self):
+        import tempfile
+        class BenchTouch(Touch):
+            def depack(self, args):
+                self.sx, self.sy = args
+                super(BenchTouch, self).depack(args)
+        self.filename = tempfile.mktemp('.rec')
+        recorder = TouchRecorder(self.filename)
+        touches = [BenchTouch('bench', x, (random(), random()))
+                   for x in xrange(200)]
+        for touch in touches:
+            recorder.record('down', touch, 0)
+        for frame in xrange(1, 499):
+            for touch in touches:
+                touch.move((random(), random()))
+                recorder.record('move', touch, frame / 60.)
+        for touch in touches:
+            recorder.record('up', touch, 499 / 60.)
+        recorder.close()
+        self.evloop = TouchEventLoop()
+    def run(self):
+        provider = ReplayTouchProvider('bench', '%s,speed=0' % self.filename)
+        provider.start()
+        evloop = self.evloop
+        for x in xrange(500):
+            provider.update(evloop._dispatch_input)
+            evloop.dispatch_input()
+        os.unlink(self.filename)
+        self.info = '(%d events)' % evloop.input_stats_total['dispatched']
+
+class bench_input_evdev:
+    '''Input: decode 5000 evdev frames of 10 contacts (protocol B)'''
+    def __init__(self):
+        import struct
+        events = []
+        for frame in xrange(5000):
+            for slot in xrange(10):
+                events.append((3, 0x2f, slot))
+                if frame == 0:
+                    events.append((3, 0x39, slot))
+                events.append((3, 0x35, randint(0, 4096)))
+                events.append((3, 0x36, randint(0, 4096)))
+            events.append((0, 0, 0))
+        self.data = ''.join([struct.pack('LLHHi', 0, 0, *x) for x in events])
+        # read by blocks of 4096 events
+        self.size = struct.calcsize('LLHHi') * 4096
+    def run(self):
+        from pymt.input.evdev import MultitouchState, decode_input_events
+        state = MultitouchState(ranges={'position_x': (0, 4096),
+                                        'position_y': (0, 4096)})
+        size = self.size
+        count = 0
+        for x in xrange(0, len(self.data), size):
+            events = decode_input_events(self.data[x:x + size])
+            count += len(state.feed(events))
+        self.info = '(%d snapshots)' % count
+
+class bench_animation_500:
+    '''Animation: 100 frames of the same animation on 500 MTWidget'''
+    def __init__(self):
+        self.widgets = [MTWidget() for x in xrange(500)]
+        anim = Animation(duration=3600, pos=(100, 100), size=(50, 50))
+        anim.animate(*self.widgets)
+    def run(self):
+        clock = getClock()
+        for x in xrange(100):
+            clock.tick()
+
 class bench_graphx_line:
     '''Graphx: draw lines (5000 x/y) 1000 times'''
     def __init__(self):
@@ -147,6 +414,23 @@ class bench_graphx_roundedrectangle:
             for pos, size in rects:
                 drawRoundedRectangle(pos=pos, size=size)
 
+class bench_graphx_css_rectangle_moving:
+    '''Graphx: draw css rectangle of 200 moving buttons 100 times'''
+    def __init__(self):
+        w, h = window_size
+        self.buttons = [MTButton(pos=(random() * w, random() * h))
+                        for x in xrange(200)]
+    def run(self):
+        buttons = self.buttons
+        for x in xrange(100):
+            for button in buttons:
+                button.x += 1
+                drawCSSRectangle(pos=button.pos, size=button.size,
+                                 style=button.style, state='down')
+        stats = Cache.get_stats('pymt.cssrect')
+        self.info = '(%d%% hits)' % (100 * stats['hits'] /
+                                     max(1, stats['hits'] + stats['misses']))
+
 
 class bench_graphics_roundedrectangle:
     '''Graphics: draw rounded rectangle (5000 rect) 1000 times'''
@@ -269,7 +553,7 @@ if __name__ == '__main__':
             sys.stderr.write('.')
             test.run()
             clock_end = clockfn() - clock_start
-            log('%.6f' % clock_end)
+            log('%.6f %s' % (clock_end, getattr(test, 'info', '')))
         except Exception, e:
             log('failed %s' % str(e))
             continue
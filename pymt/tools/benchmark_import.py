@@ -0,0 +1,119 @@
+'''
+Import benchmark: report the import cost of each module
+
+Usage ::
+
+    python -m pymt.tools.benchmark_import [--all] [--window] [name ...]
+
+By default, only `import pymt` is measured, without the shadow window. The
+names given (like MTScatter) are accessed after, to measure the subsystems
+imported on demand. Options:
+
+    `--all`
+        Measure `from pymt import *` too
+    `--window`
+        Create the shadow window, like a normal application
+    `--limit=N`
+        Show only the N most expensive modules (default to 30)
+'''
+
+import __builtin__
+import getopt
+import os
+import sys
+import time
+
+_import = __builtin__.__import__
+
+class ImportRecorder(object):
+    '''Measure the time spent in each import. The inclusive time of a
+    module contain the import of his dependencies, the self time doesn't.'''
+
+    def __init__(self):
+        # module -> [self time, inclusive time]
+        self.modules = {}
+        self._stack = []
+
+    def install(self):
+        __builtin__.__import__ = self._record
+
+    def uninstall(self):
+        __builtin__.__import__ = _import
+
+    def _record(self, name, globals=None, locals=None, fromlist=None,
+                level=-1):
+        before = set(sys.modules)
+        # time and modules of the nested imports
+        self._stack.append([0., set()])
+        start = time.time()
+        try:
+            return _import(name, globals, locals, fromlist, level)
+        finally:
+            duration = time.time() - start
+            children, children_loaded = self._stack.pop()
+            loaded = set([x for x in sys.modules if x not in before and
+                          sys.modules[x] is not None])
+            if self._stack:
+                self._stack[-1][0] += duration
+                self._stack[-1][1].update(loaded)
+            loaded -= children_loaded
+            module = self._get_name(name, globals, loaded)
+            if module is not None:
+                self.modules[module] = [duration - children, duration]
+
+    def _get_name(self, name, globals, loaded):
+        # name of the module really imported, relative or absolute
+        if not loaded:
+            return None
+        candidates = [name]
+        if globals and '__name__' in globals:
+            package = globals['__name__']
+            if '__path__' not in globals:
+                package = package.rpartition('.')[0]
+            if package:
+                candidates.insert(0, '%s.%s' % (package, name))
+        for candidate in candidates:
+            if candidate in loaded:
+                return candidate
+        return min(loaded, key=len)
+
+    def report(self, limit):
+        modules = sorted(self.modules.iteritems(), key=lambda x: -x[1][1])
+        print '%-50s %10s %10s' % ('Module', 'self (ms)', 'total (ms)')
+        print '-' * 72
+        for module, (selftime, total) in modules[:limit]:
+            print '%-50s %10.1f %10.1f' % (module, selftime * 1000,
+                                           total * 1000)
+        print '-' * 72
+        print '%d modules imported' % len(modules)
+
+
+def measure(title, callback):
+    start = time.time()
+    callback()
+    print '%-50s %10.1f ms' % (title, (time.time() - start) * 1000)
+
+
+if __name__ == '__main__':
+    opts, names = getopt.getopt(sys.argv[1:], '', ['all', 'window', 'limit='])
+    opts = dict(opts)
+    # don't let pymt parse our arguments
+    sys.argv = sys.argv[:1]
+    if '--window' not in opts:
+        os.environ['PYMT_SHADOW_WINDOW'] = '0'
+
+    recorder = ImportRecorder()
+    recorder.install()
+    try:
+        measure('import pymt', lambda: __import__('pymt'))
+        pymt = sys.modules['pymt']
+        for name in names:
+            measure('pymt.%s' % name, lambda: getattr(pymt, name))
+        if '--all' in opts:
+            measure('from pymt import *',
+                    lambda: __import__('pymt', {}, {}, ['*']))
+    finally:
+        recorder.uninstall()
+
+    print
+    recorder.report(int(opts.get('--limit', 30)))
@@ -1,4 +1,4 @@
-from pymt import *
+from pymt import EventDispatcher, touch_event_listeners, runTouchApp
 
 class DumpListener(EventDispatcher):
     def __init__(self):
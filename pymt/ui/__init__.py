@@ -1,8 +1,6 @@
 '''
 UI package: base for all ui things
 '''
-from pymt.ui.factory import *
-from pymt.ui.animation import *
-from pymt.ui.window import *
-from pymt.ui.widgets import *
-from pymt.ui.colors import *
+
+from pymt.lazy import install_lazy_module
+install_lazy_module(__name__)
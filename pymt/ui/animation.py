@@ -72,10 +72,156 @@ __all__ = ('AnimationAlpha', 'Animation', 'Repeat', 'Delay')
 
 import math
 import types
+from itertools import izip
 from copy import deepcopy, copy
+from numpy import array
 from pymt.clock import getClock
 from pymt.event import EventDispatcher
 
+
+def _compile_value(vstart, vend, starts, ends):
+    '''Compile the interpolation of a value, and return a function that
+    build the value at the time t. The numeric values are appended in
+    `starts` and `ends`: they are interpolated all together before calling
+    the function with the interpolated list.'''
+    tp = type(vstart)
+    # we handle recursively tuple and list
+    if tp in (tuple, list):
+        assert(type(vend) in (tuple, list))
+        assert(len(vstart) == len(vend))
+        builders = []
+        for x in xrange(len(vstart)):
+            builders.append(_compile_item(vstart[x], vend[x], starts, ends))
+        return lambda values, t: [builder(values, t) for builder in builders]
+
+    elif isinstance(vstart, dict):
+        assert(len(vstart) == len(vend))
+        builders = []
+        for item in vstart:
+            builders.append((item,
+                _compile_item(vstart[item], vend[item], starts, ends)))
+        return lambda values, t: dict([(item, builder(values, t))
+                                       for item, builder in builders])
+
+    elif tp in (float, int, long):
+        index = len(starts)
+        starts.append(vstart)
+        ends.append(vend)
+        if tp is float:
+            return lambda values, t: values[index]
+        return lambda values, t: tp(values[index])
+
+    # try to do like a normal value
+    return lambda values, t: tp(vstart * (1. - t) + vend * t)
+
+def _compile_item(vstart, vend, starts, ends):
+    # item of a list or a dict are converted to the type of the start value
+    builder = _compile_value(vstart, vend, starts, ends)
+    tp = type(vstart)
+    if tp in (tuple, list, dict):
+        return lambda values, t: tp(builder(values, t))
+    return builder
+
+
+class _AnimationDriver(object):
+    '''(internal) Tick all the running animations in one clock callback.
+
+    The animations with the same alpha function and the same progress (the
+    same duration, started on the same frame) are updated together: the
+    alpha function is called once, and their numeric values are
+    interpolated with one NumPy operation.
+    '''
+
+    def __init__(self):
+        self.animations = []
+        self.event = None
+        self.batches = {}
+
+    def add(self, animobj):
+        # the animations started on this frame are updated on the next frame
+        animobj._start_time = getClock().get_time()
+        self.batches = {}
+        if animobj._in_driver:
+            return
+        animobj._in_driver = True
+        self.animations.append(animobj)
+        if self.event is None:
+            self.event = getClock().schedule_interval(self._tick, 0)
+
+    def invalidate(self):
+        self.batches = {}
+
+    def _tick(self, dt):
+        curtime = getClock().get_time()
+        groups = {}
+        stopped = []
+        for animobj in self.animations[:]:
+            if animobj._start_time == curtime:
+                continue
+            if animobj._frame_pointer <= animobj._duration \
+               and animobj._running:
+                animobj._frame_pointer += dt
+                progress = animobj._frame_pointer / animobj._duration
+                if progress > 1.0:
+                    progress = 1.0
+                animobj._progress = progress
+                key = (animobj.alpha_function, progress)
+                if key in groups:
+                    groups[key].append(animobj)
+                else:
+                    groups[key] = [animobj]
+            else:
+                stopped.append(animobj)
+
+        for (alpha_function, progress), animobjs in groups.iteritems():
+            t = alpha_function(progress)
+            if len(animobjs) == 1:
+                animobjs[0].update(t)
+            else:
+                self._update_batch(animobjs, t)
+
+        for animobj in stopped:
+            animobj.stop()
+
+        # remove the stopped animations (they can have been restarted)
+        if stopped:
+            self.batches = {}
+            animations = []
+            for animobj in self.animations:
+                if animobj._running:
+                    animations.append(animobj)
+                else:
+                    animobj._in_driver = False
+            self.animations = animations
+        if not self.animations:
+            self.event = None
+            return False
+
+    def _update_batch(self, animobjs, t):
+        key = tuple([id(animobj) for animobj in animobjs])
+        batch = self.batches.get(key)
+        if batch is None:
+            starts = []
+            ends = []
+            offsets = [0]
+            for animobj in animobjs:
+                if animobj._compiled is None:
+                    animobj._compile()
+                starts.extend(animobj._starts)
+                ends.extend(animobj._ends)
+                offsets.append(len(starts))
+            batch = (array(starts, dtype='float64'),
+                     array(ends, dtype='float64'), offsets)
+            self.batches[key] = batch
+        starts, ends, offsets = batch
+        values = (starts * (1. - t) + ends * t).tolist()
+        for index, animobj in enumerate(animobjs):
+            animobj._apply(values[offsets[index]:offsets[index + 1]], t)
+
+# all the animations are ticked by the same driver
+_driver = _AnimationDriver()
+
+
 class AnimationBase(object):
     # This is the base animation object class. Everytime a do or animate
     #  method is called a new animobject is created.
@@ -103,69 +249,68 @@ class AnimationBase(object):
         self._frame_pointer = 0.0
         self._progress = 0.0
         self._running = False
+        self._in_driver = False
+        self._start_time = None
+        self._compiled = None
+        self._starts = self._ends = None
 
     def _get_value_from(self, prop):
         if hasattr(self.widget, prop):
             return self.widget.__getattribute__(prop)
         return self.widget.__dict__[prop]
 
-    def _set_value_from(self, value, prop):
-        if hasattr(self.widget, prop):
-            kwargs = {}
-            attr = getattr(self.widget, prop)
-            try:
-                if type(attr) == dict and type(value) == dict:
-                    for k, v in value.iteritems():
-                        attr[k] = v
-                else:
-                    self.widget.__setattr__(prop, value, **kwargs)
-            except:
-                self.widget.__setattr__(prop, value)
+    def _compile_setter(self, prop, value):
+        widget = self.widget
+        if not hasattr(widget, prop):
+            attrs = widget.__dict__
+            def setter(value):
+                attrs[prop] = value
+        elif isinstance(getattr(widget, prop), dict) and \
+                isinstance(value, dict):
+            # update only the animated keys
+            def setter(value):
+                getattr(widget, prop).update(value)
         else:
-            self.widget.__dict__[prop] = value
+            def setter(value):
+                setattr(widget, prop, value)
+        return setter
+
+    def _compile(self):
+        '''Compile the interpolation of the properties. This is done when
+        the animation start, since the property list can be recalculated
+        by reset() or by a sequence.'''
+        starts = []
+        ends = []
+        compiled = []
+        for prop in self._prop_list:
+            vstart, vend = self._prop_list[prop]
+            builder = _compile_value(vstart, vend, starts, ends)
+            compiled.append((builder, self._compile_setter(prop, vstart)))
+        self._compiled = compiled
+        self._starts = starts
+        self._ends = ends
+        _driver.invalidate()
+
+    def _apply(self, values, t):
+        for builder, setter in self._compiled:
+            setter(builder(values, t))
 
     def update(self, t):
         '''Updates the properties of the widget based on the progress
           pointer t
         '''
-        for prop in self._prop_list:
-            vstart, vend =  self._prop_list[prop]
-            value = self._calculate_attribute_value(vstart, vend, t)
-            self._set_value_from(value, prop)
-
-    def _calculate_attribute_value(self, vstart, vend, t):
-        '''A recursive function to calculate the resultant value of property.'''
-        value = None
-        # we handle recursively tuple and list
-        if type(vstart) in (tuple, list):
-
-            assert(type(vend) in (tuple, list))
-            assert(len(vstart) == len(vend))
-
-            value = []
-            for x in range(len(vstart)):
-                result = self._calculate_attribute_value(vstart[x], vend[x], t)
-                value.append(type(vstart[x])(result))
-
-        elif isinstance(vstart, dict):
-                assert(isinstance(vstart, dict))
-                assert(len(vstart) == len(vend))
-                value = {}
-                for item in vstart:
-                    result = self._calculate_attribute_value(vstart[item], vend[item], t)
-                    value[item]= type(vstart[item])(result)
-                return value
-		# try to do like a normal value
-        else:
-            value = type(vstart)(vstart * (1. - t) + vend * t )
-
-        return value
+        if self._compiled is None:
+            self._compile()
+        values = [vstart * (1. - t) + vend * t
+                  for vstart, vend in izip(self._starts, self._ends)]
+        self._apply(values, t)
 
     def start(self):
         '''Starts animating the AnimationBase Object'''
         if not self._running:
             self._running = True
-            getClock().schedule_interval(self._next_frame, 0)
+            self._compile()
+            _driver.add(self)
 
     def stop(self):
         '''Stops animating the AnimationBase Object'''
@@ -181,21 +326,6 @@ class AnimationBase(object):
         #not yet implemented
         pass
 
-    def _next_frame(self,dt):
-        '''Calculate the progress of animation and the frame location
-          pointers. This function also decides when to stop the animation.
-        '''
-        if self._frame_pointer <= self._duration and self._running:
-            self._frame_pointer += dt
-            self._progress = self._frame_pointer/self._duration
-            if self._progress > 1.0:
-                self._progress = 1.0
-            self.update(self.alpha_function(self._progress))
-            return True
-        else:
-            self.stop()
-            return False
-
     @property
     def running(self):
         return self._running
@@ -217,6 +347,7 @@ class AnimationBase(object):
            list based on current status of the widget.
         '''
         self.widget = widget
+        self._compiled = None
         prop_keys = {}
         for prop in self._prop_list:
             prop_keys[prop] = self._prop_list[prop][1]
@@ -300,6 +431,7 @@ class DeltaAnimationBase(AnimationBase):
         self._frame_pointer = 0.0
         self._progress = 0.0
         self._running = False
+        self._compiled = None
         for prop in self._saved_prop_list:
             cval = self._get_value_from(prop)
             if type(cval) in (tuple, list):
@@ -401,10 +533,13 @@ class Animation(EventDispatcher):
 
     def stop(self, widget):
         '''Stops animating the widget and raises a event.'''
-        if self.children[widget].generate_event:
+        animobj = self.children[widget]
+        if animobj.generate_event:
             widget.dispatch_event('on_animation_complete', self)
             self.dispatch_event('on_complete', widget)
-        self._del_child(widget)
+        # the animation can have been restarted by on_complete (Repeat)
+        if self.children.get(widget) is animobj and not animobj.running:
+            self._del_child(widget)
 
     def pause(self):
         pass
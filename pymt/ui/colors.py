@@ -29,7 +29,6 @@ __all__ = (
 )
 
 from pymt.logger import pymt_logger
-from pymt.cache import Cache
 from pymt.parser import parse_color, parse_image, parse_float4, \
         parse_float, parse_bool, parse_int, parse_int2, parse_string
 from pymt import pymt_data_dir, pymt_home_dir
@@ -40,9 +39,6 @@ import logging
 import re
 import weakref
 
-# Register CSS cache
-Cache.register('pymt.css', limit=500, timeout=60)
-
 #: Instance of the CSS sheet
 pymt_sheet = None
 
@@ -55,7 +51,7 @@ pymt_css_prefix = ['key-', 'slider-', 'title-']
 
 # Privates vars for reload features
 _css_sources = []
-_css_widgets = set()
+_css_widgets = weakref.WeakSet()
 
 # Auto conversion from css to a special type.
 css_keyword_convert = {
@@ -117,17 +113,28 @@ css_keyword_convert = {
 }
 
 class CSSSheet(object):
+    '''A CSS sheet. The rules are stored by selector, and the style of a
+    widget is resolved once for each (widget class, css classes, id)
+    signature. The resolved styles are forgotten when the rules change.'''
     def __init__(self):
         self._rule = ''
         self._content = ''
         self._state = 'rule'
         self._css = {}
+        self._styles = {}
+        self._ids = set()
 
     def reset(self):
         self._rule = ''
         self._content = ''
         self._state = 'rule'
         self._css = {}
+        self._invalidate()
+
+    def _invalidate(self):
+        '''Forget the resolved styles, must be called when the rules change'''
+        self._styles = {}
+        self._ids = set([r[1:] for r in self._css if r.startswith('#')])
 
     def parse_text(self, text):
         '''Parse a CSS text, and inject in the current sheet'''
@@ -149,6 +156,7 @@ class CSSSheet(object):
         self._rule = ''
         for line in text.split('\n'):
             self._parse_line(line)
+        self._invalidate()
 
     def _parse_line(self, line):
         '''Parse a line, and inject into rules or content, depend on current
@@ -205,45 +213,56 @@ class CSSSheet(object):
 
     def get_style(self, widget):
         '''Return the style of a widget'''
-        widget_classes = get_widget_parents(widget)
-        widget_classes.append('*')
+        widget_cls = getattr(widget, 'cls', '')
+        if type(widget_cls) in (unicode, str):
+            widget_cls = (widget_cls, )
+        elif type(widget_cls) in (list, tuple):
+            widget_cls = tuple(widget_cls)
+        else:
+            widget_cls = ()
+
+        # the id is part of the signature only if a rule use it
+        widget_id = getattr(widget, 'id', None)
+        if widget_id not in self._ids:
+            widget_id = None
+
+        key = (widget.__class__, widget_cls, widget_id)
+        styles = self._styles.get(key)
+        if styles is None:
+            styles = self._styles[key] = self._resolve_style(
+                get_widget_parents(widget), widget_cls, widget_id)
+        return styles
+
+    def _resolve_style(self, widget_classes, widget_cls, widget_id):
+        '''Merge the rules matching a widget signature'''
+        css = self._css
         styles = {}
 
-        # 
-        # TODO rework this part to match
-        # #<objectid>  uniq
-        # <objectname> uniq
-        # .<class>     multiple
-        #
+        # from the less specific name to the most specific one
+        names = ['*'] + list(reversed(widget_classes))
 
         # match <objectname>
-        for cls in reversed(widget_classes):
-            for r, v in self._css.iteritems():
-                if r == cls:
-                    styles.update(v)
+        for name in names:
+            if name in css:
+                styles.update(css[name])
 
         # match .<classname>
-        widget_cls = widget.cls
-        if type(widget_cls) in (unicode, str):
-            widget_cls = [widget.cls]
-        if type(widget_cls) in (list, tuple):
-            for kcls in widget_cls:
-                cls = '.%s' % kcls
-                if cls in self._css:
-                    styles.update(self._css[cls])
-
-                # match <objectname>.<classname>
-                for name in reversed(widget_classes):
-                    lcls = '%s%s' % (name, cls)
-                    for r, v in self._css.iteritems():
-                        if r == lcls:
-                            styles.update(v)
+        for kcls in widget_cls:
+            cls = '.%s' % kcls
+            if cls in css:
+                styles.update(css[cls])
+
+            # match <objectname>.<classname>
+            for name in names:
+                lcls = '%s%s' % (name, cls)
+                if lcls in css:
+                    styles.update(css[lcls])
 
         # match #<objectname>
-        if hasattr(widget, 'id') and widget.id is not None:
-            widgetid = '#%s' % widget.id
-            if widgetid in self._css:
-                styles.update(self._css[widgetid])
+        if widget_id is not None:
+            widgetid = '#%s' % widget_id
+            if widgetid in css:
+                styles.update(css[widgetid])
 
         return styles
 
@@ -290,20 +309,8 @@ def css_get_style(widget):
             Widget to search CSS
     '''
 
-    global pymt_sheet
-
-    ref = weakref.ref(widget)
-    if not ref in _css_widgets:
-        _css_widgets.add(ref)
-
-    idwidget = css_get_widget_id(widget)
-    styles = Cache.get('pymt.css', idwidget)
-    if styles is not None:
-        return styles
-
-    styles = pymt_sheet.get_style(widget)
-    Cache.append('pymt.css', idwidget, styles)
-    return styles
+    _css_widgets.add(widget)
+    return pymt_sheet.get_style(widget)
 
 def css_add_sheet(text, _reload=False):
     '''Add a css text to use.
@@ -348,12 +355,7 @@ def css_reload():
     pymt_sheet.reset()
     for callback, args in _css_sources[:]:
         callback(*args, _reload=True)
-    Cache.remove('pymt.css')
-    for r in _css_widgets.copy():
-        o = r()
-        if o is None:
-            _css_widgets.remove(r)
-            continue
+    for o in list(_css_widgets):
         o.reload_css()
     pymt_logger.info('CSS: CSS Reloaded')
 
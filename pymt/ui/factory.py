@@ -21,7 +21,14 @@ class MTWidgetFactory(object):
 
     @staticmethod
     def get(widgetname):
-        '''Get a widget from database'''
+        '''Get a widget from database. The widgets of PyMT not yet imported
+        are imported on demand.'''
+        if widgetname not in MTWidgetFactory._widgets:
+            from pymt.lazy import lazy_import
+            try:
+                lazy_import(widgetname, 'pymt.ui')
+            except AttributeError:
+                pass
         if widgetname in MTWidgetFactory._widgets:
             return MTWidgetFactory._widgets[widgetname]
         raise Exception('Widget %s are not known in MTWidgetFactory' % widgetname)
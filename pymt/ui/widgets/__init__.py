@@ -2,30 +2,5 @@
 Widgets: all the pymt widgets
 '''
 
-from pymt.ui.widgets.button import *
-from pymt.ui.widgets.coverflow import *
-from pymt.ui.widgets.container import *
-from pymt.ui.widgets.buttonmatrix import *
-from pymt.ui.widgets.dragable import *
-from pymt.ui.widgets.flippable import *
-from pymt.ui.widgets.gesturewidget import *
-from pymt.ui.widgets.kinetic import *
-from pymt.ui.widgets.image import *
-from pymt.ui.widgets.label import *
-from pymt.ui.widgets.layout import *
-from pymt.ui.widgets.klist import *
-from pymt.ui.widgets.modalwindow import *
-from pymt.ui.widgets.radial import *
-from pymt.ui.widgets.rectangle import *
-from pymt.ui.widgets.scatter import *
-from pymt.ui.widgets.slider import *
-from pymt.ui.widgets.circularslider import *
-from pymt.ui.widgets.stencilcontainer import *
-from pymt.ui.widgets.svg import *
-from pymt.ui.widgets.objectdisplay import *
-from pymt.ui.widgets.widget import *
-from pymt.ui.widgets.xmlwidget import *
-from pymt.ui.widgets.speechbubble import *
-from pymt.ui.widgets.sidepanel import *
-
-from pymt.ui.widgets.composed import *
+from pymt.lazy import install_lazy_module
+install_lazy_module(__name__)
@@ -279,7 +279,7 @@ class MTImageButton(MTButton):
     def _set_filename(self, filename):
         self._filename = filename
         if filename:
-            self.image = pymt.Image(self.filename)
+            self.image = pymt.Image(self.filename, atlas=True)
     filename = property(_get_filename, _set_filename)
 
     def draw(self):
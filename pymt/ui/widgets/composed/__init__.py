@@ -2,15 +2,5 @@
 Composed: widgets composed by assembling core widgets
 '''
 
-from pymt.ui.widgets.composed.colorpick import *
-from pymt.ui.widgets.composed.kineticlist import *
-from pymt.ui.widgets.composed.innerwindow import *
-from pymt.ui.widgets.composed.modalpopup import *
-from pymt.ui.widgets.composed.tabs import *
-from pymt.ui.widgets.composed.video import *
-from pymt.ui.widgets.composed.vkeyboard import *
-from pymt.ui.widgets.composed.textinput import *
-from pymt.ui.widgets.composed.textarea import *
-from pymt.ui.widgets.composed.popup import *
-from pymt.ui.widgets.composed.filebrowser import *
-from pymt.ui.widgets.composed.vkeyboardspellcheck import *
+from pymt.lazy import install_lazy_module
+install_lazy_module(__name__)
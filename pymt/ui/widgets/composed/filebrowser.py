@@ -1,5 +1,13 @@
 '''
 File browser: a filebrowser view + a popup file browser
+
+The directories are scanned in a thread, and the entries are shown by
+batches while the scan is running. Only the entries in the view have a
+widget (see MTKineticListModel). The listing of the last directories is kept
+in cache, until the directory is modified.
+
+If the `scandir` module is installed, it's used to know the type of the
+entries without calling stat() on each of them.
 '''
 
 __all__ = (
@@ -10,19 +18,152 @@ __all__ = (
 
 import os
 import re
+import stat
+import threading
+import collections
 import pymt
 from pymt.utils import curry
+from pymt.cache import Cache
+from pymt.clock import getClock
+from pymt.logger import pymt_logger
 from pymt.loader import Loader
 from pymt.graphx import drawCSSRectangle, set_color, drawLabel, getLabel
 from pymt.ui.factory import MTWidgetFactory
 from pymt.ui.widgets.label import MTLabel
 from pymt.ui.widgets.button import MTToggleButton
-from pymt.ui.widgets.composed.kineticlist import MTKineticList, MTKineticItem
+from pymt.ui.widgets.composed.kineticlist import MTKineticList, \
+        MTKineticListModel, MTKineticItem
 from pymt.ui.widgets.composed.popup import MTPopup
 
+try:
+    from scandir import scandir
+except ImportError:
+    scandir = None
+
 # Search icons in data/icons/filetype
 icons_filetype_dir = os.path.join(pymt.pymt_data_dir, 'icons', 'filetype')
 
+# Listing of the last scanned directories
+Cache.register('pymt.filebrowser', limit=20)
+
+def _iter_directory(path, entries, batch_size):
+    '''(internal) Iterate on the entries of a directory, as batches of
+    (name, isdir). All the entries are added in `entries` too.'''
+    batch = []
+    if scandir is not None:
+        for entry in scandir(path):
+            try:
+                isdir = entry.is_dir()
+            except OSError:
+                isdir = False
+            batch.append((entry.name, isdir))
+            if len(batch) >= batch_size:
+                entries.extend(batch)
+                yield batch
+                batch = []
+    else:
+        for name in os.listdir(path):
+            # a single stat per entry
+            try:
+                isdir = stat.S_ISDIR(os.stat(os.path.join(path, name)).st_mode)
+            except OSError:
+                isdir = False
+            batch.append((name, isdir))
+            if len(batch) >= batch_size:
+                entries.extend(batch)
+                yield batch
+                batch = []
+    entries.extend(batch)
+    if batch:
+        yield batch
+
+
+class DirectoryScanner(object):
+    '''Scan a directory in a thread. The accepted entries are available by
+    batches of (name, isdir), with `pop_batches()`, which must be called
+    from the main thread. The listing is taken from the cache if the
+    directory didn't change since the last scan.
+
+    :Parameters:
+        `path` : str
+            Directory to scan
+        `show_hidden` : bool, default to False
+            Accept the hidden files
+        `filters` : list, default to []
+            List of regex. If not empty, only the files matching one of them
+            are accepted (directories are not affected).
+        `batch_size` : int, default to 500
+            Maximum number of entries read before giving a batch
+    '''
+    def __init__(self, path, show_hidden=False, filters=[], batch_size=500):
+        self.path = path
+        self.show_hidden = show_hidden
+        self.filters = [re.compile(x) for x in filters]
+        self.batch_size = batch_size
+        #: True when the scan is finished
+        self.done = False
+        self._cancelled = False
+        self._batches = collections.deque()
+        # (mtime, entries) of the last scan, and of this scan
+        self._cached = Cache.get('pymt.filebrowser', path)
+        self._listing = None
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _accept(self, name, isdir):
+        if not self.show_hidden and name[0] == '.':
+            return False
+        if isdir or not self.filters:
+            return True
+        for regex in self.filters:
+            if regex.match(name):
+                return True
+        return False
+
+    def _iter_batches(self):
+        mtime = os.stat(self.path).st_mtime
+        cached = self._cached
+        if cached is not None and cached[0] == mtime:
+            entries = cached[1]
+            for i in xrange(0, len(entries), self.batch_size):
+                yield entries[i:i + self.batch_size]
+            return
+        entries = []
+        for batch in _iter_directory(self.path, entries, self.batch_size):
+            yield batch
+        self._listing = (mtime, entries)
+
+    def _run(self):
+        try:
+            for entries in self._iter_batches():
+                if self._cancelled:
+                    return
+                batch = [x for x in entries if self._accept(*x)]
+                if batch:
+                    self._batches.append(batch)
+        except OSError:
+            pymt_logger.exception('FileBrowser: unable to scan <%s>' %
+                                  self.path)
+        finally:
+            self.done = True
+
+    def cancel(self):
+        '''Stop the scan'''
+        self._cancelled = True
+
+    def pop_batches(self):
+        '''Return the batches scanned since the last call'''
+        # the cache is not thread safe, update it from here
+        if self.done and self._listing is not None:
+            Cache.append('pymt.filebrowser', self.path, self._listing)
+            self._listing = None
+        batches = []
+        while self._batches:
+            batches.append(self._batches.popleft())
+        return batches
+
+
 class FileTypeFactory:
     '''
     FileType Factory: Maintains a Dictionary of all filetypes and its icons.
@@ -54,6 +195,12 @@ class FileTypeFactory:
         else:
             return FileTypeFactory.__filetypes__['unknown']
 
+    @staticmethod
+    def load_icon(filename):
+        '''Load an icon in the texture atlas. Used as the load_callback of
+        the Loader.'''
+        return pymt.ImageLoader.load(filename, atlas=True)
+
 class MTFileEntryView(MTKineticItem):
     '''Base view class for every file entry'''
     def __init__(self, **kwargs):
@@ -62,13 +209,25 @@ class MTFileEntryView(MTKineticItem):
         self.filename   = kwargs.get('filename')
         self.browser    = kwargs.get('browser')
         self.label_txt  = kwargs.get('label')
+        self.isdir      = kwargs.get('isdir')
         self.selected   = False
 
         self.get_image_for_filename()
 
+    def set_entry(self, label, filename, isdir=None):
+        '''Reuse the view for another file'''
+        self.label      = label
+        self.label_txt  = label
+        self.filename   = filename
+        self.isdir      = isdir
+        self.selected   = False
+        self.get_image_for_filename()
+
     def get_image_for_filename(self):
         '''Return image for current filename'''
-        if os.path.isdir(self.filename):
+        if self.isdir is None:
+            self.isdir = os.path.isdir(self.filename)
+        if self.isdir:
             self.type_image = FileTypeFactory.get('folder')
         else:
             ext = self.label_txt.split('.')[-1]
@@ -84,18 +243,27 @@ class MTFileListEntryView(MTFileEntryView):
     def __init__(self, **kwargs):
         super(MTFileListEntryView, self).__init__(**kwargs)
         self.height         = 25
-        self.image          = Loader.image(self.type_image)
+        self.image          = Loader.image(self.type_image,
+                                load_callback=FileTypeFactory.load_icon)
         self.image.scale    = 0.5
         if self.browser._w_limit is None:
             self.browser.w_limit    = 1
         self.font_size = self.style['font-size']
+        # Simple trick to get the maximum label width for the current font size
+        self.width = getLabel('W' * self.max_chars, font_size=self.font_size).width
+
+    #: Max number of chars for the label of an entry
+    max_chars = 20
+
+    def set_entry(self, label, filename, isdir=None):
+        super(MTFileListEntryView, self).set_entry(label, filename, isdir)
+        self.image          = Loader.image(self.type_image,
+                                load_callback=FileTypeFactory.load_icon)
+        self.image.scale    = 0.5
 
     def draw(self):
         pos = self.image.width, self.y
-        # Max number of chars for this entry's label
-        max_chars = 20
-        # Simple trick to get the maximum label width for the current font size
-        self.width = getLabel('W'*max_chars, font_size=self.font_size).width
+        max_chars = self.max_chars
         if self.selected:
             selected_color = self.style.get('selected-color', (0.4,) * 4)
             set_color(*selected_color)
@@ -113,10 +281,16 @@ class MTFileIconEntryView(MTFileEntryView):
     def __init__(self, **kwargs):
         super(MTFileIconEntryView, self).__init__(**kwargs)
         self.size           = (80, 80)
-        self.image          = Loader.image(self.type_image)
+        self.image          = Loader.image(self.type_image,
+                                load_callback=FileTypeFactory.load_icon)
         if self.browser._w_limit is None:
             self.browser.w_limit = 4
 
+    def set_entry(self, label, filename, isdir=None):
+        super(MTFileIconEntryView, self).set_entry(label, filename, isdir)
+        self.image          = Loader.image(self.type_image,
+                                load_callback=FileTypeFactory.load_icon)
+
     def draw(self):
         if self.selected:
             selected_color = self.style.get('selected-color', (0.4,) * 4)
@@ -178,76 +352,82 @@ class MTFileBrowserView(MTKineticList):
         self.multipleselection = kwargs.get('multipleselection')
         self.invert_order = kwargs.get('invert_order', False)
 
+        # entries of the current path, as (order, name, filename, isdir)
+        self._entries       = []
+        self._entries_view  = None
+        self._scanner       = None
+
         # only at the end, set path to the user path
         self.path           = kwargs.get('path')
 
     def update(self):
         '''Update the content of view. You must call this function after
-        any change of a property. (except path.)'''
-        # remove all actual entries
-        self.clear()
-        self.selection = []
+        any change of a property. (except path.)
 
-        children = []
-        listfiles = os.listdir(self.path)
-        listfiles.sort()
-
-        # add each file from directory
-        # only files are filtred with filters
-        for name in reversed(listfiles):
-            filename = os.path.join(self.path, name)
-
-            # filter on hidden file if requested
-            if not self.show_hidden:
-                if name != '..' and name[0] == '.':
-                    continue
-
-            if os.path.isdir(filename):
-                continue
-
-            # filtering
-            if len(self.filters):
-                match = False
-                for regex in self.filters:
-                    if re.match(regex, name):
-                        match = True
-                if not match:
-                    continue
-
-            # add this file as new file.
-            children.append(self.view(
-                label=name, filename=filename,
-                browser=self, size=self.size
-            ))
-
-        # second time, do directories
-        for name in reversed(listfiles):
-            filename = os.path.join(self.path, name)
-
-            # filter on hidden file if requested
-            if not self.show_hidden:
-                if name != '..' and name[0] == '.':
-                    continue
-
-            if not os.path.isdir(filename):
-                continue
-
-            # add this file as new file.
-            children.append(self.view(
-                label=name, filename=filename,
-                browser=self, size=self.size
-            ))
+        The directory is scanned in a thread, the entries are added while
+        they are coming.'''
+        self._stop_scan()
+        self.selection = []
 
         # add always "to parent"
-        children.append(self.view(
-            label='..', filename=os.path.join(self.path, '../'),
-            browser=self, size=self.size
-        ))
+        self._entries = [(0, '..', os.path.join(self.path, '../'), True)]
+
+        # the widgets can be reused only for the same view
+        if self._entries_view is not self.view:
+            self._entries_view = self.view
+            # the size of the entries is given by a first view
+            item_size = tuple(self._create_entry(self._entries[0]).size)
+            self.model = MTKineticListModel(data=self._entries,
+                    factory=self._create_entry, updater=self._update_entry,
+                    item_size=item_size)
+        else:
+            self.model.data = self._entries
+        self.xoffset = self.yoffset = 0
+
+        self._scanner = DirectoryScanner(self.path,
+                show_hidden=self.show_hidden, filters=self.filters)
+        getClock().schedule_interval(self._poll_scanner, 0)
 
-        # attach handlers
-        for child in children:
-            child.push_handlers(on_press=curry(self._on_file_selected, child))
-            self.add_widget(child, front=self.invert_order)
+    def _stop_scan(self):
+        if self._scanner is None:
+            return
+        self._scanner.cancel()
+        self._scanner = None
+        getClock().unschedule(self._poll_scanner)
+
+    def _poll_scanner(self, dt):
+        scanner = self._scanner
+        if scanner is None:
+            return False
+        done = scanner.done
+        batches = scanner.pop_batches()
+        if batches:
+            path = self.path
+            entries = self._entries
+            for batch in batches:
+                for name, isdir in batch:
+                    entries.append((1 if isdir else 2, name,
+                                    os.path.join(path, name), isdir))
+            # directories first, then files
+            entries.sort(reverse=self.invert_order)
+            self.model.notify()
+        if done:
+            self._scanner = None
+            return False
+
+    def _create_entry(self, entry):
+        order, name, filename, isdir = entry
+        child = self.view(label=name, filename=filename, isdir=isdir,
+                          browser=self, size=self.size)
+        child.push_handlers(on_press=curry(self._on_file_selected, child))
+        child.selected = filename in self._selection
+        return child
+
+    def _update_entry(self, child, entry):
+        order, name, filename, isdir = entry
+        child.set_entry(name, filename, isdir)
+        child.selected = filename in self._selection
+        return True
 
     def _get_path(self):
         return self._path
@@ -270,7 +450,7 @@ class MTFileBrowserView(MTKineticList):
     def _on_file_selected(self, fileview, touch):
         # auto change for directory
         filename = fileview.filename
-        if os.path.isdir(filename) and touch.is_double_tap:
+        if fileview.isdir and touch.is_double_tap:
             # Enter that directory
             self.path = filename
             # Forget about any selection we did before
@@ -323,7 +503,7 @@ class MTFileBrowserToggle(MTToggleButton):
 
     def _set_icon(self, value):
         self.image = pymt.Image(os.path.join(
-            pymt.pymt_data_dir, 'icons', value))
+            pymt.pymt_data_dir, 'icons', value), atlas=True)
     icon = property(fset=_set_icon)
 
     def draw(self):
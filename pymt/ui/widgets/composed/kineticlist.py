@@ -3,11 +3,13 @@ Kinetic List: Custom list with kinetic interaction
 '''
 
 __all__ = (
-    'MTKineticList', 'MTKineticObject',
+    'MTKineticList', 'MTKineticListModel', 'MTKineticObject',
     'MTKineticItem', 'MTKineticImage'
 )
 
 import pymt
+from bisect import bisect_left, bisect_right
+from pymt.event import EventDispatcher
 from pymt.utils import boundary
 from pymt.graphx import set_color, drawRectangle, drawCSSRectangle
 from pymt.base import getFrameDt
@@ -60,6 +62,15 @@ class MTKineticList(MTStencilContainer):
         `trigger_distance` : int, default to 3
             Maximum trigger distance to dispatch event on children
             (this mean if you move too much, trigger will not happen.)
+        `model` : MTKineticListModel, default to None
+            If set, the list is virtualized: the children are created by
+            the model, only for the items in the view, and the widgets of
+            the items going out of the view are reused. Don't add children
+            yourself, and use the model data instead of search/delete.
+        `virtual_margin` : int, default to 100
+            With a model, distance in pixels around the view where the
+            items are created too (avoid creating widgets while scrolling
+            slowly)
 
     :Styles:
         `bg-color` : color
@@ -88,6 +99,8 @@ class MTKineticList(MTStencilContainer):
         kwargs.setdefault('searchable', True)
         kwargs.setdefault('trigger_distance', 3)
         kwargs.setdefault('align', 'center')
+        kwargs.setdefault('model', None)
+        kwargs.setdefault('virtual_margin', 100)
 
         super(MTKineticList, self).__init__(**kwargs)
 
@@ -111,6 +124,7 @@ class MTKineticList(MTStencilContainer):
         self.h_limit    = kwargs.get('h_limit')
         self.align      = kwargs.get('align')
         self.trigger_distance = kwargs.get('trigger_distance')
+        self.virtual_margin = kwargs.get('virtual_margin')
 
         if self.w_limit and self.h_limit:
             raise Exception('You cannot limit both axes')
@@ -133,6 +147,15 @@ class MTKineticList(MTStencilContainer):
         self._scrollbar_index = 0
         self._scrollbar_size = 0
 
+        # Virtualized list: model, widgets of the visible items (by index),
+        # widgets available for reuse, and the rows, computed once.
+        self._model = None
+        self._items = {}
+        self._pool = []
+        self._rows = None
+        self._rows_key = None
+        self.model = kwargs.get('model')
+
         # create the UI part.
         self._create_ui()
 
@@ -192,6 +215,31 @@ class MTKineticList(MTStencilContainer):
         self.children = SafeList()
         self.pchildren = SafeList()
         self.xoffset = self.yoffset = 0
+        self._items = {}
+        self._pool = []
+        self._rows = None
+
+    def _get_model(self):
+        return self._model
+    def _set_model(self, model):
+        if model is self._model:
+            return
+        if self._model is not None:
+            self._model.remove_handlers(on_change=self._on_model_change)
+        self.clear()
+        self._model = model
+        if model is not None:
+            model.push_handlers(on_change=self._on_model_change)
+    model = property(_get_model, _set_model,
+            doc='Get/set the model of a virtualized list')
+
+    def _on_model_change(self, *largs):
+        # every widget may show another item now
+        for widget in self._items.itervalues():
+            super(MTKineticList, self).remove_widget(widget)
+            self._pool.append(widget)
+        self._items = {}
+        self._rows = None
 
     def add_widget(self, widget, **kwargs):
         super(MTKineticList, self).add_widget(widget, **kwargs)
@@ -270,99 +318,166 @@ class MTKineticList(MTStencilContainer):
         return total
 
     def goto_head(self):
+        if self._model is not None:
+            self.do_layout()
+            if not self.h_limit:
+                self.yoffset = -self._last_content_size + self.height
+            else:
+                self.xoffset = 0
+            self.ensure_bounding()
+            return
         if not self.h_limit:
             self.yoffset = -self._get_total_width(self.children, 'height')/self.w_limit + self.size[1] - 100
         else:
             self.xoffset = self._get_total_width(self.children, 'width')/self.h_limit + self.size[0] - 100
 
-    def do_layout(self):
-        '''Apply layout to all the items'''
-
-        t = index = 0
-
-        # adapt value for direction
-        w2          = self.width / 2.
-        h2          = self.height / 2.
-        inverse     = 0
-        limit       = self.w_limit
-        width_attr  = 'width'
-        height_attr = 'height'
-        xoffset     = self.xoffset
-        sx          = self.x
-        y           = self.y + self.yoffset
-        padding_x   = self.padding_x
-        padding_y   = self.padding_y
-
-        # inverse
-        if not self.w_limit:
-            inverse     = 1
-            limit       = self.h_limit
-            width_attr  = 'height'
-            height_attr = 'width'
-            xoffset     = self.yoffset
-            y           = self.x + self.xoffset
-            padding_x   = self.padding_y
-            padding_y   = self.padding_x
-            w2, h2      = h2, w2
-            sx          = self.y
-
-        # calculate size of actual content
-        size = 0
-        for i in xrange(len(self.children)):
-            if i % limit == 0:
-                maxrange = min(i + limit, len(self.children))
-                childrens = [self.children[z] for z in range(i, maxrange)]
-                h = max((c.__getattribute__(height_attr) for c in childrens))
-                size += h + padding_y
-        self._last_content_size = size
-
-        # add little padding for good looking.
-        y += padding_y
-        ny = y
-
-        # recalculate position for each children
-        for child in self.children[:]:
-
-            # each row, calculate the height, advance y and reset x
-            if index % limit == 0:
-
-                # set y axis to the previous calculated position
-                y = ny
-
-                # get children in the row
-                maxrange = min(t + limit, len(self.children))
-                childrens = [self.children[z] for z in range(t, maxrange)]
-
-                # take the largest height in the current row
-                if len(childrens):
-                    h = max((c.__getattribute__(height_attr) for c in childrens))
-                else:
-                    h = 0
-
-                # prepare the y axis for next loop
-                ny = y + h + padding_y
-
-                # reset x for this row.
-                if self.align == 'center':
-                    x = sx + w2 + xoffset - \
-                        (self._get_total_width(childrens, width_attr) / 2.)
-                elif self.align == 'left':
-                    x = 0
-                elif self.align == 'right':
-                    x = getattr(self, width_attr) - getattr(child, width_attr) - xoffset
-                t += limit
-
-            # reposition x
+    def _get_axis(self):
+        '''Return the layout parameters, for the direction of the list'''
+        if self.w_limit:
+            return (0, self.w_limit, 'width', 'height', self.width / 2.,
+                    self.xoffset, self.x, self.y + self.yoffset,
+                    self.padding_x, self.padding_y)
+        return (1, self.h_limit, 'height', 'width', self.height / 2.,
+                self.yoffset, self.y, self.x + self.xoffset,
+                self.padding_y, self.padding_x)
+
+    def _place_row(self, row, widths, y, axis):
+        '''Position the widgets of a row'''
+        inverse, limit, width_attr, height_attr, w2, xoffset, sx, sy, \
+                padding_x, padding_y = axis
+        if self.align == 'center':
+            x = sx + w2 + xoffset - (sum(widths) + padding_x * len(widths)) / 2.
+        elif self.align == 'left':
+            x = 0
+        else:
+            x = getattr(self, width_attr) - widths[0] - xoffset
+        for child, width in zip(row, widths):
             if not inverse:
                 child.kx = x + padding_x
                 child.ky = y
             else:
                 child.ky = x + padding_x
                 child.kx = y
-            x += child.__getattribute__(width_attr) + padding_x
+            x += width + padding_x
+
+    def do_layout(self):
+        '''Apply layout to all the items'''
+        if self._model is not None:
+            return self._do_layout_model()
 
-            # Increment index
-            index += 1
+        axis = self._get_axis()
+        limit, width_attr, height_attr = axis[1:4]
+        sy, padding_y = axis[7], axis[9]
+
+        # split in rows, and take the largest height of each row
+        children = self.children[:]
+        rows = []
+        size = 0
+        for i in xrange(0, len(children), limit):
+            row = children[i:i + limit]
+            h = max([getattr(c, height_attr) for c in row])
+            rows.append((row, h))
+            size += h + padding_y
+        self._last_content_size = size
+
+        # add little padding for good looking.
+        y = sy + padding_y
+        for row, h in rows:
+            self._place_row(row, [getattr(c, width_attr) for c in row], y, axis)
+            y += h + padding_y
+
+    def _compute_rows(self, axis):
+        '''Compute the rows of the model: start and height of each row,
+        and the widths of the items'''
+        model = self._model
+        limit, width_attr = axis[1:3]
+        padding_y = axis[9]
+        index = 0 if width_attr == 'width' else 1
+        count = model.get_count()
+        starts = []
+        ends = []
+        widths = []
+        y = 0
+        for i in xrange(0, count, limit):
+            sizes = [model.get_item_size(j)
+                     for j in xrange(i, min(i + limit, count))]
+            h = max([size[1 - index] for size in sizes])
+            starts.append(y)
+            ends.append(y + h)
+            widths.append([size[index] for size in sizes])
+            y += h + padding_y
+        self._rows = starts, ends, widths
+        self._last_content_size = y
+
+    def _do_layout_model(self):
+        '''Layout of a virtualized list: create the widgets of the items
+        in the view, and reuse the others.'''
+        axis = self._get_axis()
+        inverse, limit = axis[0:2]
+        sy, padding_y = axis[7], axis[9]
+        model = self._model
+
+        key = (limit, self.padding_x, self.padding_y, tuple(self.size))
+        if self._rows is None or key != self._rows_key:
+            self._rows_key = key
+            self._compute_rows(axis)
+        starts, ends, widths = self._rows
+
+        # rows in the view (plus margin), relative to the start of content
+        if not inverse:
+            view = self.height
+            lo = self.y - sy - padding_y - self.virtual_margin
+        else:
+            view = self.width
+            lo = self.x - sy - padding_y - self.virtual_margin
+        hi = lo + view + 2 * self.virtual_margin
+        first = bisect_left(ends, lo)
+        last = bisect_right(starts, hi)
+        first_index = first * limit
+        last_index = min(last * limit, model.get_count())
+
+        # release widgets out of the view
+        items = self._items
+        for index in items.keys():
+            if index < first_index or index >= last_index:
+                widget = items.pop(index)
+                super(MTKineticList, self).remove_widget(widget)
+                self._pool.append(widget)
+
+        # create or reuse widgets for the new items in the view
+        for index in xrange(first_index, last_index):
+            if index in items:
+                continue
+            widget = None
+            while self._pool:
+                widget = self._pool.pop()
+                if model.update_widget(widget, index):
+                    break
+                widget = None
+            if widget is None:
+                widget = model.create_widget(index)
+            items[index] = widget
+            super(MTKineticList, self).add_widget(widget)
+
+        for row in xrange(first, last):
+            index = row * limit
+            row_widths = widths[row]
+            row_items = [items[i] for i in xrange(index, index + len(row_widths))]
+            self._place_row(row_items, row_widths,
+                            sy + padding_y + starts[row], axis)
+
+    def _child_in_view(self, w):
+        '''Check if a child is in the view, from the position set by the
+        layout (the child position is updated only when drawn).'''
+        if getattr(w, 'free', True):
+            x, y = w.pos
+        else:
+            x, y = w.kx + w.xoffset, w.ky + w.yoffset
+        if self.do_y and (y + w.height < self.y or y > self.y + self.height):
+            return False
+        if self.do_x and (x + w.width < self.x or x > self.x + self.width):
+            return False
+        return True
 
     def on_touch_down(self, touch):
         if not self.collide_point(touch.x, touch.y):
@@ -439,6 +554,8 @@ class MTKineticList(MTStencilContainer):
         # ok, the trigger distance is enough, we can dispatch event.
         # will not work if children grab the touch in down state :/
         for child in reversed(self.children[:]):
+            if not self._child_in_view(child):
+                continue
             must_break = child.dispatch_event('on_touch_down', touch)
             old_grab_current = touch.grab_current
             touch.grab_current = child
@@ -490,13 +607,11 @@ class MTKineticList(MTStencilContainer):
         # draw children
         self.stencil_push()
         for w in self.children[:]:
+            # optimization to update and draw only viewed children
+            if not self._child_in_view(w):
+                continue
             # internal update of children
             w.update()
-            # optimization to draw only viewed children
-            if self.do_y and (w.y + w.height < self.y or w.y > self.y + self.height):
-                continue
-            if self.do_x and (w.x + w.width < self.x or w.x > self.x + self.width):
-                continue
             w.on_draw()
         self.stencil_pop()
 
@@ -547,6 +662,89 @@ class MTKineticList(MTStencilContainer):
         self.draw()
 
 
+class MTKineticListModel(EventDispatcher):
+    '''Data model of a virtualized MTKineticList. The list ask the model
+    for the number of items and their size, and create widgets only for the
+    items in the view ::
+
+        def create(filename):
+            return MTKineticItem(label=filename, size=(200, 30))
+        def update(widget, filename):
+            widget.label = filename
+            return True
+        model = MTKineticListModel(data=filenames, factory=create,
+                                   updater=update, item_size=(200, 30))
+        klist = MTKineticList(model=model, size=(400, 600))
+
+    You can also subclass it, and override `get_count()`,
+    `get_item_size()`, `create_widget()` and `update_widget()`.
+
+    :Parameters:
+        `data` : list, default to []
+            Items of the model
+        `factory` : function, default to None
+            Function called with an item, that return a new widget for it
+        `updater` : function, default to None
+            Function called with (widget, item) to reuse a widget for
+            another item. Must return True if the widget have been reused.
+            If None, the widgets are not reused.
+        `item_size` : tuple or function, default to (100, 30)
+            Size of the widget of an item. If it's a function, it's called
+            with the item.
+
+    :Events:
+        `on_change` ()
+            Fired when the data change. If you change the data in place,
+            call `notify()`.
+    '''
+    def __init__(self, **kwargs):
+        kwargs.setdefault('data', [])
+        kwargs.setdefault('factory', None)
+        kwargs.setdefault('updater', None)
+        kwargs.setdefault('item_size', (100, 30))
+        super(MTKineticListModel, self).__init__(**kwargs)
+        self.register_event_type('on_change')
+        self._data = kwargs.get('data')
+        self.factory = kwargs.get('factory')
+        self.updater = kwargs.get('updater')
+        self.item_size = kwargs.get('item_size')
+
+    def _get_data(self):
+        return self._data
+    def _set_data(self, data):
+        self._data = data
+        self.notify()
+    data = property(_get_data, _set_data, doc='Get/set the items of the model')
+
+    def notify(self):
+        '''Tell the lists that the data changed'''
+        self.dispatch_event('on_change')
+
+    def on_change(self):
+        pass
+
+    def get_count(self):
+        '''Return the number of items'''
+        return len(self._data)
+
+    def get_item_size(self, index):
+        '''Return the (width, height) of an item'''
+        if callable(self.item_size):
+            return self.item_size(self._data[index])
+        return self.item_size
+
+    def create_widget(self, index):
+        '''Return a new widget for an item'''
+        return self.factory(self._data[index])
+
+    def update_widget(self, widget, index):
+        '''Reuse a widget for another item. Return False if the widget
+        can't be reused.'''
+        if self.updater is None:
+            return False
+        return self.updater(widget, self._data[index])
+
+
 class MTKineticObject(MTWidget):
     def __init__(self, **kwargs):
         '''Kinetic object, the base object for every child in kineticlist.
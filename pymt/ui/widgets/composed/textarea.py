@@ -4,17 +4,18 @@ TextArea: a multiline text input, based on TextInput
 
 __all__ = ('MTTextArea', )
 
-import re
 from pymt.graphx import set_color
 from pymt.base import getFrameDt
 from pymt.graphx import drawRectangle
 from pymt.core.text import Label
+from pymt.core.text.layout import TextLayout
 from pymt.ui.widgets.composed.textinput import MTTextInput
 
 class MTTextArea(MTTextInput):
     '''A multi line text input widget'''
     def __init__(self, **kwargs):
         self._glyph_size = {}
+        self._layout = None
         self._scroll_x = 0
         self._scroll_y = 5
         super(MTTextArea, self).__init__(**kwargs)
@@ -74,51 +75,43 @@ class MTTextArea(MTTextInput):
     def _refresh_lines(self, text=None):
         text = text or self.value
         self.lines = self._split_smart(text)
-        self.line_labels = map(self.create_line_label, self.lines)
+        # only create labels for the lines that changed
+        old_labels = dict((label.label, label)
+                          for label in getattr(self, 'line_labels', ()))
+        self.line_labels = [old_labels.get(line.replace('\n', '')) or
+                            self.create_line_label(line)
+                            for line in self.lines]
         self.line_height = self.line_labels[0].content_height
         self.line_spacing = 2
         self._recalc_size()
 
-    def _tokenize(self, text):
-        delimiters = ' ,\'".;:\n\r\t'
-        oldindex = 0
-        for index, char in enumerate(text):
-            if char not in delimiters:
-                continue
-            yield text[oldindex:index]
-            yield text[index:index+1]
-            oldindex = index+1
-        yield text[oldindex:]
-
     def _split_smart(self, text):
         # depend of the options, split the text on line, or word
         if self.autowidth or self.autosize:
             return text.split('\n')
 
-        # no autosize, do wordwrap.
-        x = 0
-        line = []
-        lines = []
-        width = self.width
-        glyph_size = self.glyph_size
-
-        # try to add each word on current line.
-        for word in self._tokenize(text):
-            is_newline = word == '\n'
-            w = glyph_size(word)
-            # if we have more than the width, or if it's a newline,
-            # push the current line, and create a new one
-            if (x + w > width and line) or is_newline:
-                lines.append(''.join(line))
-                line = []
-                x = 0
-            x += w
-            line.append(word)
-        if line:
-            lines.append(''.join(line))
+        # no autosize, do wordwrap. only the edited paragraphs are wrapped
+        # again by the layout.
+        layout = self._layout
+        if layout is None:
+            layout = self._layout = TextLayout(self._get_extents,
+                width=self.width, delimiters=' ,\'".;:\r\t')
+        else:
+            layout.width = self.width
+        layout.text = text
 
+        # the newline between two paragraphs is at the start of the line
+        lines = []
+        start = 0
+        for _, end, _, _ in layout.lines:
+            lines.append(text[start:end])
+            start = end
         return lines
 
+    def _get_extents(self, text):
+        # the height of the lines is handled by the textarea
+        return self.glyph_size(text), 0
+
     def set_line_text(self, line_num, text):
         self.lines[line_num] = text
         self.line_labels[line_num].label = text
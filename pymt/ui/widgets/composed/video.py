@@ -7,6 +7,7 @@ __all__ = ('MTVideo', 'MTSimpleVideo')
 from pymt import pymt_icons_dir
 from pymt.core.image import Image
 from pymt.core.video import Video
+from pymt.base import requestRedraw
 from pymt.clock import getClock
 from pymt.graphx import set_color, drawCSSRectangle
 from pymt.ui.widgets.layout import MTBoxLayout
@@ -60,6 +61,8 @@ class MTSimpleVideo(MTWidget):
     def on_update(self):
         self.size = self.player.size
         self.player.update()
+        if self.player.state == 'playing':
+            requestRedraw()
         super(MTSimpleVideo, self).on_update()
 
     def draw(self):
@@ -96,10 +99,14 @@ class MTVideo(MTSimpleVideo):
         self.bordersize = kwargs.get('bordersize')
 
         # images play/pause/mute
-        self.f_play = Image(pymt_icons_dir + 'video-play.png')
-        self.f_pause = Image(pymt_icons_dir + 'video-pause.png')
-        self.f_vmute = Image(pymt_icons_dir + 'video-volume-mute.png')
-        self.f_v100 = Image(pymt_icons_dir + 'video-volume-100.png')
+        self.f_play = Image(pymt_icons_dir + 'video-play.png',
+                            atlas=True)
+        self.f_pause = Image(pymt_icons_dir + 'video-pause.png',
+                            atlas=True)
+        self.f_vmute = Image(pymt_icons_dir + 'video-volume-mute.png',
+                            atlas=True)
+        self.f_v100 = Image(pymt_icons_dir + 'video-volume-100.png',
+                            atlas=True)
 
         # create UI
         box = MTBoxLayout(orientation='horizontal', uniform_height=True,
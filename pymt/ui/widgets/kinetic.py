@@ -6,7 +6,7 @@ __all__ = ('MTKinetic', )
 
 from pymt.input import Touch
 from pymt.vector import Vector
-from pymt.base import getFrameDt, getCurrentTouches
+from pymt.base import getFrameDt, getCurrentTouches, requestRedraw
 from pymt.utils import boundary
 from pymt.ui.widgets.widget import MTWidget
 
@@ -152,6 +152,9 @@ class MTKinetic(MTWidget):
             if ktouch.mode != 'spinning':
                 continue
 
+            # the children are moved while drawing, draw the next frame too
+            requestRedraw()
+
             # process kinetic
             event        = ''
             ktouch.dxpos = ktouch.x
@@ -2,8 +2,5 @@
 Layout: arrange widget in a layout
 '''
 
-from pymt.ui.widgets.layout.abstractlayout import MTAbstractLayout
-from pymt.ui.widgets.layout.boxlayout import MTBoxLayout
-from pymt.ui.widgets.layout.gridlayout import MTGridLayout
-from pymt.ui.widgets.layout.anchorlayout import MTAnchorLayout
-from pymt.ui.widgets.layout.screenlayout import MTScreenLayout
+from pymt.lazy import install_lazy_module
+install_lazy_module(__name__)
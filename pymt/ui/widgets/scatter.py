@@ -10,6 +10,7 @@ from pymt.lib.transformations import matrix_multiply, identity_matrix, \
         translation_matrix, rotation_matrix, scale_matrix, inverse_matrix
 from pymt.core.image import Image
 from pymt.logger import pymt_logger
+from pymt.base import requestRedraw
 from pymt.ui.widgets.svg import MTSvg
 from pymt.ui.widgets.widget import MTWidget
 from pymt.utils import deprecated, serialize_numpy, deserialize_numpy
@@ -240,6 +241,7 @@ class MTScatter(MTWidget):
     def _set_transform(self, x):
         self._transform = x
         self.update_matrices()
+        requestRedraw()
     transform = property(_get_transform, _set_transform,
         doc='Get/Set transformation matrix (numpy matrix)')
 
@@ -0,0 +1,224 @@
+'''
+Spatial: widget container with a spatial index for touch hit-testing
+
+MTWidget dispatch every touch to all his children, from the top to the
+bottom. With thousands of children, this cost a lot for every touch, on
+every frame. MTSpatialWidget keep his children in a uniform grid, keyed on
+their bounding box (the `bbox` property is used for transformed widgets
+like MTScatter), and offer a touch only to the children whose bounding box
+contain it. The z-order is the same as MTWidget ::
+
+    desktop = MTSpatialWidget(size=getWindow().size)
+    for filename in filenames:
+        desktop.add_widget(MTScatterImage(filename=filename))
+
+.. warning::
+    A child will receive on_touch_* only if the touch is inside his bounding
+    box. Don't put widgets that handle touches outside of their bounds (like
+    MTScatterPlane) inside a MTSpatialWidget. Grabbed touches are not
+    affected, they are still dispatched by the event loop.
+
+The index is synchronized with the children at most once per frame, when the
+first touch of the frame is dispatched. Bounds changes made by a child while
+dispatching a touch are seen on the next frame.
+'''
+
+__all__ = ('SpatialGrid', 'MTSpatialWidget')
+
+from pymt.clock import getClock
+from pymt.ui.widgets.widget import MTWidget
+
+
+class SpatialGrid(object):
+    '''Uniform grid that index objects by their bounding box.
+
+    :Parameters:
+        `cell_size` : int, default to 128
+            Size of a grid cell, in pixels.
+        `max_cells` : int, default to 256
+            If an object cover more cells than this, it's not stored in the
+            grid, but in a list of objects returned for every query.
+    '''
+
+    __slots__ = ('cell_size', 'max_cells', '_cells', '_bounds', '_large')
+
+    def __init__(self, cell_size=128, max_cells=256):
+        self.cell_size = float(cell_size)
+        self.max_cells = max_cells
+        self._cells = {}
+        self._bounds = {}
+        self._large = set()
+
+    def __len__(self):
+        return len(self._bounds)
+
+    def __contains__(self, obj):
+        return obj in self._bounds
+
+    def _get_range(self, bounds):
+        x1, y1, x2, y2 = bounds
+        cs = self.cell_size
+        return int(x1 // cs), int(y1 // cs), int(x2 // cs), int(y2 // cs)
+
+    def insert(self, obj, bounds):
+        '''Insert or update an object in the grid.
+
+        :Parameters:
+            `obj` : object
+                Object to index (must be hashable)
+            `bounds` : tuple
+                Bounding box in (x1, y1, x2, y2) format
+        '''
+        if obj in self._bounds:
+            self.remove(obj)
+        self._bounds[obj] = bounds
+        cx1, cy1, cx2, cy2 = self._get_range(bounds)
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > self.max_cells:
+            self._large.add(obj)
+            return
+        cells = self._cells
+        for cx in xrange(cx1, cx2 + 1):
+            for cy in xrange(cy1, cy2 + 1):
+                key = (cx, cy)
+                if key in cells:
+                    cells[key].add(obj)
+                else:
+                    cells[key] = set([obj])
+
+    def remove(self, obj):
+        '''Remove an object from the grid'''
+        bounds = self._bounds.pop(obj, None)
+        if bounds is None:
+            return
+        if obj in self._large:
+            self._large.remove(obj)
+            return
+        cells = self._cells
+        cx1, cy1, cx2, cy2 = self._get_range(bounds)
+        for cx in xrange(cx1, cx2 + 1):
+            for cy in xrange(cy1, cy2 + 1):
+                key = (cx, cy)
+                cell = cells[key]
+                cell.discard(obj)
+                if not cell:
+                    del cells[key]
+
+    def clear(self):
+        '''Remove all the objects from the grid'''
+        self._cells = {}
+        self._bounds = {}
+        self._large = set()
+
+    def get_bounds(self, obj):
+        '''Return the bounds used to index the object'''
+        return self._bounds.get(obj)
+
+    def query_point(self, x, y):
+        '''Return the list of objects whose bounds contain the point'''
+        cs = self.cell_size
+        cell = self._cells.get((int(x // cs), int(y // cs)))
+        large = self._large
+        if cell is None and not large:
+            return []
+        bounds = self._bounds
+        out = []
+        for objects in (cell or (), large):
+            for obj in objects:
+                x1, y1, x2, y2 = bounds[obj]
+                if x1 <= x <= x2 and y1 <= y <= y2:
+                    out.append(obj)
+        return out
+
+
+class MTSpatialWidget(MTWidget):
+    '''Widget that dispatch touches to his children using a spatial index.
+    The children bounding box are read from the `bbox` property if it exist
+    (MTScatter), otherwise from the position and size of the widget.
+
+    :Parameters:
+        `cell_size` : int, default to 128
+            Size of a cell in the spatial index. Use a value near the size
+            of your children.
+    '''
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('cell_size', 128)
+        super(MTSpatialWidget, self).__init__(**kwargs)
+        self._grid = SpatialGrid(cell_size=kwargs.get('cell_size'))
+        self._zorder = {}
+        self._tokens = {}
+        self._index_dirty = True
+        self._index_time = None
+
+    def _get_child_bounds(self, child):
+        bbox = getattr(child, 'bbox', None)
+        if bbox is not None:
+            (x, y), (w, h) = bbox
+        else:
+            x, y = child.pos
+            w, h = child.size
+        return (x, y, x + w, y + h)
+
+    def _get_child_token(self, child):
+        # matrix and position are replaced, never modified in place:
+        # compare identity only, it's the cheapest way to detect changes.
+        return (child._pos, child._size, getattr(child, '_transform', None))
+
+    def update_index(self, force=False):
+        '''Synchronize the spatial index with the children.
+        This is automatically done once per frame, before dispatching the
+        first touch. Use `force` to reindex every children.'''
+        grid = self._grid
+        tokens = self._tokens
+        zorder = {}
+        for index, child in enumerate(self.children):
+            zorder[child] = index
+            token = self._get_child_token(child)
+            old = tokens.get(child)
+            if not force and old is not None and \
+               old[0] is token[0] and old[1] is token[1] and \
+               old[2] is token[2]:
+                continue
+            tokens[child] = token
+            grid.insert(child, self._get_child_bounds(child))
+        if len(zorder) != len(tokens):
+            for child in tokens.keys():
+                if child not in zorder:
+                    del tokens[child]
+                    grid.remove(child)
+        self._zorder = zorder
+        self._index_dirty = False
+        self._index_time = getClock().get_time()
+
+    def get_children_at(self, x, y):
+        '''Return the children whose bounding box contain the point, from
+        the top to the bottom.'''
+        if self._index_dirty or self._index_time != getClock().get_time():
+            self.update_index()
+        candidates = self._grid.query_point(x, y)
+        if len(candidates) > 1:
+            candidates.sort(key=self._zorder.__getitem__, reverse=True)
+        return candidates
+
+    def add_widget(self, w, front=True):
+        super(MTSpatialWidget, self).add_widget(w, front=front)
+        self._index_dirty = True
+
+    def remove_widget(self, w):
+        super(MTSpatialWidget, self).remove_widget(w)
+        self._index_dirty = True
+
+    def on_touch_down(self, touch):
+        for w in self.get_children_at(touch.x, touch.y):
+            if w.dispatch_event('on_touch_down', touch):
+                return True
+
+    def on_touch_move(self, touch):
+        for w in self.get_children_at(touch.x, touch.y):
+            if w.dispatch_event('on_touch_move', touch):
+                return True
+
+    def on_touch_up(self, touch):
+        for w in self.get_children_at(touch.x, touch.y):
+            if w.dispatch_event('on_touch_up', touch):
+                return True
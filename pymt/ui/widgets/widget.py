@@ -5,12 +5,13 @@ Widget: Base of every widget implementation.
 __all__ = ('getWidgetById', 'MTWidget')
 
 import weakref
+from pymt.base import requestRedraw
 from pymt.event import EventDispatcher
 from pymt.logger import pymt_logger
 from pymt.utils import SafeList
 from pymt.ui.factory import MTWidgetFactory
 from pymt.ui.colors import css_get_style
-from pymt.graphx import set_color, drawCSSRectangle
+from pymt.graphx import set_color, drawCSSRectangle, CSSStyle
 
 _id_2_widget = dict()
 
@@ -134,7 +135,7 @@ class MTWidget(EventDispatcher):
         #: If False, childrens are not drawed. (deprecated)
         self.draw_children        = kwargs.get('draw_children')
         #: Dictionnary that contains the widget style
-        self.style = {}
+        self.style = CSSStyle()
 
         # apply visibility
         self.visible              = kwargs.get('visible')
@@ -204,6 +205,7 @@ class MTWidget(EventDispatcher):
         if self._visible == visible:
             return
         self._visible = visible
+        requestRedraw()
         # register or unregister event if the widget is visible or not
         if visible:
             for ev in MTWidget.visible_events:
@@ -233,7 +235,7 @@ class MTWidget(EventDispatcher):
 
     def reload_css(self):
         '''Called when css want to be reloaded from scratch'''
-        self.style = {}
+        self.style = CSSStyle()
         style = css_get_style(widget=self)
         self.apply_css(style)
         if len(self._inline_style):
@@ -368,6 +370,7 @@ class MTWidget(EventDispatcher):
             w.parent = self
         except Exception:
             pass
+        requestRedraw()
 
     def add_widgets(self, *widgets):
         for w in widgets:
@@ -378,6 +381,7 @@ class MTWidget(EventDispatcher):
         '''Remove a widget from the children list'''
         if w in self.children:
             self.children.remove(w)
+            requestRedraw()
 
     def on_animation_complete(self, *largs):
         pass
@@ -439,36 +443,42 @@ class MTWidget(EventDispatcher):
     def _set_pos(self, x):
         if super(MTWidget, self)._set_pos(x):
             self.dispatch_event('on_move', *self._pos)
+            requestRedraw()
             return True
     pos = property(EventDispatcher._get_pos, _set_pos)
 
     def _set_x(self, x):
         if super(MTWidget, self)._set_x(x):
             self.dispatch_event('on_move', *self._pos)
+            requestRedraw()
             return True
     x = property(EventDispatcher._get_x, _set_x)
 
     def _set_y(self, x):
         if super(MTWidget, self)._set_y(x):
             self.dispatch_event('on_move', *self._pos)
+            requestRedraw()
             return True
     y = property(EventDispatcher._get_y, _set_y)
 
     def _set_size(self, x):
         if super(MTWidget, self)._set_size(x):
             self.dispatch_event('on_resize', *self._size)
+            requestRedraw()
             return True
     size = property(EventDispatcher._get_size, _set_size)
 
     def _set_width(self, x):
         if super(MTWidget, self)._set_width(x):
             self.dispatch_event('on_resize', *self._size)
+            requestRedraw()
             return True
     width = property(EventDispatcher._get_width, _set_width)
 
     def _set_height(self, x):
         if super(MTWidget, self)._set_height(x):
             self.dispatch_event('on_resize', *self._size)
+            requestRedraw()
             return True
     height = property(EventDispatcher._get_height, _set_height)
 
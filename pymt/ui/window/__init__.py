@@ -24,7 +24,8 @@ from pymt.utils import SafeList
 from pymt.logger import pymt_logger
 from pymt.base import getCurrentTouches, setWindow, touch_event_listeners
 from pymt.clock import getClock
-from pymt.graphx import set_color, drawCircle, drawLabel, drawRectangle, drawCSSRectangle
+from pymt.graphx import set_color, drawCircle, drawLabel, drawRectangle, \
+        drawCSSRectangle, CSSStyle
 from pymt.modules import pymt_modules
 from pymt.event import EventDispatcher
 from pymt.ui.colors import css_get_style
@@ -66,6 +67,8 @@ class BaseWindow(EventDispatcher):
 
     __instance = None
     __initialized = False
+    #: True if the window must be drawn on the next frame (render on demand)
+    needs_redraw = True
     _wallpaper = None
     _wallpaper_position = 'norepeat'
 
@@ -112,7 +115,7 @@ class BaseWindow(EventDispatcher):
         setWindow(self)
 
         # apply styles for window
-        self.style = {}
+        self.style = CSSStyle()
         style = css_get_style(widget=self)
         self.apply_css(style)
 
@@ -204,7 +207,7 @@ class BaseWindow(EventDispatcher):
 
     def reload_css(self):
         '''Called when css want to be reloaded from scratch'''
-        self.style = {}
+        self.style = CSSStyle()
         style = css_get_style(widget=self)
         self.apply_css(style)
         if len(self._inline_style):
@@ -260,6 +263,7 @@ class BaseWindow(EventDispatcher):
         '''Add a widget on window'''
         self.children.append(w)
         w.parent = self
+        self.needs_redraw = True
 
     def remove_widget(self, w):
         '''Remove a widget from window'''
@@ -267,6 +271,7 @@ class BaseWindow(EventDispatcher):
             return
         self.children.remove(w)
         w.parent = None
+        self.needs_redraw = True
 
     def clear(self):
         '''Clear the window with background color'''
@@ -394,6 +399,7 @@ class BaseWindow(EventDispatcher):
         glScalef(5000, 5000, 1)
         glTranslatef(-width / 2, -height / 2, -500)
         glMatrixMode(GL_MODELVIEW)
+        self.needs_redraw = True
 
         for w in self.children:
             shw, shh = w.size_hint
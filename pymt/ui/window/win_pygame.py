@@ -128,6 +128,9 @@ class MTWindowPygame(BaseWindow):
 
         for event in pygame.event.get():
 
+            # any event can change the display
+            self.needs_redraw = True
+
             # kill application (SIG_TERM)
             if event.type == pygame.QUIT:
                 evloop.quit = True
@@ -0,0 +1,48 @@
+'''
+Animation
+'''
+
+from init import test, import_pymt_no_window
+
+def unittest_animation_values():
+    import_pymt_no_window()
+    from pymt import MTWidget, Animation
+    w = MTWidget(pos=(3, 0), size=(0, 0))
+    anim = Animation(duration=1, x=100, size=(10, 20),
+                     style={'bg-color': (1., 1., 1., 1.)})
+    anim.set_widget(w)
+    animobj = anim.children[w]
+    animobj.update(0.5)
+    test(w.x == 51)
+    test(tuple(w.size) == (5, 10))
+    animobj.update(1.)
+    test(tuple(w.style['bg-color']) == (1., 1., 1., 1.))
+
+def unittest_animation_style():
+    import_pymt_no_window()
+    from pymt import MTWidget, Animation, CSSStyle
+    w = MTWidget()
+    keys = set(w.style.keys())
+    anim = Animation(duration=1, style={'bg-color': (.5, .5, .5, .5)})
+    anim.set_widget(w)
+    anim.children[w].update(1.)
+    # only the animated key is changed, the style is updated in place
+    test(isinstance(w.style, CSSStyle))
+    test(set(w.style.keys()) == keys)
+    test(tuple(w.style['bg-color']) == (.5, .5, .5, .5))
+
+def unittest_animation_repeat():
+    import_pymt_no_window()
+    import time
+    from pymt import MTWidget, Animation, Repeat, getClock
+    w = MTWidget()
+    w.x = 0
+    repeats = []
+    anim = Repeat(Animation(duration=.01, x=10, type='delta'), times=3)
+    anim.connect('on_repeat', lambda widget, count: repeats.append(count))
+    w.do(anim)
+    for x in xrange(100):
+        time.sleep(.005)
+        getClock().tick()
+    test(repeats == [1, 2, 3])
+    test(w.x == 30)
@@ -0,0 +1,21 @@
+'''
+Glyph atlas packing
+'''
+
+from init import test, import_pymt_no_window
+
+def unittest_shelf_packer():
+    import_pymt_no_window()
+    from pymt.core.text.atlas import ShelfPacker
+    packer = ShelfPacker(32, 32, margin=1)
+    test(packer.insert(10, 10) == (0, 0))
+    test(packer.insert(10, 5) == (11, 0))
+    # not enough place on the first row
+    test(packer.insert(15, 10) == (0, 11))
+    test(packer.insert(40, 1) is None)
+    test(packer.insert(10, 10) == (16, 11))
+    # not enough height for a new row of 10
+    test(packer.insert(10, 10) is None)
+    test(packer.insert(10, 9) == (0, 22))
+    packer.clear()
+    test(packer.insert(10, 10) == (0, 0))
@@ -0,0 +1,84 @@
+'''
+Cache
+'''
+
+from init import test, import_pymt_no_window
+
+def unittest_cache_limit():
+    import_pymt_no_window()
+    from pymt import Cache
+    Cache.register('test.limit', limit=3)
+    for x in xrange(5):
+        Cache.append('test.limit', x, x)
+    test(Cache.get('test.limit', 0) is None)
+    test(Cache.get('test.limit', 1) is None)
+    test(Cache.get('test.limit', 2) == 2)
+    # 2 is now the most recently used, 3 must go
+    Cache.append('test.limit', 5, 5)
+    test(Cache.get('test.limit', 3) is None)
+    test(Cache.get('test.limit', 2) == 2)
+    stats = Cache.get_stats('test.limit')
+    test(stats['count'] == 3)
+    test(stats['evictions'] == 3)
+    test(stats['misses'] == 3)
+
+def unittest_cache_size():
+    import_pymt_no_window()
+    from pymt import Cache
+
+    class Sized(object):
+        cache_size = 100
+
+    Cache.register('test.size', max_size=250)
+    for x in xrange(4):
+        Cache.append('test.size', x, Sized())
+    stats = Cache.get_stats('test.size')
+    test(stats['count'] == 2)
+    test(stats['size'] == 200)
+    Cache.append('test.size', 'big', None, size=1000)
+    test(Cache.get_stats('test.size')['count'] == 1)
+    Cache.remove('test.size')
+    test(Cache.get_stats('test.size')['size'] == 0)
+
+def unittest_cache_timeout():
+    import_pymt_no_window()
+    from pymt import Cache, getClock
+    clock = getClock()
+    last_tick = clock._last_tick
+
+    def records():
+        return len([x for x in Cache._expire_heap if x[2] == 'test.timeout'])
+
+    Cache.register('test.timeout', timeout=1)
+    try:
+        # replacing an entry doesn't add a permanent record in the heap
+        for x in xrange(1000):
+            Cache.append('test.timeout', 'key', x)
+        Cache._purge_by_timeout(0)
+        Cache._purge_by_timeout(0)
+        test(records() == 1)
+        # the entry was used during the last frame, it expires at the next one
+        clock._last_tick += 2
+        Cache._purge_by_timeout(0)
+        test(Cache.get_timestamp('test.timeout', 'key') is not None)
+        clock._last_tick += .1
+        Cache._purge_by_timeout(0)
+        test(Cache.get_timestamp('test.timeout', 'key') is None)
+        test(records() == 0)
+
+        # an accessed entry is scheduled again, only once
+        Cache.append('test.timeout', 'key', 1)
+        clock._last_tick += .5
+        Cache.get('test.timeout', 'key')
+        clock._last_tick += .8
+        Cache._purge_by_timeout(0)
+        test(Cache.get_timestamp('test.timeout', 'key') is not None)
+        test(records() == 1)
+        clock._last_tick += 1.5
+        Cache._purge_by_timeout(0)
+        test(Cache.get_timestamp('test.timeout', 'key') is None)
+        test(records() == 0)
+        test(Cache.get_stats('test.timeout')['expired'] == 2)
+    finally:
+        clock._last_tick = last_tick
+        Cache._last_purge = None
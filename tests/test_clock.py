@@ -0,0 +1,57 @@
+'''
+Clock
+'''
+
+from init import test, import_pymt_no_window
+
+def unittest_clock_schedule():
+    import_pymt_no_window()
+    from pymt import Clock
+
+    calls = []
+    def callback_once(dt):
+        calls.append('once')
+    def callback_interval(dt):
+        calls.append('interval')
+    def callback_stop(dt):
+        calls.append('stop')
+        return False
+
+    clock = Clock()
+    clock.schedule_once(callback_once)
+    event = clock.schedule_interval(callback_interval, 0)
+    clock.schedule_interval(callback_stop, 0)
+    clock.tick()
+    test(sorted(calls) == ['interval', 'once', 'stop'])
+
+    del calls[:]
+    clock.tick()
+    test(calls == ['interval'])
+
+    # cancel with the handle
+    del calls[:]
+    event.cancel()
+    clock.tick()
+    test(calls == [])
+
+    # cancel with the callback
+    clock.schedule_interval(callback_interval, 0)
+    clock.unschedule(callback_interval)
+    clock.tick()
+    test(calls == [])
+
+def unittest_clock_profile():
+    import_pymt_no_window()
+    from pymt import Clock
+
+    def callback(dt):
+        pass
+
+    clock = Clock()
+    clock.schedule_interval(callback, 0)
+    clock.start_profile()
+    clock.tick()
+    clock.tick()
+    profile = clock.stop_profile()
+    test(len(profile) == 1)
+    test(profile.values()[0][0] == 2)
@@ -45,3 +45,53 @@ def unittest_css_multiclass():
     ''')
     l = MTLabel(label = 'test', cls=('test1', 'test2'))
     test(l.style['font-size'] == 24)
+
+def unittest_css_signature():
+    import_pymt_no_window()
+    from pymt import MTWidget, css_add_sheet
+    css_add_sheet('''
+    .signature {
+        font-size: 12;
+    }
+    ''')
+    w = MTWidget(cls='signature')
+    test(w.style['font-size'] == 12)
+    # the same signature share the resolved style
+    x = MTWidget(cls=['signature'])
+    test(x.style == w.style)
+    # new rules invalidate the resolved styles
+    css_add_sheet('''
+    widget.signature {
+        font-size: 16;
+    }
+    #signature {
+        font-size: 20;
+    }
+    ''')
+    w = MTWidget(cls='signature')
+    test(w.style['font-size'] == 16)
+    w = MTWidget(cls='signature', id='signature')
+    test(w.style['font-size'] == 20)
+
+def unittest_css_rectangle_cache():
+    import_pymt_no_window()
+    from pymt import MTWidget, Cache, drawCSSRectangle
+    w = MTWidget(style={'bg-color': (1, 0, 0, 1)})
+    Cache.remove('pymt.cssrect')
+    hits = Cache.get_stats('pymt.cssrect')['hits']
+    # a moving widget reuse the same rectangle
+    for x in xrange(10):
+        drawCSSRectangle(pos=(x, x), size=w.size, style=w.style)
+    test(len(Cache._categories['pymt.cssrect']) == 1)
+    test(Cache.get_stats('pymt.cssrect')['hits'] == hits + 9)
+    test(len(w.style.fingerprints) == 1)
+    # the fingerprints are forgotten when the style change
+    w.style['border-radius'] = 5
+    test(len(w.style.fingerprints) == 0)
+    drawCSSRectangle(pos=w.pos, size=w.size, style=w.style)
+    test(len(Cache._categories['pymt.cssrect']) == 2)
+    drawCSSRectangle(pos=w.pos, size=w.size, style=w.style, state='down')
+    test(len(w.style.fingerprints) == 2)
+    w.reload_css()
+    test(len(w.style.fingerprints) == 0)
+    test(w.style['bg-color'] == (1, 0, 0, 1))
@@ -0,0 +1,80 @@
+'''
+Evdev events decoding and multitouch state
+'''
+
+from init import test, import_pymt_no_window
+
+EV_SYN, EV_KEY, EV_ABS = 0, 1, 3
+SYN_REPORT, SYN_MT_REPORT = 0, 2
+SLOT, X, Y, PRESSURE, TRACKING_ID = 0x2f, 0x35, 0x36, 0x3a, 0x39
+
+def _capture(events):
+    import struct
+    return ''.join([struct.pack('LLHHi', 0, 0, ev_type, code, value)
+                    for ev_type, code, value in events])
+
+def _abs(*values):
+    events = []
+    for code, value in zip(values[::2], values[1::2]):
+        events.append((EV_ABS, code, value))
+    return events
+
+_report = [(EV_SYN, SYN_REPORT, 0)]
+_mt_report = [(EV_SYN, SYN_MT_REPORT, 0)]
+
+# protocol B: two contacts, one moving then released
+_protocol_b = (
+    _abs(SLOT, 0, TRACKING_ID, 10, X, 100, Y, 200) +
+    _abs(SLOT, 1, TRACKING_ID, 11, X, 300, Y, 400) + _report +
+    [(EV_KEY, 330, 1)] +
+    _abs(SLOT, 0, X, 150) + _report +
+    _abs(SLOT, 1, TRACKING_ID, -1) + _report +
+    _abs(SLOT, 0, TRACKING_ID, -1) + _report)
+
+# protocol A: same session, the contacts are sent at each report
+_protocol_a = (
+    _abs(TRACKING_ID, 10, X, 100, Y, 200) + _mt_report +
+    _abs(TRACKING_ID, 11, X, 300, Y, 400) + _mt_report + _report +
+    _abs(TRACKING_ID, 10, X, 150, Y, 200) + _mt_report +
+    _abs(TRACKING_ID, 11, X, 300, Y, 400) + _mt_report + _report +
+    _abs(TRACKING_ID, 10, X, 150, Y, 200) + _mt_report + _report +
+    _mt_report + _report)
+
+def unittest_evdev_state():
+    import_pymt_no_window()
+    from pymt.input.evdev import MultitouchState, decode_input_events
+    ranges = {'position_x': (0, 1000), 'position_y': (0, 1000)}
+    for name, events in (('B', _protocol_b), ('A', _protocol_a)):
+        state = MultitouchState(ranges=ranges)
+        snapshots = state.feed(decode_input_events(_capture(events)))
+        test(state.protocol == name)
+        test([[c.id for c in s] for s in snapshots] ==
+             [[10, 11], [10, 11], [10], []])
+        first = snapshots[0][1]
+        test((round(first.x, 3), round(first.y, 3)) == (.3, .6))
+        test(first.pressure is None)
+        test(round(snapshots[1][0].x, 3) == .15)
+
+def unittest_evdev_hidinput_replay():
+    import_pymt_no_window()
+    import os, tempfile
+    from pymt.input.providers.hidinput import HIDInputTouchProvider
+    for events in (_protocol_b, _protocol_a):
+        filename = tempfile.mktemp('.ev')
+        f = open(filename, 'wb')
+        f.write(_capture(events + _abs(SLOT, 0, PRESSURE, 10)))
+        f.close()
+        try:
+            provider = HIDInputTouchProvider('test',
+                filename + ',max_position_x=1000,max_position_y=1000')
+            provider.start()
+            provider.thread.join(5)
+            dispatched = []
+            provider.update(lambda t, touch: dispatched.append(
+                (t, touch.id, round(touch.sx, 3))))
+            test(dispatched == [('down', 10, .1), ('down', 11, .3),
+                                ('move', 10, .15), ('up', 11, .3),
+                                ('up', 10, .15)])
+            test(not provider.touches)
+        finally:
+            os.unlink(filename)
@@ -71,3 +71,279 @@ def unittest_dispatcher():
     test('nohandler' and not testpass)
 
 
+
+def _create_input_loop(coalescing, max_events=0):
+    # event loop recording the dispatched events, with a provider sending
+    # the events of provider.events at the next frame
+    from pymt import pymt_providers
+    from pymt.base import TouchEventLoop
+
+    class FakeProvider(object):
+        def __init__(self):
+            self.events = []
+        def update(self, dispatch_fn):
+            for event, touch in self.events:
+                dispatch_fn(event, touch)
+            self.events = []
+
+    class RecordEventLoop(TouchEventLoop):
+        def __init__(self):
+            super(RecordEventLoop, self).__init__()
+            self.dispatched = []
+        def post_dispatch_input(self, event, touch):
+            self.dispatched.append((event, touch))
+
+    evloop = RecordEventLoop()
+    evloop.input_coalescing = coalescing
+    evloop.input_max_events = max_events
+    evloop.provider = FakeProvider()
+    pymt_providers.append(evloop.provider)
+    return evloop
+
+def _create_touch_class():
+    # touch created and moved with a (sx, sy) position
+    from pymt.input.touch import Touch
+    class FakeTouch(Touch):
+        def depack(self, args):
+            self.sx, self.sy = args
+            super(FakeTouch, self).depack(args)
+    return FakeTouch
+
+def _frame(evloop, events):
+    evloop.provider.events = events
+    evloop.dispatched = []
+    evloop.dispatch_input()
+    return evloop.dispatched
+
+def unittest_input_coalescing_last():
+    import_pymt_no_window()
+    from pymt import pymt_providers
+    evloop = _create_input_loop('last')
+    try:
+        t1, t2 = object(), object()
+        events = _frame(evloop, [('down', t1), ('move', t1), ('down', t2),
+                                 ('move', t1), ('move', t2), ('move', t1),
+                                 ('up', t2)])
+        # only the last move of each touch is kept, at his last position
+        test(events == [('down', t1), ('down', t2), ('move', t2),
+                        ('move', t1), ('up', t2)])
+        test(evloop.input_stats == {'received': 7, 'coalesced': 2,
+                                    'dispatched': 5, 'delayed': 0})
+        test(_frame(evloop, []) == [])
+        test(evloop.input_stats['received'] == 0)
+        test(evloop.input_stats_total['coalesced'] == 2)
+    finally:
+        pymt_providers.remove(evloop.provider)
+
+def unittest_input_coalescing_all():
+    import_pymt_no_window()
+    from pymt import pymt_providers
+    evloop = _create_input_loop('all')
+    try:
+        t1 = _create_touch_class()(None, 1, (0, 0))
+        sent = [('down', t1), ('move', t1), ('move', t1), ('up', t1)]
+        test(_frame(evloop, sent) == sent)
+        test(evloop.input_stats == {'received': 4, 'coalesced': 0,
+                                    'dispatched': 4, 'delayed': 0})
+    finally:
+        pymt_providers.remove(evloop.provider)
+
+def unittest_input_coalescing_all_position():
+    import_pymt_no_window()
+    from pymt import pymt_providers
+    from pymt.base import TouchEventLoop
+    FakeTouch = _create_touch_class()
+
+    class MovingProvider(object):
+        # update the touch in place before each event, like the providers
+        def __init__(self):
+            self.touch = None
+            self.positions = []
+        def update(self, dispatch_fn):
+            for pos in self.positions:
+                if self.touch is None:
+                    self.touch = FakeTouch(None, 1, pos)
+                    dispatch_fn('down', self.touch)
+                else:
+                    self.touch.move(pos)
+                    dispatch_fn('move', self.touch)
+            self.positions = []
+
+    class RecordEventLoop(TouchEventLoop):
+        def post_dispatch_input(self, event, touch):
+            # scale like the window, the previous position is in screen
+            touch.scale_for_screen(100, 100)
+            self.dispatched.append((event, touch.sx, touch.dsxpos,
+                                    touch.x, touch.dxpos))
+
+    evloop = RecordEventLoop()
+    evloop.input_coalescing = 'all'
+    evloop.input_max_events = 3
+    evloop.dispatched = []
+    provider = MovingProvider()
+    pymt_providers.append(provider)
+    try:
+        provider.positions = [(0, 0), (.1, 0), (.2, 0), (.3, 0)]
+        evloop.dispatch_input()
+        test(evloop.dispatched == [('down', 0, 0, 0, 0),
+                                   ('move', .1, 0, 10, 0),
+                                   ('move', .2, .1, 20, 10)])
+        # the touch is at his last position for the provider
+        test(provider.touch.sx == .3)
+
+        evloop.dispatched = []
+        provider.positions = [(.4, 0)]
+        evloop.dispatch_input()
+        test(evloop.dispatched == [('move', .3, .2, 30, 20),
+                                   ('move', .4, .3, 40, 30)])
+    finally:
+        pymt_providers.remove(provider)
+
+def unittest_input_max_events():
+    import_pymt_no_window()
+    from pymt import pymt_providers
+    evloop = _create_input_loop('last', max_events=2)
+    try:
+        t1, t2 = object(), object()
+        events = _frame(evloop, [('down', t1), ('move', t1), ('move', t1),
+                                 ('down', t2)])
+        test(events == [('down', t1), ('move', t1)])
+        test(evloop.input_stats == {'received': 4, 'coalesced': 1,
+                                    'dispatched': 2, 'delayed': 1})
+
+        # the delayed events are dispatched first at the next frame
+        events = _frame(evloop, [('move', t2), ('move', t2), ('move', t1)])
+        test(events == [('down', t2), ('move', t2)])
+        test(evloop.input_stats == {'received': 3, 'coalesced': 1,
+                                    'dispatched': 2, 'delayed': 1})
+
+        # a delayed event is still coalesced with the new ones
+        events = _frame(evloop, [('move', t1)])
+        test(events == [('move', t1)])
+        test(evloop.input_stats == {'received': 1, 'coalesced': 1,
+                                    'dispatched': 1, 'delayed': 0})
+        test(evloop.input_stats_total == {'received': 8, 'coalesced': 3,
+                                          'dispatched': 5})
+    finally:
+        pymt_providers.remove(evloop.provider)
+
+def unittest_render_on_demand():
+    import_pymt_no_window()
+    from pymt import EventDispatcher, getClock, setWindow, getWindow, \
+            pymt_event_listeners
+    from pymt.base import TouchEventLoop
+
+    class FakeWindow(EventDispatcher):
+        needs_redraw = True
+        def __init__(self):
+            super(FakeWindow, self).__init__()
+            self.register_event_type('on_update')
+            self.register_event_type('on_draw')
+            self.register_event_type('on_flip')
+            self.draws = 0
+        def dispatch_events(self):
+            pass
+        def on_update(self):
+            pass
+        def on_draw(self):
+            self.draws += 1
+        def on_flip(self):
+            pass
+
+    old_window = getWindow()
+    window = FakeWindow()
+    setWindow(window)
+    pymt_event_listeners.append(window)
+    try:
+        evloop = TouchEventLoop()
+        evloop.render_on_demand = True
+        evloop.max_fps = 1000
+        evloop.idle()
+        test(window.draws == 1)
+        for x in xrange(3):
+            evloop.idle()
+        test(window.draws == 1)
+        test(evloop.frames_skipped == 3)
+
+        # a clock callback mark the frame as dirty
+        def callback(dt):
+            pass
+        getClock().schedule_once(callback, 0)
+        evloop.idle()
+        test(getClock().get_last_calls() == 1)
+        test(window.draws == 2)
+
+        window.needs_redraw = True
+        evloop.idle()
+        evloop.idle()
+        test(window.draws == 3)
+        test(evloop.frames_drawn == 3)
+    finally:
+        pymt_event_listeners.remove(window)
+        setWindow(old_window)
+
+def unittest_render_on_demand_kinetic():
+    import_pymt_no_window()
+    from pymt import EventDispatcher, MTKinetic, MTScatterWidget, \
+            setWindow, getWindow, getCurrentTouches, pymt_event_listeners
+    from pymt.base import TouchEventLoop
+    from pymt.ui.widgets.kinetic import KineticTouch
+
+    class FakeWindow(EventDispatcher):
+        needs_redraw = True
+        def __init__(self):
+            super(FakeWindow, self).__init__()
+            for event in ('on_update', 'on_draw', 'on_flip'):
+                self.register_event_type(event)
+            self.children = []
+            self.draws = 0
+        def dispatch_events(self):
+            pass
+        def on_update(self):
+            pass
+        def on_draw(self):
+            self.draws += 1
+            for w in self.children:
+                w.dispatch_event('on_draw')
+        def on_flip(self):
+            pass
+
+    old_window = getWindow()
+    window = FakeWindow()
+    setWindow(window)
+    pymt_event_listeners.append(window)
+    try:
+        kinetic = MTKinetic(friction=1000)
+        window.children.append(kinetic)
+        evloop = TouchEventLoop()
+        evloop.render_on_demand = True
+        evloop.max_fps = 1000
+        evloop.idle()
+        evloop.idle()
+        test(window.draws == 1)
+
+        # a released touch is spinning, the frames are drawn until it stops
+        ktouch = KineticTouch(None)
+        ktouch.mode = 'spinning'
+        ktouch.X = 40
+        kinetic.touch[ktouch.uid] = ktouch
+        getCurrentTouches().append(ktouch)
+        window.needs_redraw = True
+        for x in xrange(1000):
+            if not kinetic.touch:
+                break
+            evloop.idle()
+        test(not kinetic.touch)
+        test(evloop.frames_skipped == 1)
+        evloop.idle()
+        evloop.idle()
+        test(evloop.frames_skipped == 2)
+
+        # a scatter moved without touch is drawn
+        scatter = MTScatterWidget()
+        window.needs_redraw = False
+        scatter.rotation = 45
+        test(window.needs_redraw)
+    finally:
+        pymt_event_listeners.remove(window)
+        setWindow(old_window)
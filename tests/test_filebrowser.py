@@ -0,0 +1,48 @@
+'''
+File browser
+'''
+
+from init import test, import_pymt_no_window
+
+def _scan(path, **kwargs):
+    import time
+    from pymt.ui.widgets.composed.filebrowser import DirectoryScanner
+    kwargs.setdefault('batch_size', 2)
+    scanner = DirectoryScanner(path, **kwargs)
+    entries = []
+    while True:
+        done = scanner.done
+        for batch in scanner.pop_batches():
+            test(len(batch) <= scanner.batch_size)
+            entries.extend(batch)
+        if done:
+            break
+        time.sleep(0.01)
+    return sorted(entries)
+
+def unittest_filebrowser_scanner():
+    import_pymt_no_window()
+    import os, tempfile, shutil
+    from pymt.cache import Cache
+    path = tempfile.mkdtemp()
+    try:
+        for name in ('a.png', 'b.jpg', 'c.txt', '.hidden'):
+            open(os.path.join(path, name), 'w').close()
+        os.mkdir(os.path.join(path, 'dir'))
+
+        test(_scan(path) == [('a.png', False), ('b.jpg', False),
+                             ('c.txt', False), ('dir', True)])
+        test(_scan(path, show_hidden=True)[0] == ('.hidden', False))
+        # directories are not filtered
+        test(_scan(path, filters=['.*\.png', '.*\.jpg']) ==
+             [('a.png', False), ('b.jpg', False), ('dir', True)])
+
+        # the listing is in cache, until the directory change
+        mtime, entries = Cache.get('pymt.filebrowser', path)
+        test(len(entries) == 5)
+        Cache.append('pymt.filebrowser', path, (mtime, [('cached', False)]))
+        test(_scan(path) == [('cached', False)])
+        os.utime(path, (mtime + 10, mtime + 10))
+        test(len(_scan(path)) == 4)
+    finally:
+        shutil.rmtree(path)
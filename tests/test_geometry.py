@@ -0,0 +1,93 @@
+'''
+Geometry of the graphx shapes
+'''
+
+from init import test, import_pymt_no_window
+
+def _rounded_rectangle(x, y, w, h, radius, precision, corners):
+    # reference: the vertices of the original drawing loops
+    import math
+    if w < radius * 2:
+        radius = w / 2
+    if h < radius * 2:
+        radius = h / 2
+    out = []
+    def arc(cx, cy, start, end):
+        t = start
+        while t < end:
+            out.append((cx + math.cos(t) * radius, cy + math.sin(t) * radius))
+            t += precision
+    if corners[1]:
+        out.extend([(x + radius, y), (x + w - radius, y)])
+        arc(x + w - radius, y + radius, math.pi * 1.5, math.pi * 2)
+    else:
+        out.append((x + w, y))
+    if corners[2]:
+        out.extend([(x + w, y + radius), (x + w, y + h - radius)])
+        arc(x + w - radius, y + h - radius, 0, math.pi * .5)
+    else:
+        out.append((x + w, y + h))
+    if corners[3]:
+        out.extend([(x + w - radius, y + h), (x + radius, y + h)])
+        arc(x + radius, y + h - radius, math.pi * .5, math.pi)
+    else:
+        out.append((x, y + h))
+    if corners[0]:
+        out.extend([(x, y + h - radius), (x, y + radius)])
+        arc(x + radius, y + radius, math.pi, math.pi * 1.5)
+    else:
+        out.append((x, y))
+    return out
+
+def unittest_geometry_rounded_rectangle():
+    import_pymt_no_window()
+    import numpy
+    from pymt.graphx.geometry import get_rounded_rectangle_vertices, \
+            get_rounded_rectangle_alpha_vertices
+    for args in (((10, 20), (100, 50), 5, .5, (1, 1, 1, 1)),
+                 ((0, 0), (30, 8), 10, .1, (1, 1, 1, 1)),
+                 ((-5, 3), (60, 60), 12, .3, (0, 1, 0, 1))):
+        pos, size, radius, precision, corners = args
+        vertices = get_rounded_rectangle_vertices(*args)
+        ref = _rounded_rectangle(pos[0], pos[1], size[0], size[1],
+                                 radius, precision, corners)
+        test(vertices.dtype == numpy.float32)
+        test(vertices.shape == (len(ref), 2))
+        test(numpy.allclose(vertices, ref, atol=1e-3))
+
+    vertices, colors = get_rounded_rectangle_alpha_vertices(
+        (0, 0), (100, 50), 5, (.1, .2, .3, .4), .5)
+    test(len(vertices) == len(colors))
+    test(numpy.allclose(vertices[0], (50, 25)))
+    test(numpy.allclose(colors[0], (1, 1, 1, .25)))
+    test(numpy.allclose(colors[1], (1, 1, 1, .1)))
+    test(numpy.allclose(colors[2], (1, 1, 1, .2)))
+    test(numpy.allclose(vertices[-1], vertices[1]))
+
+def unittest_geometry_disk():
+    import_pymt_no_window()
+    import numpy
+    from pymt import Cache
+    from pymt.graphx.geometry import get_disk_vertices, \
+            get_partial_disk_vertices, get_stippled_disk_vertices
+    vertices = get_disk_vertices((10, 10), 5, 20)
+    test(vertices.shape == (66, 2))
+    distances = numpy.hypot(vertices[:, 0] - 10, vertices[:, 1] - 10)
+    test(numpy.allclose(distances[0::2], 20, atol=1e-3))
+    test(numpy.allclose(distances[1::2], 5, atol=1e-3))
+
+    # angles are clockwise from the y axis, like gluPartialDisk
+    vertices = get_partial_disk_vertices((0, 0), 0, 1, 2, 0, 90)
+    test(numpy.allclose(vertices[0::2], ((0, 1), (.7071, .7071), (1, 0)),
+                        atol=1e-3))
+
+    vertices = get_stippled_disk_vertices((0, 0), 1, 2, segments=4)
+    test(len(vertices) == 4 * 32 * 4)
+    angles = numpy.degrees(numpy.arctan2(vertices[:, 0], vertices[:, 1])) % 360
+    # the gaps between the segments are empty
+    test(not [a for a in angles if 45.01 < a < 89.99 or 135.01 < a < 179.99])
+
+    # the unit geometry is generated once
+    count = len(Cache._categories['pymt.geometry'])
+    get_disk_vertices((50, 50), 0, 100)
+    test(len(Cache._categories['pymt.geometry']) == count)
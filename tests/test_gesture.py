@@ -0,0 +1,54 @@
+'''
+Gesture database
+'''
+
+from init import test, import_pymt_no_window
+
+def _create_gestures():
+    from pymt import Gesture
+    import random
+    random.seed(0)
+    gestures = []
+    for i in xrange(50):
+        g = Gesture()
+        for stroke in xrange(1 + i % 2):
+            g.add_stroke(point_list=[(random.random() * 100,
+                random.random() * 50) for x in xrange(10 + i % 3)])
+        g.normalize()
+        gestures.append(g)
+    return gestures
+
+def unittest_gesture_scores():
+    import_pymt_no_window()
+    from pymt import GestureDatabase
+    gestures = _create_gestures()
+    gdb = GestureDatabase()
+    for g in gestures[10:]:
+        gdb.add_gesture(g)
+    for candidate in gestures[:10]:
+        for rotation_invariant in (True, False):
+            scores = dict(gdb.get_scores(candidate, rotation_invariant))
+            for index, g in enumerate(gdb.db):
+                expected = g.get_score(candidate, rotation_invariant)
+                test(abs(scores.get(index, -1) - expected) < 1e-9)
+
+def unittest_gesture_find():
+    import_pymt_no_window()
+    from pymt import GestureDatabase
+    gestures = _create_gestures()
+    gdb = GestureDatabase()
+    for g in gestures:
+        gdb.add_gesture(g)
+    score, best = gdb.find(gestures[7])
+    test(best is gestures[7])
+    test(abs(score - 1.) < 1e-9)
+
+    # the index must follow the database
+    del gdb.db[7]
+    result = gdb.find(gestures[7], minscore=0.99)
+    test(result is None or result[1] is not gestures[7])
+
+    # pickled gestures are still working
+    data = gdb.gesture_to_str(gestures[3])
+    score, best = gdb.find(gdb.str_to_gesture(data))
+    test(best is gestures[3])
@@ -0,0 +1,113 @@
+'''
+Texture atlas for small images
+'''
+
+from init import test, import_pymt_no_window
+
+def _create_atlas(**kwargs):
+    # atlas without OpenGL: the pages are not real textures
+    from pymt.core.image.atlas import TextureAtlas, AtlasPacker, _AtlasPage
+    class TestAtlas(TextureAtlas):
+        def _create_page(self):
+            return _AtlasPage(None, AtlasPacker(self.page_size, self.page_size))
+        def _upload(self, page, data, x, y):
+            self.uploads.append((page, data, x, y))
+        def _get_region(self, page, x, y, width, height):
+            return (page, x, y, width, height)
+    atlas = TestAtlas(**kwargs)
+    atlas.uploads = []
+    return atlas
+
+def unittest_atlas_packer():
+    import_pymt_no_window()
+    from pymt.core.image.atlas import AtlasPacker
+    packer = AtlasPacker(64, 64)
+    test(packer.insert(32, 16) == (0, 0))
+    test(packer.insert(32, 32) == (0, 16))
+    # the smallest shelf is used first
+    test(packer.insert(16, 16) == (32, 0))
+    test(packer.insert(16, 32) == (32, 16))
+    test(packer.insert(16, 16) == (48, 0))
+    test(packer.insert(65, 1) is None)
+    test(packer.insert(64, 17) is None)
+    test(packer.insert(64, 16) == (0, 48))
+    test(packer.efficiency == 3584 / 4096.)
+    packer.clear()
+    test(packer.used == 0)
+    test(packer.insert(64, 64) == (0, 0))
+
+def unittest_atlas_add():
+    import_pymt_no_window()
+    from pymt.core.image import ImageData
+    atlas = _create_atlas(page_size=64, max_pages=2, max_image_size=16)
+    test(not atlas.accept(ImageData(17, 4, 'RGBA', '\x00' * 17 * 4 * 4)))
+    test(atlas.add(1, ImageData(17, 4, 'RGBA', '\x00' * 17 * 4 * 4)) is None)
+    test(atlas.get(1) is None)
+
+    # the image is uploaded with a border of 1 pixel
+    data = ImageData(2, 1, 'RGB', '\x01\x02\x03\x04\x05\x06')
+    page, x, y, w, h = atlas.add(1, data)
+    test((x, y, w, h) == (1, 1, 2, 1))
+    upload = atlas.uploads[-1][1]
+    test((upload.width, upload.height) == (4, 3))
+    test(upload.data == '\x01\x02\x03\x01\x02\x03\x04\x05\x06\x04\x05\x06' * 3)
+    test(atlas.get(1) == (page, x, y, w, h))
+    test(atlas.get_stats()['images'] == 1)
+
+def unittest_atlas_eviction():
+    import_pymt_no_window()
+    from pymt.core.image import ImageData
+    atlas = _create_atlas(page_size=64, max_pages=2, max_image_size=30)
+    data = ImageData(30, 30, 'RGBA', '\x00' * 30 * 30 * 4)
+    # 4 images per page
+    for key in xrange(8):
+        atlas.add(key, data)
+    pages = [atlas.get(key)[0] for key in xrange(8)]
+    test(pages[0] == pages[3] and pages[4] == pages[7])
+    test(pages[0] != pages[4])
+    test(atlas.get_stats()['pages'] == 2)
+
+    # the first page is used, the second one is cleared
+    atlas.get(0)
+    atlas.add(8, data)
+    test(atlas.get(8)[0] == pages[4])
+    test(atlas.get(4) is None)
+    test(atlas.get(0)[0] == pages[0])
+    stats = atlas.get_stats()
+    test(stats['pages'] == 2 and stats['images'] == 5)
+    test(stats['evictions'] == 1)
+
+def unittest_atlas_opt_in():
+    import_pymt_no_window()
+    import pymt.core.image
+    from pymt.core.image import Image, ImageData
+    from pymt.thumbnail import ImageThumbnail
+    created = []
+    class TestTexture(object):
+        @staticmethod
+        def create_from_data(data, **kwargs):
+            created.append(data)
+            return TestTexture()
+    old_atlas = pymt.core.image.image_atlas
+    old_texture = pymt.core.image.Texture
+    atlas = _create_atlas(page_size=64, max_pages=1, max_image_size=16)
+    pymt.core.image.image_atlas = atlas
+    pymt.core.image.Texture = TestTexture
+    try:
+        # the images are not in the atlas by default
+        data = ImageData(8, 8, 'RGBA', '\x00' * 8 * 8 * 4)
+        image = Image(ImageThumbnail('image', data))
+        test(isinstance(image.texture, TestTexture))
+        test(len(created) == 1)
+        test(not atlas.uploads)
+
+        # icons are stored in the atlas
+        data = ImageData(8, 8, 'RGBA', '\x00' * 8 * 8 * 4)
+        icon = Image(ImageThumbnail('icon', data, atlas=True))
+        test(icon.texture[0] is atlas.pages[0])
+        test(len(created) == 1)
+        test(len(atlas.uploads) == 1)
+        test(Image(icon).texture == icon.texture)
+    finally:
+        pymt.core.image.image_atlas = old_atlas
+        pymt.core.image.Texture = old_texture
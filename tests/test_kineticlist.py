@@ -0,0 +1,62 @@
+'''
+Kinetic list
+'''
+
+from init import test, import_pymt_no_window
+
+def _create_list(count, **kwargs):
+    from pymt import MTKineticList, MTKineticListModel, MTKineticObject
+    created = []
+    def factory(item):
+        widget = MTKineticObject(deletable=False, size=(100, 30))
+        widget.item = item
+        created.append(widget)
+        return widget
+    def updater(widget, item):
+        widget.item = item
+        return True
+    model = MTKineticListModel(data=range(count), factory=factory,
+                               updater=updater, item_size=(100, 30))
+    kwargs.setdefault('virtual_margin', 0)
+    klist = MTKineticList(model=model, size=(200, 300), deletable=False,
+                          searchable=False, title=None, **kwargs)
+    return klist, model, created
+
+def unittest_kineticlist_virtual():
+    import_pymt_no_window()
+    klist, model, created = _create_list(20000)
+    klist.do_layout()
+    # 30 + 4 padding per row, only the rows in the view are created
+    test(klist._last_content_size == 20000 * 34)
+    items = sorted(w.item for w in klist.children)
+    test(items == range(0, 9))
+    test(len(created) == 9)
+
+    # scroll: the widgets are reused for the new items
+    klist.yoffset = -34 * 1000
+    klist.do_layout()
+    items = sorted(w.item for w in klist.children)
+    test(items == range(999, 1009))
+    test(len(created) == 10)
+    for w in klist.children:
+        test(w.ky == klist.y + klist.yoffset + 4 + w.item * 34)
+
+    # change of model data
+    model.data = range(5)
+    klist.do_layout()
+    test(klist._last_content_size == 5 * 34)
+    klist.yoffset = 0
+    klist.do_layout()
+    test(sorted(w.item for w in klist.children) == range(5))
+    test(len(created) == 10)
+
+def unittest_kineticlist_virtual_grid():
+    import_pymt_no_window()
+    klist, model, created = _create_list(100, w_limit=3, virtual_margin=34)
+    klist.do_layout()
+    # 34 rows, 9 in the view + 1 in the margin
+    test(klist._last_content_size == 34 * 34)
+    test(sorted(w.item for w in klist.children) == range(0, 30))
+    # all the widgets of a row are on the same line
+    for w in klist.children:
+        test(w.ky == klist.y + 4 + (w.item // 3) * 34)
@@ -0,0 +1,41 @@
+'''
+Lazy import of the subsystems
+'''
+
+from init import test, import_pymt_no_window
+
+def unittest_lazy_import():
+    import_pymt_no_window()
+    import sys
+    import pymt
+    # the widgets are imported on first access
+    test('pymt.ui.widgets.coverflow' not in sys.modules)
+    cls = pymt.MTCoverFlow
+    test('pymt.ui.widgets.coverflow' in sys.modules)
+    from pymt.ui.widgets.coverflow import MTCoverFlow
+    test(cls is MTCoverFlow)
+    test(pymt.ui.widgets.MTCoverFlow is MTCoverFlow)
+    from pymt.ui.factory import MTWidgetFactory
+    test(MTWidgetFactory.get('MTSpeechBubble').__name__ == 'MTSpeechBubble')
+    try:
+        pymt.MTUnknownWidget
+        test(False)
+    except AttributeError:
+        test(True)
+
+def unittest_lazy_registry():
+    import_pymt_no_window()
+    import sys
+    from pymt.lazy import lazy_registry, LazyModule
+    registered = set()
+    for names in lazy_registry.itervalues():
+        registered.update(names)
+    for module, names in lazy_registry.iteritems():
+        __import__(module)
+        module = sys.modules[module]
+        # all the names exist
+        test(not [x for x in names if not hasattr(module, x)])
+        # all the public names are registered
+        if not isinstance(module, LazyModule):
+            test(not [x for x in getattr(module, '__all__', ())
+                      if x not in registered])
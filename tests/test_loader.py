@@ -0,0 +1,71 @@
+'''
+Asynchronous loader
+'''
+
+from init import test, import_pymt_no_window
+
+def unittest_loader_priority():
+    import_pymt_no_window()
+    from pymt.loader import LoaderClock
+    loader = LoaderClock()
+    def load(filename):
+        return filename
+    def on_load(filename, data):
+        pass
+    for filename, priority in (('a', 0), ('b', 5), ('c', 0), ('d', 1)):
+        loader.load(filename, load, on_load, priority=priority)
+    # highest priority first, then the most recent
+    order = [loader._pop_request().filename for x in xrange(4)]
+    test(order == ['b', 'd', 'c', 'a'])
+    test(loader._pop_request() is None)
+
+def unittest_loader_prioritize():
+    import_pymt_no_window()
+    from pymt.loader import LoaderClock
+    loader = LoaderClock()
+    def load(filename):
+        return None
+    images = [loader.image('%d.png' % x, load) for x in xrange(3)]
+    loader.prioritize('0.png', 10)
+    test(loader._pop_request().filename == '0.png')
+    test(loader._pop_request().filename == '2.png')
+    test(loader._pop_request().filename == '1.png')
+    test(loader._pop_request() is None)
+
+def unittest_loader_cancel():
+    import_pymt_no_window()
+    from pymt.loader import LoaderClock
+    loader = LoaderClock()
+    def load(filename):
+        return None
+    image = loader.image('cancel.png', load)
+    image2 = loader.image('cancel.png', load)
+    request = loader._requests['cancel.png']
+    del image
+    test(not request.cancelled)
+    # nobody is waiting for the image anymore
+    del image2
+    test(request.cancelled)
+    test(loader._pop_request() is None)
+
+def unittest_loader_budget():
+    import_pymt_no_window()
+    from pymt.loader import LoaderClock
+    loader = LoaderClock()
+    loader.time_budget = 0
+    loaded = []
+    def load(filename):
+        return filename
+    def on_load(filename, data):
+        loaded.append(data)
+    for x in xrange(3):
+        loader.load(x, load, on_load)
+    # at least one data is loaded per run
+    for x in xrange(3):
+        loader.run()
+    # at least one data is delivered per update
+    loader._update()
+    test(len(loaded) == 1)
+    loader._update()
+    loader._update()
+    test(len(loaded) == 3)
@@ -0,0 +1,50 @@
+'''
+MJPEG server broadcaster
+'''
+
+from init import test, import_pymt_no_window
+
+def unittest_mjpegserver_broadcast():
+    import_pymt_no_window()
+    import time
+    from pymt.modules import mjpegserver
+
+    class Broadcaster(mjpegserver.MjpegBroadcaster):
+        def encode(self, data, size):
+            self.encodes.append(data)
+            return 'jpeg-%s' % data
+
+    broadcaster = Broadcaster()
+    broadcaster.encodes = []
+
+    # nothing is captured without clients
+    test(not broadcaster.want_frame())
+
+    clients = [mjpegserver.MjpegClient(('127.0.0.1', x)) for x in xrange(3)]
+    for client in clients:
+        broadcaster.add_client(client)
+    test(broadcaster.want_frame())
+
+    def push(data):
+        broadcaster.push_frame(data, (1, 1))
+        while not broadcaster.want_frame():
+            time.sleep(.01)
+
+    # one encoding for all the clients
+    push('a')
+    test(broadcaster.encodes == ['a'])
+    test([client.wait_frame() for client in clients] == ['jpeg-a'] * 3)
+
+    # a slow client get only the last frame
+    push('b')
+    test(clients[0].wait_frame() == 'jpeg-b')
+    push('c')
+    test([client.wait_frame() for client in clients] == ['jpeg-c'] * 3)
+    test(clients[0].dropped == 0 and clients[1].dropped == 1)
+    test(broadcaster.encodes == ['a', 'b', 'c'])
+    test(clients[1].wait_frame(timeout=0) is None)
+
+    for client in clients:
+        broadcaster.remove_client(client)
+    test(not broadcaster.want_frame())
+    test(broadcaster.get_stats()['encoded'] == 3)
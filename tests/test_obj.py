@@ -0,0 +1,39 @@
+'''
+OBJ loader
+'''
+
+from init import test, import_pymt_no_window
+
+_obj_data = '''# test
+v 0 0 0
+v 1 0 0
+v 1 1 0
+v 0 1 0
+vt 0 0
+vt 1 1
+vn 0 0 1
+o square
+f 1/1/1 2/2/1 3/2/1 4/1/1
+f -4/1/1 -2/2/1 -1/1/1
+'''
+
+def unittest_obj_parse():
+    import_pymt_no_window()
+    import os, tempfile, shutil
+    from pymt.obj import OBJ
+    path = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(path, 'square.obj')
+        open(filename, 'w').write(_obj_data)
+        for x in xrange(2):
+            # first load parse the file, second load use the cache
+            obj = OBJ(filename)
+            test(os.path.exists(filename + '.pymtcache'))
+            test(obj.meshes.keys() == ['square'])
+            vertices = obj.meshes['square'].groups[0].vertices
+            # quad is splitted in 2 triangles, + 1 triangle
+            test(len(vertices) == 3 * 3 * 8)
+            test(list(vertices[:8]) == [0, 0, 0, 0, 1, 0, 0, 0])
+            test(list(vertices[-8:]) == [0, 0, 0, 0, 1, 0, 1, 0])
+    finally:
+        shutil.rmtree(path)
@@ -0,0 +1,121 @@
+'''
+Frame profiler
+'''
+
+from init import test, import_pymt_no_window
+
+def unittest_profiler_frames():
+    import_pymt_no_window()
+    from pymt import EventDispatcher, MTWidget, getClock, getProfiler, \
+            setWindow, getWindow, pymt_event_listeners, pymt_providers
+    from pymt.base import TouchEventLoop
+
+    class FakeWindow(EventDispatcher):
+        needs_redraw = True
+        def __init__(self):
+            super(FakeWindow, self).__init__()
+            for event in ('on_update', 'on_draw', 'on_flip'):
+                self.register_event_type(event)
+            self.children = []
+        def dispatch_events(self):
+            pass
+        def on_update(self):
+            for w in self.children:
+                w.dispatch_event('on_update')
+        def on_draw(self):
+            for w in self.children:
+                w.dispatch_event('on_draw')
+        def on_flip(self):
+            pass
+
+    class FakeProvider(object):
+        def update(self, dispatch_fn):
+            pass
+
+    class FakePostproc(object):
+        def process(self, events):
+            return events
+
+    class ProfiledWidget(MTWidget):
+        def draw(self):
+            pass
+
+    old_window = getWindow()
+    window = FakeWindow()
+    parent = ProfiledWidget()
+    for x in xrange(3):
+        parent.add_widget(MTWidget())
+    window.children.append(parent)
+    setWindow(window)
+    pymt_event_listeners.append(window)
+    provider = FakeProvider()
+    pymt_providers.append(provider)
+    profiler = getProfiler()
+    try:
+        evloop = TouchEventLoop()
+        evloop.postproc_modules.append(FakePostproc())
+        evloop.idle()
+        test(not profiler.get_frames())
+
+        profiler.start()
+        test('dispatch_event' in MTWidget.__dict__)
+        def callback(dt):
+            pass
+        getClock().schedule_once(callback, 0)
+        evloop.idle()
+        evloop.idle()
+        profiler.stop()
+        test('dispatch_event' not in MTWidget.__dict__)
+        evloop.idle()
+
+        frames = profiler.get_frames()
+        test(len(frames) == 2)
+        spans = [(x[0], x[1]) for x in frames[0].spans]
+        test(('input', 'FakeProvider') in spans)
+        test(('postproc', 'FakePostproc') in spans)
+        test(('clock', 'test_profiler.callback') in spans)
+        test([x for x in spans if x[0] in ('update', 'draw', 'flip')] ==
+             [('update', 'on_update'), ('draw', 'on_draw'),
+              ('flip', 'on_flip')])
+        test(frames[0].widgets[('on_draw', 'MTWidget')][0] == 3)
+        test(frames[0].widgets[('on_update', 'ProfiledWidget')][0] == 1)
+
+        summary = profiler.get_summary()
+        test(summary['frame'][0] == 2)
+        test(summary['on_draw:MTWidget'][0] == 6)
+
+        trace = profiler.export_chrome_trace()
+        phases = set([x['ph'] for x in trace['traceEvents']])
+        test(phases == set(['X', 'C']))
+    finally:
+        profiler.stop()
+        profiler.clear()
+        pymt_providers.remove(provider)
+        pymt_event_listeners.remove(window)
+        setWindow(old_window)
+
+def unittest_profiler_graph_on_top():
+    import_pymt_no_window()
+    from pymt import MTWidget, setWindow, getWindow
+    from pymt.modules.profiler import ProfilerGraph
+
+    class FakeWindow(object):
+        needs_redraw = False
+
+    old_window = getWindow()
+    window = FakeWindow()
+    setWindow(window)
+    try:
+        parent = MTWidget()
+        graph = ProfilerGraph()
+        parent.add_widget(graph)
+        parent.add_widget(MTWidget())
+        graph.on_update()
+        test(parent.children[-1] is graph)
+
+        # already on top, the window is not marked as dirty
+        window.needs_redraw = False
+        graph.on_update()
+        test(not window.needs_redraw)
+    finally:
+        setWindow(old_window)
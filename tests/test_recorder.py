@@ -0,0 +1,98 @@
+'''
+Touch recorder and replay provider
+'''
+
+from init import test, import_pymt_no_window
+
+def _record(filename):
+    from pymt import Touch, TouchRecorder
+    from pymt.input.shape import TouchShapeRect
+    class RecordTouch(Touch):
+        __attrs__ = ('pressure', )
+        def depack(self, args):
+            self.sx, self.sy = args
+            self.pressure = .5
+            self.profile = ('pos', 'shape', 'pressure')
+            super(RecordTouch, self).depack(args)
+    recorder = TouchRecorder(filename)
+    t1 = RecordTouch('dev', 1, (.1, .2))
+    t1.shape = TouchShapeRect()
+    t1.shape.width = 3
+    t2 = RecordTouch('dev', 2, (.3, .4))
+    t2.userdata['object'] = object()
+    recorder.record('down', t1, 0.)
+    recorder.record('down', t2, 0.)
+    t1.move((.5, .6))
+    recorder.record('move', t1, 1.)
+    recorder.record('up', t1, 2.)
+    recorder.close()
+    return recorder
+
+def unittest_recorder_read():
+    import_pymt_no_window()
+    import os, tempfile
+    from pymt import TouchRecordReader
+    filename = tempfile.mktemp('.rec')
+    try:
+        test(_record(filename).count == 4)
+        records = list(TouchRecordReader(filename))
+        test([(x[1], x[2]) for x in records] ==
+             [(0., 'down'), (0., 'down'), (1., 'move'), (2., 'up')])
+        session, timestamp, event, attrs, values = records[2]
+        args = dict(zip(attrs, values))
+        test(args['id'] == 1 and args['device'] == 'dev')
+        test((args['sx'], args['sy']) == (.5, .6))
+        test(args['pressure'] == .5)
+        test(args['shape'].width == 3)
+        test(args['profile'] == ('pos', 'shape', 'pressure'))
+        # unmarshallable values are dropped
+        args = dict(zip(*records[1][3:]))
+        test(args['userdata'] is None and args['sx'] == .3)
+
+        # a second session is appended after the first one
+        _record(filename)
+        records = list(TouchRecordReader(filename))
+        test(len(records) == 8)
+        test(records[4][0] == 1 and records[4][1] == 2.)
+        test(records[-1][1] == 4.)
+
+        # the incomplete last record is ignored
+        size = os.path.getsize(filename)
+        with open(filename, 'r+b') as fd:
+            fd.truncate(size - 3)
+        test(len(list(TouchRecordReader(filename))) == 7)
+    finally:
+        os.unlink(filename)
+
+def unittest_recorder_replay():
+    import_pymt_no_window()
+    import os, tempfile
+    from pymt import ReplayTouchProvider
+    filename = tempfile.mktemp('.rec')
+    try:
+        _record(filename)
+        provider = ReplayTouchProvider('replay', '%s,speed=0' % filename)
+        provider.start()
+        frames = []
+        for x in xrange(4):
+            events = []
+            provider.update(lambda event, touch: events.append((event, touch)))
+            frames.append(events)
+        test([[e for e, t in events] for events in frames] ==
+             [['down', 'down'], ['move'], ['up', 'up'], []])
+        down, move = frames[0][0][1], frames[1][0][1]
+        test(down is move)
+        test(move.spos == (.5, .6) and move.osxpos == .1)
+        test(move.device == 'dev' and move.id == 1 and move.pressure == .5)
+        test(frames[2][1][1].id == 2)
+        test(provider.count == 4)
+
+        # loop mode
+        provider = ReplayTouchProvider('replay', '%s,speed=0,loop=1' % filename)
+        provider.start()
+        events = []
+        for x in xrange(6):
+            provider.update(lambda event, touch: events.append(event))
+        test(events.count('down') == 4)
+    finally:
+        os.unlink(filename)
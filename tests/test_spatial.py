@@ -0,0 +1,60 @@
+'''
+Spatial widget
+'''
+
+from init import test, import_pymt_no_window
+
+def unittest_spatial_grid():
+    import_pymt_no_window()
+    from pymt import SpatialGrid
+    grid = SpatialGrid(cell_size=10)
+    grid.insert('a', (0, 0, 5, 5))
+    grid.insert('b', (3, 3, 25, 25))
+    test(sorted(grid.query_point(4, 4)) == ['a', 'b'])
+    test(grid.query_point(20, 20) == ['b'])
+    test(grid.query_point(30, 30) == [])
+    grid.insert('b', (100, 100, 110, 110))
+    test(grid.query_point(20, 20) == [])
+    test(grid.query_point(105, 105) == ['b'])
+    grid.remove('a')
+    test(grid.query_point(4, 4) == [])
+    test(len(grid) == 1)
+
+def unittest_spatial_zorder():
+    import_pymt_no_window()
+    from pymt import MTWidget, MTSpatialWidget, Touch
+
+    class TestTouch(Touch):
+        pass
+
+    received = []
+    class TestWidget(MTWidget):
+        def on_touch_down(self, touch):
+            received.append(self)
+            return self.collide_point(touch.x, touch.y)
+
+    root = MTSpatialWidget(size=(1000, 1000))
+    bottom = TestWidget(pos=(0, 0), size=(100, 100))
+    top = TestWidget(pos=(50, 50), size=(100, 100))
+    far = TestWidget(pos=(500, 500), size=(100, 100))
+    root.add_widget(bottom)
+    root.add_widget(top)
+    root.add_widget(far)
+
+    touch = TestTouch(0, 'test', None)
+    touch.x, touch.y = 75, 75
+    root.dispatch_event('on_touch_down', touch)
+    test(received == [top])
+
+    del received[:]
+    top.bring_to_front()
+    bottom.bring_to_front()
+    root.dispatch_event('on_touch_down', touch)
+    test(received == [bottom])
+
+    # move the widget away, index must follow on the next synchronization
+    del received[:]
+    bottom.pos = (800, 800)
+    root.update_index()
+    root.dispatch_event('on_touch_down', touch)
+    test(received == [top])
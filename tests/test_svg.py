@@ -0,0 +1,45 @@
+'''
+SVG geometry cache
+'''
+
+from init import test, import_pymt_no_window
+
+_svg_data = '''<?xml version="1.0"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="100" height="50">
+  <rect x="0" y="0" width="100" height="50" fill="#ff0000" />
+  <path d="M 10 10 L 20 10 L 20 20 z" fill="none" stroke="#0000ff" />
+</svg>
+'''
+
+def unittest_svg_geometry():
+    import_pymt_no_window()
+    import os, tempfile, shutil
+    from pymt.lib import squirtle
+    from OpenGL.GL import GL_TRIANGLES, GL_LINES
+    path = tempfile.mkdtemp()
+    old_cache_path = squirtle.cache_path
+    squirtle.cache_path = os.path.join(path, 'cache')
+    try:
+        filename = os.path.join(path, 'test.svg')
+        open(filename, 'w').write(_svg_data)
+        for x in xrange(2):
+            # first load tessellate the file, second load use the cache
+            width, height, vertices, colors, runs = \
+                squirtle.SVG.load_geometry(filename)
+            test(len(os.listdir(squirtle.cache_path)) == 1)
+            test((width, height) == (100, 50))
+            # rect = 2 triangles + 4 lines (the rect is stroked with the
+            # fill color), then the stroke of the path = 3 lines
+            test(runs == [(GL_TRIANGLES, 0, 6), (GL_LINES, 6, 14)])
+            test(len(vertices) == 20 * 2 and len(colors) == 20 * 4)
+            test(list(colors[:4]) == [255, 0, 0, 255])
+            test(list(colors[-4:]) == [0, 0, 255, 255])
+            # y axis is flipped
+            test(set(vertices[29:40:2]) == set([40, 30]))
+
+        # other tessellation parameters are cached separately
+        squirtle.SVG.load_geometry(filename, bezier_points=4)
+        test(len(os.listdir(squirtle.cache_path)) == 2)
+    finally:
+        squirtle.cache_path = old_cache_path
+        shutil.rmtree(path)
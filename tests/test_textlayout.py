@@ -0,0 +1,74 @@
+'''
+Text layout
+'''
+
+from init import test, import_pymt_no_window
+
+calls = []
+
+def _get_extents(text):
+    calls.append(text)
+    return len(text) * 10, 20
+
+def unittest_layout_wrap():
+    import_pymt_no_window()
+    from pymt.core.text.layout import TextLayout
+    layout = TextLayout(_get_extents, width=100)
+    layout.text = 'hello world foo\n\nbar'
+    text = layout.text
+    test([text[s:e] for s, e, w, h in layout.lines] ==
+         ['hello ', 'world foo', '', 'bar'])
+    test(layout.content_height == 80)
+    test(layout.content_width == 90)
+
+    # a word larger than the width is alone on his line
+    layout.text = 'a abcdefghijkl b'
+    text = layout.text
+    test([text[s:e] for s, e, w, h in layout.lines] ==
+         ['a ', 'abcdefghijkl', ' b'])
+
+    # without width, only the newlines cut the text
+    layout.width = None
+    test([text[s:e] for s, e, w, h in layout.lines] == ['a abcdefghijkl b'])
+
+def unittest_layout_incremental():
+    import_pymt_no_window()
+    from pymt.core.text.layout import TextLayout
+    layout = TextLayout(_get_extents, width=100)
+    layout.text = 'first paragraph\nsecond\nthird one'
+    lines = layout.lines[:]
+    paragraphs = layout._paragraphs[:]
+    layout.text = 'first paragraph\nsecond edited\nthird one'
+    # only the second paragraph is wrapped again
+    test(layout._paragraphs[0] is paragraphs[0])
+    test(layout._paragraphs[2] is paragraphs[2])
+    test(layout._paragraphs[1] is not paragraphs[1])
+    test(layout.lines[0] == lines[0])
+    test(layout.lines[-1][0] == lines[-1][0] + len(' edited'))
+
+def unittest_layout_cursor():
+    import_pymt_no_window()
+    from pymt.core.text.layout import TextLayout
+    layout = TextLayout(_get_extents, width=100)
+    layout.text = 'hello world\nabc'
+    # lines: 'hello ', 'world', 'abc'
+    test(layout.get_line(0) == 0)
+    test(layout.get_line(6) == 1)
+    test(layout.get_line(11) == 1)
+    test(layout.get_line(12) == 2)
+    test(layout.get_cursor_pos(8) == (20, 20))
+    test(layout.get_cursor_pos(14) == (20, 40))
+    test(layout.get_line_at(25) == 1)
+    test(layout.get_line_at(500) == 2)
+    test(layout.get_offset_at(24, 25) == 8)
+    test(layout.get_offset_at(26, 25) == 9)
+    test(layout.get_offset_at(500, 45) == 15)
+
+def unittest_layout_word_cache():
+    import_pymt_no_window()
+    from pymt.core.text.layout import TextLayout
+    layout = TextLayout(_get_extents, width=1000)
+    del calls[:]
+    layout.text = 'aaa aaa aaa'
+    # each glyph is measured only once
+    test(sorted(calls) == [' ', 'a'])
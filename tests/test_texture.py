@@ -0,0 +1,66 @@
+'''
+Texture buffer conversion
+'''
+
+from init import test, import_pymt_no_window
+
+def unittest_texture_convert_buffer():
+    import_pymt_no_window()
+    import numpy
+    from pymt.texture import Texture
+    from OpenGL.GL import GL_BGR, GL_BGRA, GL_RGB, GL_RGBA, GL_TEXTURE_2D
+    old = Texture._has_bgr, Texture._has_bgr_tested
+    Texture._has_bgr, Texture._has_bgr_tested = False, True
+    try:
+        texture = Texture(2, 1, GL_TEXTURE_2D, 0)
+        data, format = texture._convert_buffer('\x01\x02\x03\x04\x05\x06', GL_BGR)
+        test(format == GL_RGB)
+        test(data.tostring() == '\x03\x02\x01\x06\x05\x04')
+
+        # the staging array is reused for the next frames
+        staging = data
+        data, format = texture._convert_buffer(
+            memoryview('\x07\x08\x09\x0a\x0b\x0c'), GL_BGR)
+        test(data is staging)
+        test(data.tostring() == '\x09\x08\x07\x0c\x0b\x0a')
+
+        data, format = texture._convert_buffer(
+            bytearray('\x01\x02\x03\x04\x05\x06\x07\x08'), GL_BGRA)
+        test(format == GL_RGBA)
+        test(data.tostring() == '\x03\x02\x01\x04\x07\x06\x05\x08')
+
+        # no conversion needed, the buffer is not copied
+        frame = numpy.arange(6, dtype=numpy.uint8)
+        data, format = texture._convert_buffer(frame, GL_RGB)
+        test(data is frame and format == GL_RGB)
+        data, format = texture._convert_buffer(buffer(frame), GL_RGB)
+        test(isinstance(data, numpy.ndarray))
+        test(numpy.may_share_memory(data, frame))
+    finally:
+        Texture._has_bgr, Texture._has_bgr_tested = old
+
+def unittest_texture_pixelbuffer():
+    import_pymt_no_window()
+    from pymt.texture import PixelBuffer
+    class FakeTexture(object):
+        def __init__(self):
+            self.blits = []
+        def blit_buffer(self, buffer, size=None, mode='RGB', pos=(0, 0)):
+            self.blits.append((buffer.tostring(), size, mode))
+
+    texture = FakeTexture()
+    pb = PixelBuffer((2, 1), 'RGB')
+    test(not pb.upload(texture))
+    pb.write('abcdef')
+    pb.write('ghijkl')
+    test(pb.upload(texture))
+    test(texture.blits == [('ghijkl', (2, 1), 'RGB')])
+    test(not pb.upload(texture))
+    pb.write(bytearray('mnopqr'))
+    test(pb.upload(texture))
+    test(texture.blits[-1][0] == 'mnopqr')
+    try:
+        pb.write('abc')
+        test(False)
+    except ValueError:
+        test(True)
@@ -0,0 +1,69 @@
+'''
+Thumbnail cache
+'''
+
+from init import test, import_pymt_no_window
+
+def _image(width, height, mode='RGB'):
+    from pymt.core.image import ImageData
+    class FakeImage(object):
+        pass
+    channels = len(mode)
+    data = ''.join(chr((x * 7) % 256) for x in xrange(width * height * channels))
+    image = FakeImage()
+    image._data = ImageData(width, height, mode, data)
+    return image
+
+def unittest_thumbnail_scale():
+    import_pymt_no_window()
+    from pymt.thumbnail import scale_image_data
+    data = scale_image_data(_image(400, 200)._data, (100, 100))
+    test((data.width, data.height) == (100, 50))
+    test(data.mode == 'RGBA')
+    test(len(data.data) == 100 * 50 * 4)
+    # never enlarged
+    data = scale_image_data(_image(20, 10, 'RGBA')._data, (100, 100))
+    test((data.width, data.height) == (20, 10))
+    test(data.data == _image(20, 10, 'RGBA')._data.data)
+
+def unittest_thumbnail_cache():
+    import_pymt_no_window()
+    import os, tempfile, shutil
+    from pymt.thumbnail import ThumbnailCache
+    path = tempfile.mkdtemp()
+    try:
+        source = os.path.join(path, 'source.png')
+        open(source, 'w').close()
+        loads = []
+        def load(filename):
+            loads.append(filename)
+            return _image(64, 64)
+        cache = ThumbnailCache(os.path.join(path, 'thumbs'),
+                               max_size=2 * 32 * 32 * 4 + 100)
+        a = cache.load(source, (32, 32), load)
+        test((a.width, a.height) == (32, 32))
+        b = cache.load(source, (32, 32), load)
+        # the second one come from the disk
+        test(len(loads) == 1)
+        test(str(buffer(b._data.data)) == a._data.data)
+        test(cache.get_stats()['count'] == 1)
+
+        # a new cache find the thumbnails on disk
+        cache = ThumbnailCache(os.path.join(path, 'thumbs'),
+                               max_size=2 * 32 * 32 * 4 + 100)
+        cache.load(source, (32, 32), load)
+        test(len(loads) == 1)
+
+        # the least recently used thumbnail is removed
+        cache.load(source, (16, 16), load)
+        cache.load(source, (32, 32), load)
+        cache.load(source, (31, 31), load)
+        test(cache.get_stats()['count'] == 2)
+        test(len(loads) == 3)
+        cache.load(source, (32, 32), load)
+        test(len(loads) == 3)
+        cache.load(source, (16, 16), load)
+        test(len(loads) == 4)
+        test(cache.get_stats()['count'] == 2)
+    finally:
+        shutil.rmtree(path)